@@ -1,8 +1,10 @@
 from datetime import datetime
 import socket
-import pause
 from Nodes.comunication import ComunicationManager
-from art import text2art
+from Nodes.timers import TimerService, Timer
+from Nodes.fifo import ReorderBuffer
+from Nodes.reliable import ReliableChannel
+from Nodes.faults import FaultInjector
 from Nodes.messages import *
 import time
 import os
@@ -11,12 +13,18 @@ import sys
 class Node(ComunicationManager):
     """!Main class, encapsulate foundamental primitives."""
     
-    def __init__(self, hostname:str, back:int, port:int, fifo=False):
+    def __init__(self, hostname:str, back:int, port:int, fifo=False, transport=None):
         """!Node base initializer.
 
         @param HOSTNAME (str): IP of the initalizer.
         @param BACK (int): Port where the initalizer is listening for confirmation.
-        @param PORT (int): Port on which this node has to listen
+        @param PORT (int): Port on which this node has to listen, 0 to let
+            the OS choose one (the actual port is reported in the RDY message).
+        @param transport: optional object that replaces the UDP sockets.
+            It has to provide attach(node), called instead of the usual
+            handshake, and sendto(node, data, port). Used by the in-process
+            simulator (see Nodes.simulator) and by multi-node workers
+            (see Nodes.worker).
 
         @return None
         """
@@ -37,13 +45,24 @@ class Node(ComunicationManager):
         self._visualizer_port = None
         self._total_messages = 0
         self._sleep_delay = 1
+        self._transport = transport
+        self._timers = TimerService(self)
+        self._reliable = None
+        self._aggregate:bool = False
+        self._emulator = None
+        self._faults = None
+        self._tracer = None
         # ========== parameters needed for fifo mode ========
         if fifo:
             self.send_sequence = {}
-            self.recv_sequence = {}
+            # holds messages received out of order (see Protocol.process_message)
+            self.reorder_buffer = ReorderBuffer()
         # ========== initialization sequence ================
-        self.send_RDY()
+        if self.transport is not None:
+            self.transport.attach(self)
+            return
         self.bind_to_port()
+        self.send_RDY()
         self.wait_for_instructions()        
 
     @property
@@ -115,6 +134,46 @@ class Node(ComunicationManager):
         """!Return the port used by the visualizer."""
         return self._visualizer_port
 
+    @property
+    def transport(self):
+        """!Return the transport used instead of sockets, if any."""
+        return self._transport
+
+    @property
+    def timers(self):
+        """!Return the timer service of the node."""
+        return self._timers
+
+    @property
+    def reliable(self):
+        """!Return the reliable channel of the node, None if messages are sent as plain datagrams."""
+        return self._reliable
+
+    @property
+    def emulator(self):
+        """!Return the emulator of the links of the node, None if links are not emulated."""
+        return self._emulator
+
+    @property
+    def faults(self):
+        """!Return the faults injected in the node, None if no fault concerns it (see Nodes.faults)."""
+        return self._faults
+
+    @property
+    def tracer(self):
+        """!Return the recorder of the messages of the node, None if tracing is disabled (see Nodes.trace)."""
+        return self._tracer
+
+    @property
+    def crashed(self):
+        """!Return True if the node crashed because of an injected fault."""
+        return self._faults is not None and self._faults.crashed
+
+    @property
+    def aggregate(self):
+        """!Return True if end of protocol reports are combined by the process hosting the node."""
+        return self._aggregate
+
     @property
     def total_messages(self):
         """!Return the total number of messages sent by the node."""
@@ -139,6 +198,8 @@ class Node(ComunicationManager):
 
     def print_info(self):
         """!Print basic informations about the node."""
+        # imported on first use, only for the banner.
+        from art import text2art
         Art = Art=text2art(f"{self.id}",font='block',chr_ignore=True)
         self.log(Art)
         res = f"\nHostname: {self.hostname}\n"
@@ -160,7 +221,7 @@ class Node(ComunicationManager):
         """
         if self.shell:
             print(message)
-        else:
+        elif self.exp_path:
             if not self.log_file:
                 path = os.path.join(self.exp_path, f"{self.id}.out")
                 self._log_file = open(path, "a")
@@ -184,12 +245,15 @@ class Node(ComunicationManager):
 
         This method is used to send RDY message to the initializer,
         confirming that this node is ready to receive instructions.
+        The message carries the port the node is bound to, and the
+        process ID so that the initializer can keep together nodes
+        hosted by the same process.
         This method does not increment the total_message counter as
         this message is part of the initial handshake.
 
         @return None
         """
-        message = Message(Command.READY, self.port)
+        message = ReadyMessage(self.port, os.getpid())
         self._send(message, self.back)
 
     def bind_to_port(self):
@@ -198,30 +262,93 @@ class Node(ComunicationManager):
         self._in_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         # Accept UDP datagrams, on the given port, from any sender
         self._in_socket.bind(("", self.port))
+        # port 0 means that the OS picked a free one
+        self._port = self._in_socket.getsockname()[1]
         self.start_listener(self._in_socket, self.message_queue)
     
-    def wait_for_instructions(self):
-        """!This method is used to start listening for setup messages."""
+    def wait_for_instructions(self, retry: float=1.0):
+        """!This method is used to start listening for setup messages.
+
+        @param retry (float): seconds after which the RDY message is sent
+            again, in case it was lost.
+        """
         assert self.in_socket is not None, "You need to bind to a valid socket first!"
-        while 1:
-            data = self.receive_message()
-            if not data: continue
-            try:
-                new_message = SetupMessage.deserialize(data)
-            except Exception as e:
-                print(f"Error while deserializing message: {e}")
-            ## Unique ID of the node.
-            self._id = new_message.node
-            self._edges = new_message.edges
-            self._local_dns = new_message.local_dns
-            self._shell = new_message.shell
-            self._exp_path = new_message.exp_path
-            self._visualizer_port = new_message.visualizer_port
-            self._setup = True
-            self._reverse_local_dns = {}
-            for key, val in self.local_dns.items():
-                self.reverse_local_dns[val] = key
-            return
+        while not self.try_setup(retry):
+            self.send_RDY()
+
+    def try_setup(self, timeout: float=None) -> bool:
+        """!Wait for the setup message for at most timeout seconds.
+
+        @param timeout (float): how long to wait for the message.
+
+        @return True if the node has been setup.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        early = []
+        while True:
+            data = self.receive_message(None if deadline is None else max(0, deadline - time.monotonic()))
+            if not data: break
+            new_message = setup_message(data)
+            if new_message is not None:
+                self.apply_setup(new_message)
+                self.confirm_setup()
+                break
+            # a neighbor setup earlier already started, keep its messages for the protocol.
+            early.append(data)
+        self.message_queue.put_front(early)
+        return self.setup
+
+    def confirm_setup(self):
+        """!Tell the initializer that the setup message has been received.
+
+        Until this confirmation arrives, the initializer sends the setup
+        again whenever the node repeats its RDY message.
+        """
+        self._send(Message(Command.SETUP_ACK, self.port), self.back)
+
+    def apply_setup(self, message: SetupMessage):
+        """!Configure the node with the information sent by the initializer.
+
+        @param message (SetupMessage): setup message for this node.
+
+        @return None
+        """
+        ## Unique ID of the node.
+        self._id = message.node
+        # edges are not sent by the initializer, they follow from the local dns.
+        self._edges = message.edges if message.edges is not None else [(self.id, neighbor) for neighbor in message.local_dns]
+        self._local_dns = message.local_dns
+        self._shell = message.shell
+        self._exp_path = message.exp_path
+        self._visualizer_port = message.visualizer_port
+        if message.codec:
+            Message.use_codec(message.codec)
+        if message.reliable:
+            self._reliable = ReliableChannel(self, message.reliable)
+        # only transports hosting several nodes have an aggregator (see Nodes.reports).
+        self._aggregate = bool(message.aggregate) and getattr(self.transport, "reports", None) is not None
+        if message.links:
+            # imported only when some link is emulated.
+            from Nodes.emulation import LinkEmulator, link_settings
+            self._emulator = LinkEmulator(self, {message.local_dns[neighbor]: link_settings(link)
+                                                 for neighbor, link in message.links.items()})
+        if message.crash:
+            self._faults = FaultInjector(self, message.crash)
+        if message.trace:
+            # imported only when tracing, timestamps follow the virtual clock of the simulator.
+            from Nodes.trace import TraceRecorder, trace_file
+            clock = (lambda: self.transport.time) if hasattr(self.transport, "time") else time.monotonic
+            # nodes hosted by the same process share its trace file.
+            name = self.id if self.transport is None else f"process{os.getpid()}"
+            self._tracer = TraceRecorder(trace_file(message.trace, name), self.id, clock)
+        self._setup = True
+        self._reverse_local_dns = {}
+        for key, val in self.local_dns.items():
+            self.reverse_local_dns[val] = key
+        # resolve once every address this node is going to send to.
+        for port in [self.back, self.visualizer_port] + list(self.local_dns.values()):
+            if port is not None:
+                self.address(port)
             
     def _send(self, message: Message, port: int, log: bool=False):
         """!Primitive to send messages.
@@ -234,19 +361,14 @@ class Node(ComunicationManager):
         """
         if log:
             self.log(f"Sending to: {self.reverse_local_dns[port]}) this message: {message}")
-        forward_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         if port != self.back and self.visualizer_port:
             time.sleep(self.sleep_delay)
-        # ============= additional information for FIFO mode ===============
-        if self.fifo and port != self.back: # we only want to track node-node messages.
-            target_id = self.reverse_local_dns[port]
-            if target_id not in self.send_sequence:
-                self.send_sequence[target_id] = 0
-            
-            message.seq_number = self.send_sequence[target_id]            
-            self.send_sequence[target_id] += 1
+        self._set_sequence_number(message, port)
         # ============= sending to target and visualizer if needed ============
-        forward_socket.sendto(message.serialize(), ("localhost", port))
+        data = message.serialize()
+        if self._tracer is not None and port in self.reverse_local_dns:
+            self._tracer.sent(message.command, self.reverse_local_dns[port], data)
+        self._transmit(data, port)
         # We want to replicate only node to node messages or error messages
         if self.visualizer_port:
             if port != self.back or (port == self.back and message.command == Command.ERROR):
@@ -255,7 +377,57 @@ class Node(ComunicationManager):
                 else:
                     receiver = -1
                 v_message = VisualizationMessage(message, receiver)
-                forward_socket.sendto(v_message.serialize(), ("localhost", self.visualizer_port))
+                self._transmit(v_message.serialize(), self.visualizer_port)
+
+    def _transmit(self, data: bytes, port: int):
+        """!Send a serialized message, through the reliable channel if it is enabled.
+
+        Only messages to neighbors use the reliable channel.
+
+        @param data (bytes): serialized message.
+        @param port (int): target port
+
+        @return None
+        """
+        if self.reliable is not None and port in self.reverse_local_dns:
+            self.reliable.send(data, port)
+        else:
+            self._emit(data, port)
+
+    def _emit(self, data: bytes, port: int):
+        """!Hand a datagram to the transport, or send it over UDP.
+
+        Datagrams on emulated links go through the emulator (see Nodes.emulation),
+        the ones on links cut by an injected fault are dropped (see Nodes.faults).
+
+        @param data (bytes): datagram.
+        @param port (int): target port
+
+        @return None
+        """
+        if self._faults is not None and self._faults.drops(port):
+            return
+        if self._emulator is not None and self._emulator.emulates(port):
+            self._emulator.send(data, port)
+        else:
+            self._output(data, port)
+
+    def _output(self, data: bytes, port: int):
+        """!Send a datagram now, through the transport or over UDP."""
+        if self.transport is not None:
+            self.transport.sendto(self, data, port)
+        else:
+            self.send_datagram(data, port)
+
+    def _set_sequence_number(self, message: Message, port: int):
+        """!Stamp the FIFO sequence number of the link towards port (fifo mode only)."""
+        if self.fifo and port != self.back: # we only want to track node-node messages.
+            target_id = self.reverse_local_dns[port]
+            if target_id not in self.send_sequence:
+                self.send_sequence[target_id] = 0
+            
+            message.seq_number = self.send_sequence[target_id]            
+            self.send_sequence[target_id] += 1
 
     def _send_eov(self):
         """!Send a termination message to the visualizer."""
@@ -263,9 +435,8 @@ class Node(ComunicationManager):
             return
         else:
             eov_message = EndOfVisualizationMessage()
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             v_message = VisualizationMessage(eov_message, -1)
-            s.sendto(v_message.serialize(), ("localhost", self.visualizer_port))
+            self._transmit(v_message.serialize(), self.visualizer_port)
             
     def send_random(self, message:Message):
         """!Send given message to the first neighbor in the DNS list.
@@ -326,10 +497,7 @@ class Node(ComunicationManager):
 
         @return None
         """
-        for v, address in self.local_dns.items():
-            self._send(message, address)
-            if count:
-                self.total_messages += 1
+        self._send_many(message, list(self.local_dns.values()), count)
 
     def send_to_all_except(self, sender: int, message: Message, count=True):
         """!Send given message to all neighbors except the sender.
@@ -340,11 +508,8 @@ class Node(ComunicationManager):
 
         @return None
         """
-        for v, address in self.local_dns.items():
-            if v == sender: continue            
-            self._send(message, address)
-            if count:
-                self.total_messages += 1
+        ports = [address for v, address in self.local_dns.items() if v != sender]
+        self._send_many(message, ports, count)
             
     def send_to_missing(self, senders: list, message: Message, count=True):
         """!Send given message to all neighbors except the ones in the list.
@@ -357,19 +522,104 @@ class Node(ComunicationManager):
         """
         s = set(senders)
         assert len(s) == len(senders)-1
-        for v, address in self.local_dns.items():
-            if v not in s:
-                self._send(message, address)
-                if count:
-                    self.total_messages += 1
+        ports = [address for v, address in self.local_dns.items() if v not in s]
+        self._send_many(message, ports, count)
+
+    def _send_many(self, message: Message, ports: list, count=True):
+        """!Send the same message to several ports, serializing it only once.
+
+        Only the FIFO sequence number changes between targets, and it is
+        patched directly in the encoded message when the codec allows it.
+        With the visualizer every message goes through _send, since it
+        has to be delayed and replicated.
+
+        @param message (Message): message to send.
+        @param ports (list): target ports.
+        @param count (bool): if set to False, does not increase the message count.
+
+        @return None
+        """
+        codec = Message.codec
+        if self.visualizer_port or (self.fifo and not hasattr(codec, "with_sequence_number")):
+            for port in ports:
+                self._send(message, port)
+        elif not self.fifo:
+            data = message.serialize()
+            for port in ports:
+                self._trace_sent(message, data, port)
+                self._transmit(data, port)
+        else:
+            data = None
+            for port in ports:
+                self._set_sequence_number(message, port)
+                if data is None:
+                    data = message.serialize()
+                else:
+                    data = codec.with_sequence_number(data, message.seq_number)
+                self._trace_sent(message, data, port)
+                self._transmit(data, port)
+        if count:
+            self.total_messages += len(ports)
+
+    def _trace_sent(self, message: Message, data: bytes, port: int):
+        """!Record a message sent to the neighbor listening on port, if tracing."""
+        if self._tracer is not None:
+            self._tracer.sent(message.command, self.reverse_local_dns[port], data)
+
+    def set_timer(self, delay: float, name=None, periodic=False) -> Timer:
+        """!Start a timer, delivered to the protocol as a TimerMessage when it expires.
+
+        Use this instead of threads that sleep: the expiration is handled
+        by handle_message, in the same thread as every other message.
+        Timer messages are not counted in the total number of messages.
+
+        @param delay (float): seconds before the expiration.
+        @param name: value carried by the TimerMessage, to tell timers apart.
+        @param periodic (bool): if True the timer fires every delay seconds until cancelled.
+
+        @return Timer handle, that can be cancelled.
+        """
+        return self.timers.set_timer(delay, name, periodic)
+
+    def cancel_timer(self, timer: Timer):
+        """!Stop a timer. Expirations not handled yet are discarded.
+
+        @param timer (Timer): handle returned by set_timer.
+
+        @return None
+        """
+        self.timers.cancel(timer)
+
+    def inject_fault(self, message: FaultMessage):
+        """!Carry out a fault sent by the initializer.
+
+        @param message (FaultMessage): the fault.
+
+        @raise NodeCrash if the node crashes.
+        """
+        if self._faults is None:
+            self._faults = FaultInjector(self)
+        self._faults.apply(message)
 
     def _send_end_of_protocol(self):
-        """!Send termination message back to initializer at the end of the protocol."""
+        """!Send termination message back to initializer at the end of the protocol.
+
+        In aggregate mode the report goes to the aggregator of the process instead.
+        """
+        if self.aggregate:
+            self.transport.reports.end_of_protocol(self)
+            return
         message = TerminationMessage(Command.END_PROTOCOL, "", self.id)
         self._send(message, self.back)
 
     def send_total_messages(self):
-        """!Send total number of messages sent to the initializer."""
+        """!Send total number of messages sent to the initializer.
+
+        In aggregate mode the count goes to the aggregator of the process instead.
+        """
+        if self.aggregate:
+            self.transport.reports.total_messages(self, self.total_messages)
+            return
         message = CountMessage(Command.COUNT_M,self.total_messages, self.id)
         self._send(message, self.back)
 
@@ -386,7 +636,12 @@ class Node(ComunicationManager):
         You should always call this method at the beginning of
         your protocol. Check leader_election_atw_protocol() as 
         an example.
+        When a transport is attached (simulation) every node receives
+        START_AT at the same virtual time, so there is nothing to wait for.
         """
+        if self.transport is not None:
+            return "WAKEUP"
+        import pause # imported on first use, most protocols never wait for a start time.
         pause.until(datetime(message.year,
                              message.month,
                              message.day,
@@ -397,10 +652,19 @@ class Node(ComunicationManager):
         
     def cleanup(self):
         """!Cleanup resources before shutting down."""
+        # event-driven transports keep serving the channel after termination.
+        if self.reliable is not None and not self.crashed and not hasattr(self.transport, "deliver_later"):
+            self.reliable.flush()
+        # processes hosting several nodes flush the emulated links when all of them terminated.
+        if self.emulator is not None and self.transport is None:
+            self.emulator.flush()
         if self.listener:
             self.listener.stop()
         if self.in_socket:
             self.in_socket.close()
         if self.log_file:
             self.log_file.close()
-        self._send_eov()
\ No newline at end of file
+        if self._tracer is not None:
+            self._tracer.close()
+        self._send_eov()
+        self.close_sender()
\ No newline at end of file
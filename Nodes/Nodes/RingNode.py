@@ -6,8 +6,8 @@ from Nodes.messages import Message, LeaderElectionAtwMessage
 class RingNode(Node):
     """Node implementation specific to ring topologies."""
     
-    def __init__(self, hostname: str, back_port: int, listen_port: int):
-        super().__init__(hostname, back_port, listen_port)
+    def __init__(self, hostname: str, back_port: int, listen_port: int, **kwargs):
+        super().__init__(hostname, back_port, listen_port, **kwargs)
         
     def send_to_other(self, sender: int, message: Message):
         """!Send message to the other node in the ring.
@@ -2,8 +2,6 @@ from Nodes.Protocols.Protocol import Protocol
 from Nodes.const import Command, State
 from Nodes.messages import Message
 from Nodes.Nodes.Node import Node
-import threading
-import time
 
 class BullyProtocol(Protocol):
     def __init__(self, node: Node):
@@ -13,14 +11,14 @@ class BullyProtocol(Protocol):
         self.state = State.ASLEEP
         self.waiting = False
         self.role = None
-        self._stop_event = threading.Event()        
+        self.timeout = None
         
     def wait(self, t:int=5):
-        time_passed = 0
-        while (not self._stop_event.is_set()) and time_passed < t:            
-            time.sleep(0.1)
-            time_passed += 0.1
-        self.role = "LEADER" if time_passed >= t else "FOLLOWER"
+        """!Become leader if no REPLY arrives within t seconds."""
+        self.timeout = self.node.set_timer(t, "ELECTION")
+
+    def decide(self, role: str):
+        self.role = role
         new_message = Message(Command.TERM, self.node.id)
         self.node.send_to_me(new_message)
             
@@ -29,11 +27,10 @@ class BullyProtocol(Protocol):
             if ID > self.node.id:                
                 new_message = Message(Command.ELECTION, self.node.id)
                 self.node.send_to(new_message, ID)
-        #create the waiting thread
+        #start waiting for replies
         if not self.waiting:
             self.waiting = True
-            x1 = threading.Thread(target = self.wait)
-            x1.start()
+            self.wait()
     
     def ack(self, target:int):
         new_message = Message(Command.REPLY, self.node.id)
@@ -60,11 +57,16 @@ class BullyProtocol(Protocol):
             if self.state == State.ACTIVE:
                 self.state = State.DONE
                 self.node.log("I am follower")
-                self._stop_event.set()
+                # if the timeout was already handled, I decided to be the leader.
+                if self.timeout.active:
+                    self.timeout.cancel()
+                    self.decide("FOLLOWER")
             elif self.state == State.DONE:
                 pass
             else:
                 raise RuntimeError(f"Unexpected message-state combination. {message.command}-{self.state}")
+        elif message.command == Command.TIMER:
+            self.decide("LEADER")
         elif message.command == Command.TERM:            
             self.node.log("Finished")
             self.node.log(self.role)
@@ -3,8 +3,6 @@ from Nodes.Nodes import Node
 from Nodes.const import Command
 from Nodes.messages import Message
 import heapq
-import threading
-import time
 import random
 
 @Message.register
@@ -28,10 +26,10 @@ class LamportMutualExclusion(Protocol):
     """
     In this simulation, each node wants to have access twice to the 
     critical section. To simulate this, in the setup phase, each node
-    starts two threads that perform 1) wait random time 2) send request
-    for 2 times. Each node when granted the access to the critical section
-    starts a thread that waits for X seconds and sends the release at
-    the end of the waiting time, simulating access to the critical section.
+    starts two timers that, when expired, send a request (waiting again
+    if the node is using the critical section). Each node when granted
+    the access to the critical section starts a timer of X seconds and
+    sends the release when it expires, simulating access to the critical section.
     With Lamport's mutual exclusion algorithm, nodes should be able to coordinate
     to not access the CS at the same time.
     https://www.cs.fsu.edu/~xyuan/cop5611/lecture8.html
@@ -44,9 +42,9 @@ class LamportMutualExclusion(Protocol):
         super().__init__(node)
 
     def request_CS(self, t:int):
-        while True:
-            time.sleep(t)
-            if not self.using_CS: break
+        if self.using_CS:
+            self.node.set_timer(t, "REQUEST")
+            return
         self.LC += 1 #increment logical clock
         new_message = MutualExclusionMessage(Command.REQUEST, self.LC, self.node.id)
         heapq.heappush(self.CS_requests, (self.LC, self.node.id))
@@ -58,7 +56,9 @@ class LamportMutualExclusion(Protocol):
             print(f"{self.node.id} accessed CS...")
         t = random.randint(1,2)
         self.LC += 1 # increment logical clock
-        time.sleep(t)
+        self.node.set_timer(t, "RELEASE")
+
+    def release_CS(self):
         if not self.silent:
             print(f"{self.node.id} released CS...")
         self.using_CS = False
@@ -69,6 +69,14 @@ class LamportMutualExclusion(Protocol):
         if self.CS_counter == 2:
             new_message = Message(Command.END, self.node.id)
             self.node.send_to_all(new_message, count=False)
+        # my next request may already be on top of the queue and acknowledged.
+        self.access_check()
+        return self.finished()
+
+    def finished(self) -> bool:
+        # the CS is not accessed by handle_message anymore, so ENDs from
+        # all neighbors can arrive before the last access is completed.
+        return self.CS_counter == 2 and len(self.ends) == len(self.node.get_neighbors(id_only=True))
 
     def setup(self):
         random.seed((self.node.id +1)*32)
@@ -82,13 +90,12 @@ class LamportMutualExclusion(Protocol):
         self.ends = set()
         t1 = random.randint(1,3)
         t2 = random.randint(5,8)
-        x1 = threading.Thread(target = self.request_CS, args=(t1,))
-        x2 = threading.Thread(target = self.request_CS, args=(t2,))
-        x1.start()
-        x2.start()
+        self.node.set_timer(t1, "REQUEST")
+        self.node.set_timer(t2, "REQUEST")
     
     def access_check(self):
-        if len(self.CS_requests) == 0:
+        # messages are handled while in the CS, do not access it twice.
+        if len(self.CS_requests) == 0 or self.using_CS:
             return
         heapq.heapify(self.CS_requests)
         top_timestamp, top_id = self.CS_requests[0]
@@ -101,18 +108,24 @@ class LamportMutualExclusion(Protocol):
 
     def handle_message(self, message:Message) -> bool:
         assert message.command != Command.START_AT, "This protocol does not support simultaneous wakeup."
-        assert message.command in [Command.REQUEST, Command.RELEASE, Command.REPLY, Command.END], "Unknown message type."
+        assert message.command in [Command.REQUEST, Command.RELEASE, Command.REPLY, Command.END, Command.TIMER], "Unknown message type."
+        if message.command == Command.TIMER:
+            if message.name == "REQUEST":
+                self.request_CS(message.delay)
+            else:
+                return self.release_CS()
+            return
         if message.command == Command.END:
             self.ends.add(message.sender)
-            if len(self.ends) == len(self.node.get_neighbors(id_only=True)):
+            if self.finished():
                 return True
         else:
             self.LC = max(self.LC, message.timestamp)+1 # update logical clock
         if message.command == Command.REQUEST:        
             heapq.heappush(self.CS_requests, (message.timestamp, message.sender))
-            if not self.using_CS:
-                new_message = MutualExclusionMessage(Command.REPLY, self.LC, self.node.id)
-                self.node.send_to(new_message, message.sender)
+            # always reply right away, even while in the CS: the queue orders the accesses.
+            new_message = MutualExclusionMessage(Command.REPLY, self.LC, self.node.id)
+            self.node.send_to(new_message, message.sender)
         if message.command == Command.RELEASE:
             # If I receive a release, then for sure the coresponding request
             # is the top of the priority queue
@@ -3,6 +3,7 @@ from typing import Any
 from Nodes.messages import Message, TerminationMessage
 from Nodes.Nodes.Node import Node
 from Nodes.const import Command
+from Nodes.faults import NodeCrash
 import sys
 
 def error_handler(func):
@@ -34,38 +35,109 @@ class Protocol(ABC):
         """!Main loop of the node that decodes messages."""
         try:
             while True:
-                data = self.node.receive_message()
+                # expired timers are queued, then wait until the next one at most.
+                self.node.timers.expire()
+                data = self.node.receive_message(self.node.timers.timeout())
                 if not data:                    
                     continue
-                try:
-                    message = Message.deserialize(data)
-                    if message.command == Command.ERROR:
-                        # received termination from server
-                        self.node.log("Exiting since I decoded a error message from the initializer.")
-                        exit(0)
-                except Exception as e:
-                    raise RuntimeError(f"Error while deserializing message: {e}") from e
-                self.node.log(str(message))
-                # ========= FIFO mode check ===========
-                # usually server-node messages have a Null Sender.
-                # We want don't want to check those.
-                if self.node.fifo and message.sender is not None:
-                    sender_id = message.sender
-                    if sender_id not in self.node.recv_sequence:
-                        self.node.recv_sequence[sender_id] = 0
-                    expected_sequence_number = self.node.recv_sequence[sender_id]
-                    if message.seq_number != expected_sequence_number:
-                        self.node.log(f"Out of order message received. Expected {expected_sequence_number}, got {message.seq_number}. Requeueing.")
-                        # Put the message back in the queue for later processing
-                        self.node.insert_message(data)
-                        continue
-                    else:
-                        self.node.recv_sequence[sender_id] += 1
-                if self.handle_message(message):
+                if self.process_message(data):
                     break
+        except NodeCrash:
+            pass # a crashed node stops silently, see Nodes.faults.
         finally:
+            self.stop()
+
+    @error_handler
+    def run_batch(self, decode: bool = False):
+        """!Main loop of the node that handles all the queued messages at each iteration.
+
+        Equivalent to run, but the queue is emptied at once, so the
+        synchronization with the listener is paid once per batch.
+
+        @param decode (bool): if True, messages are deserialized by the listener thread.
+        """
+        if self.node.listener is not None:
+            self.node.listener.decode = decode
+        try:
+            while True:
+                self.node.timers.expire()
+                for data in self.node.receive_batch(self.node.timers.timeout()):
+                    if self.process_message(data):
+                        return
+        except NodeCrash:
+            pass
+        finally:
+            self.stop()
+
+    def process_message(self, data) -> bool:
+        """!Decode a single datagram and hand it to the protocol.
+
+        This is the body of the main loop, exposed so that other runtimes
+        (e.g. the in-process simulator) can drive the protocol without
+        a blocking receive.
+
+        @param data (bytes | Message): raw datagram received by the node,
+            or the message already decoded by the listener.
+
+        @return True if the computation is terminated.
+        """
+        reliable = self.node.reliable
+        if reliable is not None and not isinstance(data, Message) and reliable.is_frame(data):
+            # acks, duplicates and early frames are consumed by the reliable channel.
+            for payload in reliable.receive(data):
+                if self.process_message(payload):
+                    return True
+            return False
+        try:
+            message = data if isinstance(data, Message) else Message.deserialize(data)
+            if message.command == Command.ERROR:
+                # received termination from server
+                self.node.log("Exiting since I decoded a error message from the initializer.")
+                exit(0)
+        except Exception as e:
+            raise RuntimeError(f"Error while deserializing message: {e}") from e
+        if message.command == Command.SETUP:
+            return False # copy of the setup sent again by the initializer
+        if message.command == Command.FAULT:
+            self.node.inject_fault(message)
+            return False
+        # a node planned to crash after some messages counts the ones from its neighbors.
+        if self.node.faults is not None and message.sender in self.node.local_dns:
+            self.node.faults.received()
+        if self.node.tracer is not None and message.sender in self.node.local_dns:
+            self.node.tracer.received(message.command, message.sender,
+                                      data.serialize() if isinstance(data, Message) else data)
+        self.node.log(str(message))
+        # expirations of cancelled timers are discarded.
+        if message.command == Command.TIMER:
+            if not self.node.timers.accept(message):
+                return False
+            if reliable is not None and reliable.owns(message):
+                reliable.on_timer()
+                return False
+        # ========= FIFO mode check ===========
+        # usually server-node messages have a Null Sender.
+        # We want don't want to check those.
+        if self.node.fifo and message.sender is not None:
+            buffer = self.node.reorder_buffer
+            ready = buffer.push(message)
+            if not ready:
+                self.node.log(f"Out of order message received. Expected {buffer.expected(message.sender)}, got {message.seq_number}. Buffered.")
+            # messages held by the buffer are released as soon as the gap is filled.
+            for message in ready:
+                if self.handle_message(message):
+                    return True
+            return False
+        return bool(self.handle_message(message))
+
+    def stop(self):
+        """!Release the node after the main loop ended.
+
+        Crashed nodes skip cleanup, so they do not send end of protocol reports.
+        """
+        if not self.node.crashed:
             self.cleanup()
-            self.node.cleanup()
+        self.node.cleanup()
 
     @abstractmethod
     def setup(self):
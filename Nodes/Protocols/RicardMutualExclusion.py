@@ -3,8 +3,6 @@ from Nodes.Nodes import Node
 from Nodes.const import Command,State
 from Nodes.messages import Message
 import heapq
-import threading
-import time
 import random
 
 @Message.register
@@ -40,13 +38,10 @@ class RicardMutualExclusion(Protocol):
         super().__init__(node)
 
     def request_CS(self, t:int):
-        # request CS when I am IDLE
-        while True:
-            time.sleep(t)            
-            if self.state in [State.REQUESTING, State.CS]:
-                continue
-            else:
-                break
+        # request CS when I am IDLE, otherwise wait again
+        if self.state in [State.REQUESTING, State.CS]:
+            self.node.set_timer(t, "REQUEST")
+            return
         self.LC += 1 #increment logical clock
         new_message = MutualExclusionMessage(Command.REQUEST, self.LC, self.node.id)
         self.received_replies.clear()
@@ -61,7 +56,9 @@ class RicardMutualExclusion(Protocol):
             print(f"{self.node.id} accessed CS...")
         t = random.randint(1,2)
         self.LC += 1 # increment logical clock
-        time.sleep(t)
+        self.node.set_timer(t, "RELEASE")
+
+    def release_CS(self):
         if not self.silent:
             print(f"{self.node.id} released CS...")
         # ============== RELEASE CS ==============
@@ -73,6 +70,12 @@ class RicardMutualExclusion(Protocol):
         if self.CS_counter == 2:
             new_message = Message(Command.END, self.node.id)
             self.node.send_to_all(new_message, count=False)
+        return self.finished()
+
+    def finished(self) -> bool:
+        # the CS is not accessed by handle_message anymore, so ENDs from
+        # all neighbors can arrive before the last access is completed.
+        return self.CS_counter == 2 and len(self.ends) == len(self.node.get_neighbors(id_only=True))
     
     def empty_delayed(self):
         if len(self.delayed) == 0: return
@@ -97,10 +100,8 @@ class RicardMutualExclusion(Protocol):
         t2 = random.randint(5,8)
         if not self.silent:
             print(t1,t2)
-        x1 = threading.Thread(target = self.request_CS, args=(t1,))
-        x2 = threading.Thread(target = self.request_CS, args=(t2,))
-        x1.start()
-        x2.start()
+        self.node.set_timer(t1, "REQUEST")
+        self.node.set_timer(t2, "REQUEST")
     
     def access_check(self):
         if self.state != State.REQUESTING: return
@@ -110,10 +111,16 @@ class RicardMutualExclusion(Protocol):
 
     def handle_message(self, message:Message) -> bool:
         assert message.command != Command.START_AT, "This protocol does not support simultaneous wakeup."
-        assert message.command in [Command.REQUEST, Command.REPLY, Command.END], "Unknown message type."
+        assert message.command in [Command.REQUEST, Command.REPLY, Command.END, Command.TIMER], "Unknown message type."
+        if message.command == Command.TIMER:
+            if message.name == "REQUEST":
+                self.request_CS(message.delay)
+            else:
+                return self.release_CS()
+            return
         if message.command == Command.END:
             self.ends.add(message.sender)
-            if len(self.ends) == len(self.node.get_neighbors(id_only=True)):
+            if self.finished():
                 return True
         else:
             self.LC = max(self.LC, message.timestamp)+1 # update logical clock
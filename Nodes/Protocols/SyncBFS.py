@@ -0,0 +1,37 @@
+from Nodes.Protocols.SyncProtocol import SyncProtocol
+from Nodes.messages import Message
+from Nodes.const import Command
+
+
+class SyncBFS(SyncProtocol):
+    """!Breadth first spanning tree built in synchronous rounds.
+
+    The initiator sends INFORM in round 0. A node reached for the first
+    time in round r is at distance r from the initiator: it picks one of
+    the senders as parent, forwards INFORM to its other neighbors and
+    terminates. Every node sends on all of its links except the one
+    towards its parent, so 2m - n + 1 messages are used.
+    """
+
+    def setup(self):
+        super().setup()
+        self.parent = None
+        self.distance = None
+
+    def step(self, round: int, messages: list) -> bool:
+        if round == 0 and self.initiator:
+            self.distance = 0
+            self.node.log("I am the root.")
+            self.node.send_to_all(Message(Command.INFORM, self.node.id))
+            return True
+        if messages:
+            self.distance = round
+            self.parent = messages[0].sender
+            self.node.log(f"Parent: {self.parent}, distance: {self.distance}")
+            self.node.send_to_all_except(self.parent, Message(Command.INFORM, self.node.id))
+            return True
+        return False
+
+    def cleanup(self):
+        super().cleanup()
+        self.node.send_total_messages()
@@ -0,0 +1,92 @@
+from abc import abstractmethod
+from Nodes.Protocols.Protocol import Protocol
+from Nodes.messages import Message, RoundMessage
+from Nodes.const import Command
+
+
+class SyncProtocol(Protocol):
+    """!Base class for synchronous protocols, executed in numbered rounds.
+
+    Subclasses implement step() instead of handle_message(): in round r
+    a node receives the messages sent to it by its neighbors in round
+    r-1 and sends the messages of round r with the usual primitives
+    (send_to, send_to_all, ...). At the end of every step the framework
+    sends a RoundMessage marker to each neighbor, and a node enters the
+    next round as soon as it received the marker of the current round
+    from all of its neighbors. There is no clock and no central
+    coordinator: rounds advance at the speed of the slowest neighbor.
+    Markers are not counted in the number of messages.
+
+    A node starts round 0 when it is woken up (WAKEUP, or START_AT
+    without waiting for the wall clock) or when it receives anything
+    from a neighbor, so all nodes end up in lockstep (with wakeup_all over
+    sockets, a node reached by a neighbor before its START_AT message starts
+    as a non-initiator). When step returns
+    True the node terminates: its last marker tells the neighbors not
+    to wait for it anymore. A node whose neighbors all terminated keeps
+    executing empty rounds until it terminates too.
+
+    Messages of a round are told apart from the next ones by the marker
+    that follows them, so links must be FIFO: use fifo=True on nodes
+    hosted by different processes. Messages between nodes of the same
+    worker and simulated links without jitter are already FIFO; with
+    jitter (or a random latency) in the simulator or in the emulated
+    links, use fifo=True or Link(fifo=True). In the simulator, setup
+    raises a ValueError if the links of the node are not FIFO. The graph
+    has to be undirected.
+    """
+
+    def __init__(self, node):
+        super().__init__(node)
+
+    def setup(self):
+        """!Setup the state of the synchronizer, call it from the setup of subclasses."""
+        transport = self.node.transport
+        if not self.node.fifo and hasattr(transport, "fifo_links") and not transport.fifo_links(self.node):
+            raise ValueError("Synchronous rounds need FIFO links: with jitter, use fifo=True or Link(fifo=True).")
+        ## Current round, None until the node starts.
+        self.round = None
+        ## True if the node was woken up by the initializer.
+        self.initiator = False
+        # neighbor : number of markers received (the round its next messages belong to).
+        self._markers = {neighbor: 0 for neighbor in self.node.get_neighbors(id_only=True)}
+        # neighbors that did not terminate.
+        self._active = set(self._markers)
+        # round : messages sent in that round, delivered in the next one.
+        self._inbox = {}
+
+    @abstractmethod
+    def step(self, round: int, messages: list) -> bool:
+        """!Execute a round.
+
+        @param round (int): number of the round, starting from 0.
+        @param messages (list): messages sent to this node in the previous round.
+
+        @return True if the computation is terminated.
+        """
+        pass
+
+    def handle_message(self, message: Message) -> bool:
+        if self.round is None:
+            self.initiator = message.command in (Command.WAKEUP, Command.START_AT)
+            if self._run_step([]):
+                return True
+        if message.command == Command.ROUND:
+            self._markers[message.sender] += 1
+            if message.final:
+                self._active.discard(message.sender)
+        elif message.sender in self._markers:
+            self._inbox.setdefault(self._markers[message.sender], []).append(message)
+        # several rounds can end at once, e.g. after the last marker of a slow neighbor.
+        while all(self._markers[neighbor] > self.round for neighbor in self._active):
+            if self._run_step(self._inbox.pop(self.round, [])):
+                return True
+        return False
+
+    def _run_step(self, messages: list) -> bool:
+        """!Execute the next round and close it on every link to an active neighbor."""
+        self.round = 0 if self.round is None else self.round + 1
+        terminated = bool(self.step(self.round, messages))
+        ports = [self.node.local_dns[neighbor] for neighbor in self._active]
+        self.node._send_many(RoundMessage(self.round, terminated, self.node.id), ports, count=False)
+        return terminated
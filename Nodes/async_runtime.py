@@ -0,0 +1,262 @@
+import asyncio
+import socket
+import threading
+from Nodes.messages import *
+from Nodes.Nodes.Node import Node
+from Nodes.const import Command
+from Nodes.message_handler import enlarge_receive_buffer
+from Nodes.fragments import Reassembler, fragment
+from Nodes.reports import ReportAggregator
+from Nodes.faults import NodeCrash
+
+
+class _NodeEndpoint(asyncio.DatagramProtocol):
+    """!asyncio protocol that hands the datagrams received by a node to the runtime."""
+
+    def __init__(self, runtime, port: int):
+        self._runtime = runtime
+        self._port = port
+
+    def datagram_received(self, data: bytes, addr):
+        data = self._runtime.reassembler.add(data)
+        if data is not None:
+            self._runtime.deliver(self._port, data)
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable after a receiver terminated.
+        pass
+
+
+class AsyncRuntime:
+    """!Host several nodes of the network on a single asyncio event loop.
+
+    Alternative to Worker with no threads at all: the socket of every
+    node is an asyncio DatagramProtocol and received datagrams are
+    handed to Protocol.process_message directly from the event loop,
+    so the blocking main loop (Protocol.run) and the listener threads
+    are not used. Messages between hosted nodes are delivered with a
+    loop callback. Protocol classes run unchanged; threads started by
+    a protocol still work, since their sends are handed to the loop
+    thread-safely, but timers (Node.set_timer) are loop callbacks and
+    should be preferred. An ERROR sent by the initializer stops every
+    hosted node, as it stops a node process.
+
+    The client file is the same as in worker mode:
+
+        runtime = AsyncRuntime(sys.argv[1], int(sys.argv[2]), [int(p) for p in sys.argv[3:]], Shout)
+        runtime.run()
+    """
+
+    def __init__(self,
+                 hostname: str,
+                 back: int,
+                 ports: list,
+                 protocol,
+                 node_class=Node,
+                 fifo=False,
+                 protocol_kwargs: dict=None):
+        """!Store the configuration, nodes are created by run.
+
+        @param hostname (str): IP of the initalizer.
+        @param back (int): Port where the initalizer is listening for confirmation.
+        @param ports (list): Ports of the nodes hosted by this runtime.
+        @param protocol: Protocol subclass executed by every node.
+        @param node_class: Node subclass used for every node (e.g. RingNode).
+        @param fifo (bool): turn on fifo mode on every node.
+        @param protocol_kwargs (dict): extra arguments for the protocol constructor.
+
+        @return None
+        """
+        self._hostname = hostname
+        self._back = back
+        self._ports: list = ports
+        self._protocol = protocol
+        self._node_class = node_class
+        self._fifo = fifo
+        self._protocol_kwargs: dict = protocol_kwargs if protocol_kwargs else {}
+        self._loop: asyncio.AbstractEventLoop = None
+        self._loop_thread: int = None
+        self._nodes: list = []
+        self._local: dict = {} # port : hosted node
+        self._sockets: dict = {} # port : bound socket, until its endpoint is created
+        self._endpoints: dict = {} # port : asyncio transport
+        self._protocols: dict = {} # port : protocol instance
+        self._terminated: set = set()
+        self._not_setup: int = 0
+        self._done: asyncio.Future = None
+        self._reassembler = Reassembler()
+        self._reports = ReportAggregator(len(ports))
+
+    @property
+    def reassembler(self):
+        """!Return the Reassembler of the fragmented datagrams received by hosted nodes."""
+        return self._reassembler
+
+    @property
+    def reports(self):
+        """!Return the aggregator of the end of protocol reports of the hosted nodes."""
+        return self._reports
+
+    @property
+    def nodes(self):
+        """!Return the nodes hosted by this runtime."""
+        return self._nodes
+
+    @property
+    def loop(self):
+        """!Return the event loop, available while running."""
+        return self._loop
+
+    def run(self):
+        """!Create the nodes, wait for their setup and run all protocols until termination."""
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._done = self._loop.create_future()
+        self._nodes = [self._node_class(self._hostname, self._back, port, fifo=self._fifo, transport=self)
+                       for port in self._ports]
+        self._not_setup = len(self.nodes)
+        for node in self.nodes:
+            endpoint, _ = await self._loop.create_datagram_endpoint(
+                lambda port=node.port: _NodeEndpoint(self, port),
+                sock=self._sockets.pop(node.port))
+            self._endpoints[node.port] = endpoint
+        self._send_RDY()
+        try:
+            await self._done
+            if any(node.aggregate for node in self.nodes):
+                self.reports.flush()
+            emulators = [node.emulator for node in self.nodes if node.emulator is not None]
+            if emulators:
+                # delayed datagrams are handed back to the loop, that has to keep running meanwhile.
+                await self._loop.run_in_executor(None, lambda: [emulator.flush() for emulator in emulators])
+                await asyncio.sleep(0)
+        finally:
+            for endpoint in self._endpoints.values():
+                endpoint.close()
+
+    def attach(self, node: Node):
+        """!Bind the socket of a node (transport interface).
+
+        The RDY message is sent once the event loop serves the socket.
+        """
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.bind(("", node.port))
+        enlarge_receive_buffer(s)
+        node._port = s.getsockname()[1]
+        self._sockets[node.port] = s
+        self._local[node.port] = node
+
+    def _send_RDY(self):
+        """!Send RDY for the nodes that are not setup yet, again every second."""
+        pending = [node for node in self.nodes if not node.setup]
+        for node in pending:
+            node.send_RDY()
+        if pending:
+            self._loop.call_later(1.0, self._send_RDY)
+
+    def sendto(self, node: Node, data: bytes, port: int):
+        """!Deliver locally if the receiver is hosted here, use UDP otherwise (transport interface).
+
+        Can be called from any thread.
+
+        @param node (Node): sender.
+        @param data (bytes): serialized message.
+        @param port (int): port of the receiver.
+
+        @return None
+        """
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.sendto, node, data, port)
+        elif port in self._local:
+            self._loop.call_soon(self.deliver, port, data)
+        else:
+            endpoint = self._endpoints[node.port]
+            address = node.address(port)
+            for datagram in fragment(data):
+                endpoint.sendto(datagram, address)
+
+    def call_later(self, delay: float, callback, *args) -> asyncio.TimerHandle:
+        """!Run callback(*args) on the event loop after delay seconds.
+
+        Has to be called from the event loop (e.g. from handle_message).
+
+        @return handle that can be cancelled.
+        """
+        return self._loop.call_later(delay, callback, *args)
+
+    def deliver_later(self, node: Node, delay: float, message: Message):
+        """!Hand message to node after delay seconds, used by node timers (transport interface)."""
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.deliver_later, node, delay, message)
+        else:
+            self._loop.call_later(delay, self.deliver, node.port, message)
+
+    def deliver(self, port: int, data: bytes):
+        """!Hand a datagram to the protocol of the hosted node listening on port."""
+        node = self._local[port]
+        if port in self._terminated:
+            if node.reliable is not None and not node.crashed:
+                node.reliable.handle_after_termination(data)
+                self._check_done()
+            return
+        if port not in self._protocols:
+            message = setup_message(data) if not node.setup else None
+            if message is not None:
+                node.apply_setup(message)
+                node.confirm_setup()
+                self._not_setup -= 1
+                if not self._not_setup:
+                    self._start_protocols()
+            else:
+                # protocols start when all hosted nodes are setup.
+                node.insert_message(data)
+            return
+        self._process(port, data)
+
+    def _start_protocols(self):
+        """!Create the protocol of every node, then handle the messages that arrived meanwhile."""
+        for node in self.nodes:
+            self._protocols[node.port] = self._protocol(node, **self._protocol_kwargs)
+        for node in self.nodes:
+            while node.port not in self._terminated and not node.message_queue.empty():
+                self._process(node.port, node.message_queue.get())
+
+    def _process(self, port: int, data: bytes):
+        """!Run the protocol of a node on a datagram, handling termination and failures."""
+        node = self._local[port]
+        protocol = self._protocols[port]
+        try:
+            terminated = protocol.process_message(data)
+        except NodeCrash:
+            terminated = True
+        except SystemExit:
+            # ERROR from the initializer (see Protocol.process_message): the run is over for every hosted node.
+            self._abort()
+            return
+        except Exception as e:
+            error_msg = f"Fatal error in node {node.id}: {str(e)}"
+            node.send_back(TerminationMessage(Command.ERROR, error_msg, node.id))
+            terminated = True
+        if terminated:
+            self._terminated.add(port)
+            protocol.stop()
+            self._check_done()
+
+    def _abort(self):
+        """!Terminate all hosted nodes without their protocol cleanup, as a node process exits on ERROR."""
+        for node in self.nodes:
+            if node.port not in self._terminated:
+                self._terminated.add(node.port)
+                node.cleanup()
+        if not self._done.done():
+            self._done.set_result(None)
+
+    def _check_done(self):
+        """!Stop when every protocol terminated and every reliable channel is idle."""
+        if len(self._terminated) < len(self.nodes) or self._done.done():
+            return
+        if all(node.reliable is None or node.crashed or node.reliable.idle() for node in self.nodes):
+            self._done.set_result(None)
@@ -1,5 +1,6 @@
 from Nodes.messages import Message
-from Nodes.message_handler import MessageListener
+from Nodes.message_handler import MessageListener, Mailbox, Mailboxes
+from Nodes.fragments import fragment
 import socket
 import queue
 
@@ -9,11 +10,15 @@ class ComunicationManager:
     
     def __init__(self):
         # Queue used by the listener to add incoming messages.
-        self.message_queue: queue.Queue = queue.Queue()
+        self.message_queue: Mailbox = Mailbox()
         # Message listener that handles the message queue.
         self.listener: MessageListener = None        
+        # Long-lived socket used to send datagrams, created on first use.
+        self._out_socket: socket.socket = None
+        # Pre-resolved addresses (port : (IP, port)).
+        self._addresses: dict = {}
     
-    def receive_message(self, timeout: float = None, Q: queue.Queue = None) -> Message:
+    def receive_message(self, timeout: float = None, Q: Mailbox = None) -> Message:
         """!Get a message from the queue.
         
         @param timeout (int): How long to wait for the message.
@@ -26,11 +31,88 @@ class ComunicationManager:
             return Q.get(timeout=timeout)
         except queue.Empty:
             return None
+
+    def receive(self, command, timeout: float = None) -> Message:
+        """!Get a message with the given command, from its own mailbox.
+
+        The message queue must be a Mailboxes object with a route for the
+        command, filled by a listener that decodes messages.
+
+        @param command (str): command of the message, e.g. Command.END_PROTOCOL.
+        @param timeout (int): How long to wait for the message.
+
+        @return message (Message): The message if one was received, None if timeout occured.
+        """
+        return self.receive_message(timeout, self.message_queue.mailbox(command))
+
+    def route(self, *commands) -> Mailbox:
+        """!Give the messages with the given commands their own mailbox.
+
+        The message queue becomes a Mailboxes object on the first call, which
+        must happen before the listener starts. Messages received with
+        receive_message are then decoded too.
+
+        @return the mailbox of the commands.
+        """
+        if not isinstance(self.message_queue, Mailboxes):
+            self.message_queue = Mailboxes()
+        return self.message_queue.route(*commands)
+
+    def receive_batch(self, timeout: float = None) -> list:
+        """!Get all the messages in the queue, waiting for at least one.
+
+        @param timeout (int): How long to wait for the first message.
+
+        @return messages (list): The messages received, empty if timeout occured.
+        """
+        return self.message_queue.get_batch(timeout)
         
     def insert_message(self, data):
         """!Primitive used to place manually a message in the message queue of the listener."""
-        self.listener.message_queue.put(data)
+        self.message_queue.put(data)
         
-    def start_listener(self, s: socket.socket, message_queue: queue.Queue):
-        self.listener = MessageListener(s, message_queue)
+    def start_listener(self, s: socket.socket, message_queue: Mailbox, decode: bool = False):
+        # routing needs the command of every message.
+        decode = decode or isinstance(message_queue, Mailboxes)
+        self.listener = MessageListener(s, message_queue, decode)
         self.listener.start()
+
+    def address(self, port: int) -> tuple:
+        """!Return the (IP, port) address of a local port, resolving localhost only once."""
+        address = self._addresses.get(port)
+        if address is None:
+            address = (localhost(), port)
+            self._addresses[port] = address
+        return address
+
+    def send_datagram(self, data: bytes, port: int):
+        """!Send raw data to the given local port using the persistent socket.
+
+        Data larger than a datagram is sent in fragments.
+
+        @param data (bytes): serialized message.
+        @param port (int): target port.
+
+        @return None
+        """
+        if self._out_socket is None:
+            self._out_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        address = self.address(port)
+        for datagram in fragment(data):
+            self._out_socket.sendto(datagram, address)
+
+    def close_sender(self):
+        """!Close the socket used to send datagrams."""
+        if self._out_socket is not None:
+            self._out_socket.close()
+            self._out_socket = None
+
+
+_localhost: str = None
+
+def localhost() -> str:
+    """!Return the IP address of localhost, resolved on first call."""
+    global _localhost
+    if _localhost is None:
+        _localhost = socket.gethostbyname("localhost")
+    return _localhost
@@ -7,6 +7,7 @@ class Command(str, Enum):
     START_AT = "START_AT"
     READY = "RDY"
     SETUP = "SETUP"
+    SETUP_ACK = "SETUP_ACK"
     START_PROTOCOL = "SOP"
     COUNT = "COUNT"
     INFORM = "I"
@@ -29,6 +30,12 @@ class Command(str, Enum):
     RELEASE = "RELEASE"
     ERROR = "ERROR"
     END_PROTOCOL = "EOP"
+    TIMER = "TIMER"
+    RESET = "RESET"
+    SHUTDOWN = "SHUTDOWN"
+    LAUNCH = "LAUNCH"
+    ROUND = "ROUND"
+    FAULT = "FAULT"
 
 
 class State(str, Enum):
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from Nodes.links import Link, LinkState
+
+
+class DelayQueue(threading.Thread):
+    """!Thread that sends the datagrams delayed by link emulation when they are due.
+
+    A single queue serves every node of the process: datagrams are kept
+    in a heap ordered by due time, and the thread sleeps until the next
+    one, so senders never block.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._events: list = []
+        self._counter = itertools.count()
+        self._ready = threading.Condition(threading.Lock())
+        self.daemon = True  # Thread will exit when main program exits
+
+    def put(self, due: float, node, data: bytes, port: int):
+        """!Send data from node to port at the monotonic time due."""
+        with self._ready:
+            event = (due, next(self._counter), node, data, port)
+            heapq.heappush(self._events, event)
+            # wake up the thread only if the new datagram is the next one.
+            if self._events[0] is event:
+                self._ready.notify()
+
+    def run(self):
+        while True:
+            with self._ready:
+                while not self._events or self._events[0][0] > time.monotonic():
+                    self._ready.wait(self._events[0][0] - time.monotonic() if self._events else None)
+                _, _, node, data, port = heapq.heappop(self._events)
+            try:
+                node._output(data, port)
+            except OSError:
+                pass # the sender closed its socket meanwhile
+            finally:
+                node.emulator.sent()
+
+
+_delay_queue: DelayQueue = None
+_delay_queue_lock = threading.Lock()
+
+def delay_queue() -> DelayQueue:
+    """!Return the delay queue of the process, started on first use."""
+    global _delay_queue
+    with _delay_queue_lock:
+        if _delay_queue is None:
+            _delay_queue = DelayQueue()
+            _delay_queue.start()
+    return _delay_queue
+
+
+class LinkEmulator:
+    """!Emulation of lossy, slow links on the real network, on the sender side.
+
+    Configured by the initializer from the attributes of the edges of the
+    graph (see Nodes.links.Link): every datagram sent on an emulated link
+    can be lost or duplicated, and is handed to the delay queue of the
+    process until its arrival time, computed from latency (seconds),
+    jitter (seconds, letting datagrams overtake each other) and bandwidth
+    (bytes per second). Datagrams to other ports are sent as usual.
+    """
+
+    def __init__(self, node, links: dict):
+        """!
+        @param node (Node): sender.
+        @param links (dict): port of the neighbor : Link.
+        """
+        self._node = node
+        self._states: dict = {port: LinkState(link) for port, link in links.items()}
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # datagrams waiting in the delay queue.
+        self._pending: int = 0
+
+    def emulates(self, port: int) -> bool:
+        """!Return True if the link towards port is emulated."""
+        return port in self._states
+
+    def send(self, data: bytes, port: int):
+        """!Send data on the emulated link towards port."""
+        state = self._states[port]
+        # threads of the protocol and of the reliable channel can send at the same time.
+        with self._lock:
+            now = time.monotonic()
+            arrivals = [state.arrival(now, len(data), self._rng) for _ in range(state.link.copies(self._rng))]
+            self._pending += sum(arrival > now for arrival in arrivals)
+        for arrival in arrivals:
+            if arrival <= now:
+                self._node._output(data, port)
+            else:
+                delay_queue().put(arrival, self._node, data, port)
+
+    def sent(self):
+        """!Called by the delay queue once a delayed datagram has been sent."""
+        with self._idle:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+    def flush(self, timeout: float=None) -> bool:
+        """!Wait until the delayed datagrams of the node have been sent.
+
+        Processes call it before exiting, otherwise datagrams still in
+        transit on slow links would be lost with the delay queue.
+
+        @return False on timeout.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+
+def link_settings(link: dict) -> Link:
+    """!Return the Link described by the settings sent in a SetupMessage (numbers, times in seconds)."""
+    return Link(link.get("latency", 0.0), link.get("jitter"), link.get("bandwidth"),
+                link.get("fifo", False), link.get("loss", 0.0), link.get("duplicate", 0.0))
@@ -0,0 +1,239 @@
+import threading
+import time
+from Nodes.messages import FaultMessage
+
+
+class NodeCrash(Exception):
+    """!Raised when a node crashes: the runtime stops its protocol without end of protocol reports."""
+
+
+class Crash:
+    """!Crash-stop failure of a node, at a given time or after a given number of messages."""
+
+    def __init__(self, node: int, at: float=None, after: int=None):
+        """!
+        @param node (int): ID of the node.
+        @param at (float): time of the crash, measured from the wake up of the network.
+        @param after (int): crash instead when the node already handled this many
+            messages from its neighbors (0 to crash as soon as the first one arrives).
+        """
+        assert (at is None) != (after is None), "A crash needs either at or after."
+        self.node: int = node
+        self.at: float = at
+        self.after: int = after
+
+    def __repr__(self):
+        when = f"at={self.at}" if self.at is not None else f"after={self.after}"
+        return f"Crash({self.node}, {when})"
+
+
+class Partition:
+    """!Partition of the network: links between A and B drop every datagram during an interval."""
+
+    def __init__(self, A, B=None, start: float=0.0, end: float=None):
+        """!
+        @param A (iterable): IDs of the nodes on one side.
+        @param B (iterable): IDs of the nodes on the other side, None for all the other nodes.
+        @param start (float): beginning of the partition, measured from the wake up of the network.
+        @param end (float): end of the partition, None if it never heals.
+        """
+        self.A: set = set(A)
+        self.B: set = None if B is None else set(B)
+        self.start: float = start
+        self.end: float = end
+
+    def __repr__(self):
+        return f"Partition({sorted(self.A)}, {None if self.B is None else sorted(self.B)}, {self.start}, {self.end})"
+
+
+class FaultPlan:
+    """!Declarative list of the faults to inject during a run.
+
+    A plan is built by chaining crash() and partition(), or from a list
+    of dicts (e.g. loaded from a JSON file):
+
+        plan = FaultPlan().crash(7, after=0).partition([0, 1, 2], start=0.5, end=2.0)
+        plan = FaultPlan([{"crash": 7, "at": 1.0}, {"partition": [[0, 1], [2, 3]], "start": 0.5}])
+
+    Times are in seconds (units of virtual time in the simulator) since the
+    network was woken up. Faults are identified by their position in the plan.
+    """
+
+    def __init__(self, faults: list=None):
+        """!
+        @param faults (list): Crash and Partition objects, or dicts describing them.
+        """
+        self._faults: list = []
+        for fault in faults or []:
+            self._faults.append(self._from_dict(fault) if isinstance(fault, dict) else fault)
+
+    @staticmethod
+    def _from_dict(fault: dict):
+        if "crash" in fault:
+            return Crash(fault["crash"], fault.get("at"), fault.get("after"))
+        sides = fault["partition"]
+        return Partition(sides[0], sides[1] if len(sides) > 1 else None,
+                         fault.get("start", 0.0), fault.get("end"))
+
+    @property
+    def faults(self):
+        """!Return the faults of the plan."""
+        return self._faults
+
+    def __len__(self):
+        return len(self._faults)
+
+    def crash(self, node: int, at: float=None, after: int=None):
+        """!Add the crash of node (see Crash) and return the plan."""
+        self._faults.append(Crash(node, at, after))
+        return self
+
+    def partition(self, A, B=None, start: float=0.0, end: float=None):
+        """!Add a partition between A and B (see Partition) and return the plan."""
+        self._faults.append(Partition(A, B, start, end))
+        return self
+
+    def crash_after(self, node: int) -> list:
+        """!Return [fault, messages] for the first crash of node triggered by messages, None if there is none.
+
+        Sent to the node with its setup, that counts its messages by itself.
+        """
+        for index, fault in enumerate(self.faults):
+            if isinstance(fault, Crash) and fault.node == node and fault.after is not None:
+                return [index, fault.after]
+        return None
+
+    def events(self, nodes, neighbors) -> list:
+        """!Return the control messages that carry out the timed faults, sorted by time.
+
+        @param nodes (iterable): IDs of the nodes of the network.
+        @param neighbors (callable): returns the IDs of the neighbors of a node.
+
+        @return list of (time, fault, node ID, FaultMessage).
+        """
+        events = []
+        for index, fault in enumerate(self.faults):
+            if isinstance(fault, Crash):
+                if fault.at is not None:
+                    events.append((fault.at, index, fault.node, FaultMessage(index, "crash")))
+                continue
+            B = fault.B if fault.B is not None else set(nodes) - fault.A
+            # only nodes with a neighbor on the other side are told, with the neighbors to cut off.
+            for side, other in ((fault.A, B), (B, fault.A)):
+                for node in side:
+                    cut = [v for v in neighbors(node) if v in other]
+                    if not cut:
+                        continue
+                    events.append((fault.start, index, node, FaultMessage(index, "partition", cut)))
+                    if fault.end is not None:
+                        events.append((fault.end, index, node, FaultMessage(index, "heal", cut)))
+        events.sort(key=lambda event: event[0])
+        return events
+
+
+class FaultInjector:
+    """!Faults of a single node: crash and links cut by partitions.
+
+    Created by the node when the initializer plans a crash for it or sends
+    it a fault. Blocked links drop datagrams below the reliable channel,
+    like a real partition, so frames are retransmitted once it heals.
+    A crashed node drops everything it would send and its protocol stops.
+    """
+
+    def __init__(self, node, crash: list=None):
+        """!
+        @param node (Node): owner of the faults.
+        @param crash (list): [fault, messages] of a crash triggered by messages, None if not planned.
+        """
+        self._node = node
+        self._crash: list = crash
+        self._received: int = 0
+        ## True once the node crashed.
+        self.crashed: bool = False
+        # fault : ports of the neighbors cut off by that partition.
+        self._cuts: dict = {}
+        # union of the cuts, replaced at every change (read by other threads).
+        self._blocked: frozenset = frozenset()
+
+    def drops(self, port: int) -> bool:
+        """!Return True if a datagram to port has to be dropped."""
+        return self.crashed or port in self._blocked
+
+    def received(self):
+        """!Count a message from a neighbor, or crash if the node already handled the planned number."""
+        if self._crash is not None and self._received == self._crash[1]:
+            self.crash(self._crash[0])
+        self._received += 1
+
+    def apply(self, message: FaultMessage):
+        """!Carry out a fault sent by the initializer."""
+        if message.action == "crash":
+            self.crash(message.fault)
+        if message.action == "partition":
+            self._cuts[message.fault] = {self._node.local_dns[neighbor] for neighbor in message.neighbors}
+        elif message.action == "heal":
+            self._cuts.pop(message.fault, None)
+        # overlapping partitions keep a link cut until all of them healed.
+        self._blocked = frozenset().union(*self._cuts.values())
+
+    def crash(self, fault: int):
+        """!Report the crash to the initializer and stop the node.
+
+        The report carries the number of messages sent so far, that
+        stands for the COUNT_M message the node is not going to send.
+
+        @raise NodeCrash always.
+        """
+        node = self._node
+        node.send_back(FaultMessage(fault, "crash", counter=node.total_messages, sender=node.id))
+        self.crashed = True
+        if node.aggregate:
+            node.transport.reports.crashed()
+        raise NodeCrash(f"Node {node.id} crashed (fault {fault}).")
+
+
+class FaultScheduler(threading.Thread):
+    """!Thread of the initializer that sends the timed faults of a plan when they are due."""
+
+    def __init__(self, events: list, epoch: float, send, record):
+        """!
+        @param events (list): (time, fault, node ID, FaultMessage), see FaultPlan.events.
+        @param epoch (float): monotonic time when the network was woken up.
+        @param send (callable): send(node ID, data) delivers a serialized control message.
+        @param record (callable): record(fault, action) is called for every partition and heal.
+        """
+        super().__init__()
+        self._events: list = events
+        self._epoch: float = epoch
+        self._send = send
+        self._record = record
+        self._next: int = 0
+        self._recorded: set = set()
+        self._stopped = threading.Event()
+        self.daemon = True  # Thread will exit when main program exits
+
+    def start(self):
+        """!Send the faults already due from the calling thread, e.g. before the wake up, then start the thread."""
+        while self._next < len(self._events) and self._epoch + self._events[self._next][0] <= time.monotonic():
+            self._fire(self._events[self._next])
+        super().start()
+
+    def run(self):
+        while self._next < len(self._events):
+            event = self._events[self._next]
+            if self._stopped.wait(max(0.0, self._epoch + event[0] - time.monotonic())):
+                return
+            self._fire(event)
+
+    def _fire(self, event):
+        _, fault, node, message = event
+        self._next += 1
+        self._send(node, message.serialize())
+        # crashes are recorded when the node reports them, partitions once per change.
+        if message.action != "crash" and (fault, message.action) not in self._recorded:
+            self._recorded.add((fault, message.action))
+            self._record(fault, message.action)
+
+    def stop(self):
+        """!Stop sending faults."""
+        self._stopped.set()
@@ -0,0 +1,98 @@
+from Nodes.messages import Message
+
+## Default maximum number of early messages held by a node.
+DEFAULT_CAPACITY = 100000
+
+
+class ReorderBuffer:
+    """!Per-sender reorder buffer used by nodes in fifo mode.
+
+    Messages that arrive before their predecessors on the same link
+    are held, keyed by sequence number, and released as soon as the
+    gap is filled. Messages are decoded once and never requeued.
+    Messages already delivered (sequence number lower than expected)
+    are discarded.
+    """
+
+    def __init__(self, capacity: int=DEFAULT_CAPACITY):
+        """!
+        @param capacity (int): maximum number of messages held, over all senders.
+            A RuntimeError is raised when it would be exceeded.
+        """
+        self._capacity: int = capacity
+        self._expected: dict = {} # sender : next sequence number
+        self._held: dict = {} # sender : {sequence number : message}
+        self._depth: int = 0
+        self._max_depth: int = 0
+        self._reordered: int = 0
+        self._discarded: int = 0
+
+    @property
+    def capacity(self):
+        """!Return the maximum number of messages that can be held."""
+        return self._capacity
+
+    @property
+    def depth(self):
+        """!Return the number of messages currently held."""
+        return self._depth
+
+    @property
+    def max_depth(self):
+        """!Return the largest number of messages held at the same time."""
+        return self._max_depth
+
+    @property
+    def reordered(self):
+        """!Return how many messages arrived out of order."""
+        return self._reordered
+
+    @property
+    def discarded(self):
+        """!Return how many old (duplicate) messages were discarded."""
+        return self._discarded
+
+    def expected(self, sender) -> int:
+        """!Return the next sequence number expected from sender."""
+        return self._expected.get(sender, 0)
+
+    def held(self, sender) -> int:
+        """!Return the number of messages from sender currently held."""
+        return len(self._held.get(sender, ()))
+
+    def push(self, message: Message) -> list:
+        """!Add a received message.
+
+        @param message (Message): message with sender and sequence number.
+
+        @return list of messages that can be handled, in order (empty if message is early).
+        """
+        sender = message.sender
+        expected = self._expected.get(sender, 0)
+        seq_number = message.seq_number
+        if seq_number != expected:
+            if seq_number < expected:
+                self._discarded += 1
+                return []
+            held = self._held.setdefault(sender, {})
+            if seq_number not in held:
+                if self._depth >= self._capacity:
+                    raise RuntimeError(f"Reorder buffer full ({self._capacity} messages), "
+                                       f"message {expected} from {sender} never arrived.")
+                held[seq_number] = message
+                self._reordered += 1
+                self._depth += 1
+                self._max_depth = max(self._max_depth, self._depth)
+            else:
+                self._discarded += 1
+            return []
+        ready = [message]
+        expected += 1
+        held = self._held.get(sender)
+        if held:
+            while expected in held:
+                ready.append(held.pop(expected))
+                expected += 1
+            self._depth -= len(ready) - 1
+        self._expected[sender] = expected
+        return ready
@@ -0,0 +1,183 @@
+import ast
+import gc
+import importlib
+import os
+import random
+import runpy
+import signal
+import socket
+import subprocess as sp
+import sys
+import time
+import traceback
+from Nodes.messages import *
+from Nodes.const import Command
+from Nodes.fragments import Reassembler
+from Nodes.message_handler import DATAGRAM_SIZE
+
+
+def preload(client: str):
+    """!Execute the top-level imports of the client file, without running it.
+
+    Imports that fail are reported and left to the client, which will
+    raise the same error when it runs.
+    """
+    with open(client) as f:
+        tree = ast.parse(f.read(), client)
+    imports = [statement for statement in tree.body if isinstance(statement, (ast.Import, ast.ImportFrom))]
+    try:
+        exec(compile(ast.Module(body=imports, type_ignores=[]), client, "exec"), {"__name__": "__preload__"})
+    except Exception as e:
+        print(f"Could not preload the imports of {client}: {e}")
+
+
+def run_client(client: str, hostname: str, back: int, ports: list):
+    """!Body of a forked node process: run the client file as if started from the command line."""
+    random.seed() # otherwise every child would draw the same numbers
+    sys.argv = [client, hostname, str(back)] + ports
+    code = 0
+    try:
+        runpy.run_path(client, run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # daemon threads (listeners) are not joined, like at the end of a normal process.
+    os._exit(code)
+
+
+class ForkServer:
+    """!Template process that forks node processes with the framework already imported.
+
+    Used by the initializer when fork=True. The template imports the
+    framework and the modules imported by the client file once, then
+    forks a child for every shard: the child runs the client file with
+    the usual arguments (host, port of the initializer, ports of the
+    shard), so client files need no change. Startup of a node costs a
+    fork instead of an interpreter startup, and the imported modules are
+    shared copy-on-write. Available on platforms with os.fork.
+
+    The ForkServer object lives in the initializer and talks to the
+    template through the initializer socket.
+    """
+
+    def __init__(self, initializer, client: str, timeout: float=30.0):
+        """!Start the template process and wait until it is ready.
+
+        @param initializer (Initializer): owner, whose socket receives the answers of the template.
+        @param client (str): path of the client file.
+        @param timeout (float): seconds to wait for the template and its answers.
+
+        @return None
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("fork=True needs os.fork, not available on this platform.")
+        self._initializer = initializer
+        self._timeout: float = timeout
+        self._process = sp.Popen([sys.executable, "-m", "Nodes.forkserver",
+                                  "localhost", str(initializer.PORT), client])
+        message = self._wait(lambda message: message.command == Command.READY
+                             and message.group == self._process.pid)
+        self._control: int = message.port
+
+    @property
+    def process(self):
+        """!Return the Popen object of the template process."""
+        return self._process
+
+    def _wait(self, accept):
+        """!Return the first message accepted, keeping the others for the initializer."""
+        deadline = time.monotonic() + self._timeout
+        others = []
+        try:
+            while time.monotonic() < deadline:
+                # decoded by the listener of the initializer.
+                message = self._initializer.receive_message(max(0, deadline - time.monotonic()))
+                if message is None: continue
+                if not isinstance(message, bytes) and accept(message):
+                    return message
+                others.append(message)
+            raise RuntimeError("The fork server did not answer in time.")
+        finally:
+            self._initializer.message_queue.put_front(others)
+
+    def launch(self, shards: list) -> dict:
+        """!Fork a node process for each shard.
+
+        @param shards (list): ports of the nodes hosted by each process.
+
+        @return dict shard index : process ID.
+        """
+        for index, shard in enumerate(shards):
+            message = LaunchMessage([str(port) for port in shard], index)
+            self._initializer.send_datagram(message.serialize(), self._control)
+        pids = {}
+        while len(pids) < len(shards):
+            message = self._wait(lambda message: message.command == Command.LAUNCH)
+            pids[message.shard] = message.pid
+        return pids
+
+    def shutdown(self):
+        """!Ask the template to exit, once its children exited (or were terminated)."""
+        self._initializer.send_datagram(Message(Command.SHUTDOWN).serialize(), self._control)
+
+
+def serve(hostname: str, back: int, client: str, close_timeout: float=10.0):
+    """!Main loop of the template process."""
+    # imported once by the template, shared by every forked node (single
+    # nodes, workers and async runtimes): preloaded, not used here.
+    for module in ("Nodes.Nodes.Node", "Nodes.worker", "Nodes.async_runtime"):
+        importlib.import_module(module)
+    client = os.path.abspath(client)
+    # like "python client.py", modules next to the client file can be imported.
+    sys.path.insert(0, os.path.dirname(client))
+    preload(client)
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("", 0))
+    s.settimeout(1.0)
+    address = (socket.gethostbyname("localhost"), back)
+    s.sendto(ReadyMessage(s.getsockname()[1], os.getpid()).serialize(), address)
+    # objects created so far are never collected, so the pages holding them stay shared.
+    gc.freeze()
+    reassembler = Reassembler()
+    children = set()
+    shutdown_at = None
+    next_reap = time.monotonic()
+    while shutdown_at is None or (children and time.monotonic() < shutdown_at):
+        try:
+            data = reassembler.add(s.recv(DATAGRAM_SIZE))
+        except socket.timeout:
+            data = None
+        if shutdown_at is not None or time.monotonic() >= next_reap:
+            # reap the children that exited.
+            next_reap = time.monotonic() + 1.0
+            for pid in list(children):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    children.discard(pid)
+        if data is None:
+            continue
+        message = Message.deserialize(data)
+        if message.command == Command.SHUTDOWN:
+            shutdown_at = time.monotonic() + close_timeout
+            s.settimeout(0.1)
+        elif message.command == Command.LAUNCH and shutdown_at is None:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                s.close()
+                run_client(client, hostname, back, message.args)
+            children.add(pid)
+            s.sendto(LaunchMessage(message.args, message.shard, pid).serialize(), address)
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+    s.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        raise ValueError('Please provide HOST, initializer PORT and CLIENT path.')
+    serve(sys.argv[1], int(sys.argv[2]), sys.argv[3])
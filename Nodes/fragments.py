@@ -0,0 +1,70 @@
+# Messages larger than a UDP datagram (e.g. the setup of a node with
+# thousands of neighbors) are split in fragments, each one starting with
+# its own magic byte, the ID of the message and its position. Listeners
+# reassemble them before queueing the message, so fragmentation is
+# invisible to nodes and protocols. A message with a lost fragment is
+# lost as a whole, like a lost datagram.
+import os
+import random
+import struct
+
+FRAGMENT_MAGIC = 0xB5
+
+## Largest datagram sent, bigger messages are fragmented.
+MAX_DATAGRAM = 65000
+## Incomplete messages kept by a Reassembler, the oldest ones are dropped first.
+MAX_PENDING = 1024
+
+# magic, message ID, index of the fragment, number of fragments
+_HEADER = struct.Struct("<BQHH")
+_CHUNK = MAX_DATAGRAM - _HEADER.size
+# protocols and pools reseed the global generator with the same seeds in
+# every process, message IDs come from a generator of their own, reseeded
+# in the processes forked by the fork server.
+_ids = random.Random(os.urandom(16))
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _ids.seed(os.urandom(16)))
+
+
+def fragment(data: bytes) -> list:
+    """!Return the datagrams needed to send data: data itself if it fits in one.
+
+    @param data (bytes): serialized message.
+
+    @return list of datagrams.
+    """
+    if len(data) <= MAX_DATAGRAM:
+        return [data]
+    count = (len(data) + _CHUNK - 1) // _CHUNK
+    if count > 0xFFFF:
+        raise ValueError(f"Message of {len(data)} bytes is too large to be sent.")
+    message_id = _ids.getrandbits(64)
+    return [_HEADER.pack(FRAGMENT_MAGIC, message_id, i, count) + data[i*_CHUNK:(i+1)*_CHUNK]
+            for i in range(count)]
+
+
+class Reassembler:
+    """!Rebuild fragmented messages from their datagrams."""
+
+    def __init__(self):
+        # message ID : {index : chunk}
+        self._pending: dict = {}
+
+    def add(self, data: bytes):
+        """!Handle a received datagram.
+
+        @return the complete message, or None if data is a fragment of an incomplete one.
+        """
+        if not data or data[0] != FRAGMENT_MAGIC:
+            return data
+        _, message_id, index, count = _HEADER.unpack_from(data)
+        chunks = self._pending.get(message_id)
+        if chunks is None:
+            if len(self._pending) >= MAX_PENDING:
+                del self._pending[next(iter(self._pending))]
+            chunks = self._pending[message_id] = {}
+        chunks[index] = data[_HEADER.size:]
+        if len(chunks) < count:
+            return None
+        del self._pending[message_id]
+        return b"".join(chunks[i] for i in range(count))
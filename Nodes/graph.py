@@ -0,0 +1,419 @@
+import os
+import warnings
+import numpy as np
+
+## Bytes of a text edge list parsed at once by read_edges.
+CHUNK_SIZE = 1 << 24
+## Separators accepted in text edge lists, besides whitespace: "[1,2]", "(1, 2)", "1;2".
+_SEPARATORS = bytes.maketrans(b"[](),;", b"      ")
+
+
+class CSRGraph:
+    """!Compact adjacency of a graph, in compressed sparse row (CSR) form.
+
+    Nodes are identified by their position 0..n-1; the neighbors of the
+    node in position i are neighbors[offsets[i]:offsets[i+1]]. For
+    undirected graphs every edge is stored in both directions, for
+    directed graphs only towards the successor. Self loops are dropped,
+    since a node never sends messages to itself through its local dns.
+    The IDs of the nodes (as seen by the protocols) are ids[i], the
+    position itself by default. Weighted graphs keep the weight of each
+    stored edge in weights, aligned with neighbors.
+
+    A graph with a million edges takes a few megabytes, against the
+    gigabytes of the equivalent networkx object.
+    """
+
+    def __init__(self, offsets, neighbors, ids=None, directed: bool=False, weights=None):
+        """!
+        @param offsets (array): n+1 non decreasing indexes in neighbors.
+        @param neighbors (array): positions of the neighbors of every node, one row after the other.
+        @param ids (list): ID of the node in each position, None for IDs 0..n-1.
+        @param directed (bool): True if neighbors are only the successors of each node.
+        @param weights (array): weight of every edge in neighbors, None for unweighted graphs.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        neighbors = np.asarray(neighbors, dtype=np.int64)
+        if weights is not None:
+            weights = np.asarray(weights)
+            if len(weights) != len(neighbors):
+                raise ValueError(f"{len(weights)} weights given for {len(neighbors)} edges.")
+        rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        loops = rows == neighbors
+        if loops.any():
+            neighbors = neighbors[~loops]
+            if weights is not None:
+                weights = weights[~loops]
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(rows[~loops], minlength=len(offsets) - 1))))
+        self._offsets: np.ndarray = offsets
+        self._neighbors: np.ndarray = neighbors
+        self._weights: np.ndarray = weights
+        self._directed: bool = directed
+        self._ids: np.ndarray = None
+        if isinstance(ids, range) or (isinstance(ids, np.ndarray) and ids.dtype.kind in "iu"):
+            self._ids = np.asarray(ids, dtype=np.int64)
+        elif ids is not None:
+            self._ids = np.empty(len(ids), dtype=object)
+            for i, node in enumerate(ids): # tuples (e.g. grid graphs) must not become rows
+                self._ids[i] = node
+            if all(isinstance(node, int) for node in ids):
+                self._ids = self._ids.astype(np.int64)
+        self._transpose = None
+
+    @classmethod
+    def from_edges(cls, sources, targets, n: int=None, directed: bool=False, ids=None, weights=None):
+        """!Build the graph from two arrays of edge endpoints (positions).
+
+        Duplicate edges and self loops are dropped (a duplicate keeps the
+        weight of its first occurrence), undirected edges are stored in both directions.
+
+        @param n (int): number of nodes, by default the highest position plus one.
+        @param weights (array): weight of every edge, None for unweighted graphs.
+        """
+        sources = np.asarray(sources, dtype=np.int64).ravel()
+        targets = np.asarray(targets, dtype=np.int64).ravel()
+        if n is None:
+            n = int(max(sources.max(), targets.max())) + 1 if len(sources) else 0
+        if weights is not None:
+            weights = np.asarray(weights).ravel()
+        if not directed:
+            sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+            if weights is not None:
+                weights = np.concatenate((weights, weights))
+        keep = sources != targets
+        # sorted by source, then target (a plain sort is much faster than np.unique on large arrays)
+        edges = sources[keep] * n + targets[keep]
+        if weights is None:
+            edges.sort()
+        else:
+            order = np.argsort(edges, kind="stable")
+            edges, weights = edges[order], weights[keep][order]
+        first = np.ones(len(edges), dtype=bool)
+        first[1:] = edges[1:] != edges[:-1]
+        edges = edges[first]
+        if weights is not None:
+            weights = weights[first]
+        sources, targets = edges // n, edges % n
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=n))))
+        return cls(offsets, targets, ids, directed, weights)
+
+    @classmethod
+    def from_sparse(cls, matrix, directed: bool=False):
+        """!Build the graph from a scipy sparse adjacency matrix (nonzero entries are edges)."""
+        coo = matrix.tocoo()
+        nonzero = coo.data != 0
+        return cls.from_edges(coo.row[nonzero], coo.col[nonzero], matrix.shape[0], directed)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """!Build the graph from a networkx graph, keeping its node IDs and their order."""
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        neighbors = []
+        offsets = [0]
+        for node in nodes:
+            # successors for directed graphs, like the local dns built from G.edges(node).
+            neighbors.extend(index[v] for v in G.adj[node])
+            offsets.append(len(neighbors))
+        return cls(offsets, neighbors, nodes, G.is_directed())
+
+    def number_of_nodes(self) -> int:
+        return len(self._offsets) - 1
+
+    def number_of_edges(self) -> int:
+        """!Return the number of edges (each undirected edge counted once)."""
+        stored = len(self._neighbors)
+        return stored if self._directed else stored // 2
+
+    def is_directed(self) -> bool:
+        return self._directed
+
+    @property
+    def offsets(self):
+        """!Return the offsets of the rows of each node in neighbors."""
+        return self._offsets
+
+    @property
+    def neighbors(self):
+        """!Return the positions of the neighbors of every node, one row after the other."""
+        return self._neighbors
+
+    @property
+    def weights(self):
+        """!Return the weights of the edges in neighbors, None if the graph is unweighted."""
+        return self._weights
+
+    @property
+    def degrees(self):
+        """!Return the number of neighbors (successors) of every node."""
+        return np.diff(self._offsets)
+
+    def nodes(self) -> list:
+        """!Return the IDs of the nodes, in position order."""
+        if self._ids is None:
+            return list(range(self.number_of_nodes()))
+        return self._ids.tolist()
+
+    def ids(self, positions) -> list:
+        """!Return the IDs of the nodes in the given positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self._ids is None:
+            return positions.tolist()
+        return self._ids[positions].tolist()
+
+    def row(self, position: int) -> np.ndarray:
+        """!Return the positions of the neighbors (successors) of a node."""
+        return self._neighbors[self._offsets[position]:self._offsets[position + 1]]
+
+    def transpose(self):
+        """!Return the graph with reversed edges (the graph itself if undirected)."""
+        if not self._directed:
+            return self
+        if self._transpose is None:
+            sources = np.repeat(np.arange(self.number_of_nodes()), self.degrees)
+            self._transpose = CSRGraph.from_edges(self._neighbors, sources, self.number_of_nodes(),
+                                                  directed=True, ids=None if self._ids is None else self.nodes(),
+                                                  weights=self._weights)
+        return self._transpose
+
+    def to_networkx(self):
+        """!Return the equivalent networkx graph (e.g. for the visualizer)."""
+        import networkx as nx
+        G = nx.DiGraph() if self._directed else nx.Graph()
+        nodes = self.nodes()
+        G.add_nodes_from(nodes)
+        sources = np.repeat(np.arange(self.number_of_nodes()), self.degrees)
+        if self._weights is None:
+            G.add_edges_from(zip(self.ids(sources), self.ids(self._neighbors)))
+        else:
+            G.add_weighted_edges_from(zip(self.ids(sources), self.ids(self._neighbors), self._weights.tolist()))
+        return G
+
+
+def _parse(data: bytes, dtype, columns: int, line: int, file) -> np.ndarray:
+    """!Return the numbers of a chunk of text edge list, in order.
+
+    Every line that is not blank must hold columns values: the values of
+    each line are counted from the positions of the tokens, without
+    splitting the chunk in lines.
+
+    @param line (int): number of the first line of the chunk in file, for errors.
+    """
+    data = data.translate(_SEPARATORS)
+    text = np.frombuffer(data, dtype=np.uint8)
+    # spaces, tabs, newlines and the other control characters separate values.
+    blank = text <= 32
+    tokens = np.flatnonzero(~blank & np.concatenate(([True], blank[:-1])))
+    # tokens before the end of each line, the last line may not end with a newline.
+    ends = np.searchsorted(tokens, np.flatnonzero(text == ord("\n")))
+    counts = np.diff(np.concatenate(([0], ends, [len(tokens)])))
+    wrong = np.flatnonzero((counts != 0) & (counts != columns))
+    if len(wrong):
+        raise ValueError(f"Malformed edge list {file}: line {line + int(wrong[0])} has "
+                         f"{int(counts[wrong[0]])} values instead of {columns}.")
+    try:
+        with warnings.catch_warnings():
+            # older numpy versions stop at the first value that is not a number, with a warning.
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(data.decode("ascii", errors="replace"), dtype=dtype, sep=" ")
+    except ValueError:
+        values = None
+    if values is None or len(values) != len(tokens):
+        for number, row in enumerate(data.split(b"\n")):
+            try:
+                np.array(row.split(), dtype=dtype)
+            except ValueError:
+                raise ValueError(f"Malformed edge list {file}: line {line + number} "
+                                 f"has a value that is not a number.") from None
+        raise ValueError(f"Malformed edge list {file}.")
+    return values
+
+
+def read_edges(file, chunk_size: int=CHUNK_SIZE):
+    """!Read a text edge list, without building a Python object per edge.
+
+    Every line holds an edge "u v" or a weighted edge "u v w"; brackets,
+    parentheses, commas and semicolons count as spaces, so "[1,2]" and
+    "(1, 2, 0.5)" are accepted too. An optional first line with a single
+    number is the number of nodes, as in the files read by utils.read_graph.
+    The file is parsed in chunks of chunk_size bytes by numpy.
+
+    @param file (str): path of the edge list.
+    @param chunk_size (int): bytes parsed at once.
+
+    @return tuple (n, edges, weights): the number of nodes given in the
+        header (None if missing), an int64 array of shape (m, 2) and the
+        float64 weights (None for unweighted edge lists).
+    """
+    line = 0 # lines read so far
+
+    def first_line(f) -> list:
+        """!Return the values of the next line that is not blank ([] at the end of the file)."""
+        nonlocal line
+        for text in f:
+            line += 1
+            values = text.translate(_SEPARATORS).split()
+            if values:
+                return values
+        return []
+
+    n = None
+    parts = []
+    with open(file, "rb") as f:
+        values = first_line(f)
+        if len(values) == 1:
+            n = int(values[0])
+            values = first_line(f)
+        columns = len(values)
+        if columns not in (0, 2, 3):
+            raise ValueError(f"Expected edges \"u v\" or \"u v w\" in {file}, got {columns} values in a line.")
+        dtype = np.int64 if columns == 2 else np.float64
+        if values:
+            parts.append(np.array(values, dtype=dtype))
+        rest = b""
+        while columns:
+            chunk = f.read(chunk_size)
+            data = rest + chunk
+            if chunk:
+                # only whole lines are parsed, the last partial line waits for the next chunk.
+                cut = data.rfind(b"\n") + 1
+                data, rest = data[:cut], data[cut:]
+            if data:
+                parts.append(_parse(data, dtype, columns, line + 1, file))
+                line += data.count(b"\n")
+            if not chunk:
+                break
+    if not columns:
+        return n, np.empty((0, 2), dtype=np.int64), None
+    values = np.concatenate(parts)
+    if len(values) % columns:
+        raise ValueError(f"Malformed edge list {file}: every line must have {columns} values.")
+    values = values.reshape(-1, columns)
+    if columns == 2:
+        return n, values, None
+    return n, values[:, :2].astype(np.int64), values[:, 2]
+
+
+def _from_edge_array(edges, n: int, directed: bool, base: int, weights) -> CSRGraph:
+    """!Return the graph of an (m, 2) array of node IDs, numbered from base (inferred if None)."""
+    if len(edges) == 0:
+        return CSRGraph.from_edges([], [], n or 0, directed)
+    low, high = int(edges.min()), int(edges.max())
+    if base is None:
+        # files without node 0, like the ones read by utils.read_graph, number nodes from 1.
+        # With the number of nodes, node 0 may just have no edges: only the IDs tell.
+        if n is None or low == 0 or high > n:
+            base = 1 if low >= 1 else 0
+        elif high == n:
+            base = 1
+        else:
+            raise ValueError(f"Cannot tell if the {n} nodes are numbered from 0 or 1, "
+                             f"no edge touches node 0 nor node {n}: please give base.")
+    if n is None:
+        n = high - base + 1
+    if low < base or high - base >= n:
+        raise ValueError(f"Node IDs must be between {base} and {n + base - 1}.")
+    ids = range(base, n + base) if base else None
+    sources = np.asarray(edges[:, 0], dtype=np.int64) - base
+    targets = np.asarray(edges[:, 1], dtype=np.int64) - base
+    return CSRGraph.from_edges(sources, targets, n, directed, ids, weights)
+
+
+def load_graph(file, directed: bool=False, base: int=None) -> CSRGraph:
+    """!Load a graph from a file, without building a Python object per edge.
+
+    The format is chosen by the extension:
+        - .npz: a graph written by save_graph, or an archive with an
+          "edges" array of shape (m, 2) and optionally "weights" and "n";
+        - .npy: an array of edges with shape (m, 2), or (m, 3) with the
+          weights in the last column, memory-mapped instead of read;
+        - anything else: a text edge list, see read_edges.
+
+    Node IDs of edge lists are numbered from base: by default 1 if no edge
+    touches node 0, 0 otherwise. With the number of nodes (header or "n"),
+    the base is inferred only if an edge touches node 0 or node n, otherwise
+    it has to be given.
+
+    @param file (str): path of the graph.
+    @param directed (bool): True if the edges of an edge list are directed.
+    @param base (int): ID of the first node of an edge list, None to infer it.
+
+    @return CSRGraph
+    """
+    extension = os.path.splitext(str(file))[1].lower()
+    n = weights = None
+    if extension == ".npz":
+        with np.load(file) as data:
+            if "offsets" in data.files:
+                return CSRGraph(data["offsets"], data["neighbors"],
+                                data["ids"] if "ids" in data.files else None,
+                                bool(data["directed"]),
+                                data["weights"] if "weights" in data.files else None)
+            edges = data["edges"]
+            if "weights" in data.files:
+                weights = data["weights"]
+            if "n" in data.files:
+                n = int(data["n"])
+    elif extension == ".npy":
+        edges = np.load(file, mmap_mode="r")
+        if edges.ndim != 2 or edges.shape[1] not in (2, 3):
+            raise ValueError(f"Expected an array of shape (m, 2) or (m, 3) in {file}, got {edges.shape}.")
+        if edges.shape[1] == 3:
+            edges, weights = edges[:, :2], edges[:, 2]
+    else:
+        n, edges, weights = read_edges(file)
+    return _from_edge_array(edges, n, directed, base, weights)
+
+
+def save_graph(file, G, compressed: bool=True):
+    """!Save a graph in the .npz format read by load_graph.
+
+    @param file (str): path of the archive (numpy adds the .npz extension if missing).
+    @param G: graph in any format accepted by as_graph.
+    @param compressed (bool): compress the arrays (smaller files, slower to write and read).
+
+    @return None
+    """
+    G = as_graph(G)
+    arrays = {"offsets": G.offsets, "neighbors": G.neighbors, "directed": np.array(G.is_directed())}
+    if G._ids is not None:
+        if G._ids.dtype == object:
+            raise ValueError("Only graphs with integer node IDs can be saved.")
+        arrays["ids"] = G._ids
+    if G.weights is not None:
+        arrays["weights"] = G.weights
+    (np.savez_compressed if compressed else np.savez)(file, **arrays)
+
+
+def as_graph(G) -> CSRGraph:
+    """!Return G as a CSRGraph.
+
+    @param G: networkx graph, CSRGraph, scipy sparse adjacency matrix,
+        numpy array of (undirected) edges with shape (m, 2), a tuple
+        (offsets, neighbors) with the CSR arrays of an undirected graph
+        (duplicate neighbors are dropped and missing reverse edges added),
+        or the path of a file read by load_graph.
+    """
+    if isinstance(G, CSRGraph):
+        return G
+    if isinstance(G, (str, os.PathLike)):
+        return load_graph(G)
+    if isinstance(G, tuple) and len(G) == 2:
+        # rows may repeat a neighbor or miss the reverse of an edge: rebuilt like an edge list.
+        offsets = np.asarray(G[0], dtype=np.int64)
+        neighbors = np.asarray(G[1], dtype=np.int64)
+        if offsets.ndim != 1 or not len(offsets) or offsets[0] != 0 or offsets[-1] != len(neighbors) \
+                or (np.diff(offsets) < 0).any():
+            raise ValueError("offsets must start from 0, never decrease and end with the number of neighbors.")
+        n = len(offsets) - 1
+        if len(neighbors) and (neighbors.min() < 0 or neighbors.max() >= n):
+            raise ValueError(f"Neighbors must be positions between 0 and {n - 1}.")
+        return CSRGraph.from_edges(np.repeat(np.arange(n), np.diff(offsets)), neighbors, n)
+    if hasattr(G, "tocoo"):
+        return CSRGraph.from_sparse(G)
+    if hasattr(G, "adj") and hasattr(G, "is_directed"):
+        return CSRGraph.from_networkx(G)
+    edges = np.asarray(G)
+    if edges.ndim == 2 and edges.shape[1] == 2:
+        return CSRGraph.from_edges(edges[:, 0], edges[:, 1])
+    raise TypeError(f"Cannot build a graph from {type(G).__name__}.")
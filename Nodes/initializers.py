@@ -1,16 +1,26 @@
-import networkx as nx
+import numpy as np
 import Nodes.utils as utils
 import subprocess as sp
 import socket
 from prettytable import PrettyTable
 import os
+import time
 import datetime
+from collections import deque
 from datetime import timedelta
 from Nodes.messages import *
 from Nodes.comunication import ComunicationManager
-from Nodes.visualizer import Visualizer
+from Nodes.reliable import DEFAULT_RTO
+from Nodes.graph import CSRGraph, as_graph
+from Nodes.links import Link
+from Nodes.faults import FaultPlan, FaultScheduler
 from Nodes.const import Command, VisualizerState
 
+# Minimum seconds between two transmissions of the setup of a node.
+SETUP_RETRY = 0.5
+# Seconds given to the launched processes to exit by themselves on close.
+CLOSE_TIMEOUT = 10.0
+
 
 class Initializer(ComunicationManager):
     """!Sets up the network before the execution of the algorithm."""
@@ -19,15 +29,35 @@ class Initializer(ComunicationManager):
                  client: str,
                  HOSTNAME: str,
                  PORT: int,
-                 G: nx.Graph,
+                 G,
                  shell=True,
                  log_path=None,
-                 visualizer=False):        
+                 visualizer=False,
+                 workers:int=None,
+                 base_port:int=None,
+                 codec:str="binary",
+                 reliable=False,
+                 pool=None,
+                 seed:int=None,
+                 node_class=None,
+                 fifo:bool=False,
+                 protocol_kwargs:dict=None,
+                 fork:bool=False,
+                 aggregate:bool=False,
+                 emulation:dict=None,
+                 faults:FaultPlan=None,
+                 trace=False):        
         """!Initialize initializer.
         
+        @param  client (str): absolute path of the client file. With a pool, the
+                protocol to run instead: a Protocol subclass or its "module:Class" spec.
         @param  HOSTNAME (str): IP address of the initalizer.
-        @param  BACK (int): Port where the initializer is waiting for RDY messages.
-        @param  G (nx.Graph): Graph structure to build.
+        @param  PORT (int): Port where the initializer is waiting for RDY messages,
+                0 to let the OS choose a free one.
+        @param  G: Graph structure to build: a networkx graph or, for large topologies,
+                a compact adjacency (CSRGraph, scipy sparse matrix, numpy array of edges
+                or (offsets, neighbors) arrays, see Nodes.graph). Node IDs of compact
+                adjacencies are 0..n-1.
         @param  shell (bool): Whether to use a new shell for each process. 
                 - True: The command is executed through a shell
                     (e.g., `cmd.exe` on Windows, `/bin/sh` on Unix).
@@ -35,29 +65,120 @@ class Initializer(ComunicationManager):
                     This is safer and more efficient but may cause issues with
                     shell-specific commands.
         @param visualizer (bool): turn on/off visualization
+        @param workers (int): if given, nodes are split in this many shards and each
+                shard is hosted by a single process running the client file
+                with all of its ports (see Nodes.worker).
+        @param base_port (int): if given, nodes listen on consecutive ports starting from
+                base_port. By default every node binds a free port chosen by the OS and
+                reports it in its RDY message, so the size of the network is not limited
+                by the port range.
+        @param codec (str): wire format of messages, "binary" (compact, default) or
+                "json" (readable, for debugging). It is sent to the nodes during setup.
+        @param reliable (bool | float): if set, messages between nodes are acknowledged and
+                retransmitted when lost (see Nodes.reliable). A float is used as the
+                retransmission timeout in seconds.
+        @param pool (NodePool): if given, nodes are hosted by the warm processes of the
+                pool (see Nodes.pool) instead of new ones, one shard per process.
+        @param seed (int): with a pool, seed of the random module in the pool processes.
+        @param node_class: with a pool, Node subclass (or its spec) used for every node.
+        @param fifo (bool): with a pool, turn on fifo mode on every node.
+        @param protocol_kwargs (dict): with a pool, extra arguments for the protocol constructor.
+        @param fork (bool): if True, node processes are forked by a template process that
+                already imported the framework and the client modules (see Nodes.forkserver),
+                instead of starting a new interpreter each. Ignored in shell mode.
+        @param aggregate (bool): if True, nodes hosted by the same process (workers, pools,
+                async runtimes) combine their EOP and COUNT_M messages, and the initializer
+                receives one summary of each per process instead of one per node
+                (see Nodes.reports). Processes hosting a single node report as usual.
+        @param emulation (dict): settings of the emulated links (see Nodes.emulation): latency
+                and jitter in seconds, bandwidth in bytes per second, loss and duplicate
+                probabilities, fifo. They apply to every link, and the edges of a networkx
+                graph can override them with attributes of the same names.
+        @param faults (FaultPlan | list): crashes and partitions injected during the run
+                (see Nodes.faults). Timed faults are sent by the initializer, starting from
+                the first wake up, and the faults that fired are available in faults_fired.
+        @param trace (bool | str): if set, every node records the messages it exchanges with
+                its neighbors in a binary trace (see Nodes.trace), written in this directory or,
+                with True, in the log directory of the run. Traces are complete once the node
+                processes exited (after close), see Nodes.trace_analysis to analyze them.
         @return None
         """
         super().__init__()
         self._HOSTNAME: str = HOSTNAME
         self._PORT: int = PORT
-        self._G: nx.Graph = G
-        self._ports: list = [65432+x for x in range(self.number_of_nodes())] # one port for each node        
-        self._DNS: dict = {node:port for node,port in zip(G.nodes(), self.ports)}        
-        self._client: str = client        
+        self._G = G
+        # compact adjacency used to build the local dns of every node.
+        self._graph: CSRGraph = as_graph(G)
+        # one port for each node, 0 means chosen by the OS. The DNS is built from the RDY messages.
+        if base_port is None:
+            self._ports: list = [0] * self.number_of_nodes()
+        else:
+            self._ports: list = [base_port+x for x in range(self.number_of_nodes())]
+        self._DNS: dict = {}
+        # phase of the startup : seconds since the launch of the first process
+        self._startup_times: dict = {}
+        if pool is not None:
+            from Nodes.pool import spec
+            # the protocol run by the pool, kept as "module:Class" like in the RESET messages.
+            client = spec(client)
+        self._client: str = client
         self._shell: bool = shell
+        self._workers: int = workers
+        self._codec: str = codec
+        if reliable is True:
+            reliable = DEFAULT_RTO
+        self._reliable: float = reliable if reliable else None
+        self._pool = pool
+        self._seed: int = seed
+        self._node_class = node_class
+        self._fifo: bool = fifo
+        self._protocol_kwargs: dict = protocol_kwargs
+        self._processes: list = [] # launched processes, not used with a pool
+        self._fork: bool = fork and not shell
+        self._fork_server = None
+        self._aggregate: bool = aggregate
+        self._emulation: dict = emulation
+        # (node, neighbor) : settings of the emulated link given as edge attributes.
+        self._links: dict = {}
+        if hasattr(G, "adj"):
+            for u, v, data in G.edges(data=True):
+                settings = {key: data[key] for key in Link.ATTRIBUTES if key in data}
+                if settings:
+                    self._links[(u, v)] = settings
+                    if not G.is_directed():
+                        self._links[(v, u)] = settings
+        self._faults: FaultPlan = faults if faults is None or isinstance(faults, FaultPlan) else FaultPlan(faults)
+        self._fault_scheduler: FaultScheduler = None
+        self._fault_epoch: float = None
+        self._fired: list = [] # (time, fault, action, node)
+        self._crashed: dict = {} # crashed node : messages it sent
+        self._trace = trace
+        self._trace_path: str = None
+        Message.use_codec(codec)
         
-        if not log_path: self._log_path = os.path.join(os.path.split(self.client)[0], "logs")
+        # logs go next to the client file, or in the working directory when a pool runs a protocol.
+        client_dir = os.getcwd() if pool is not None else os.path.split(self.client)[0]
+        if not log_path: self._log_path = os.path.join(client_dir, "logs")
         else: self._log_path = None
 
         self._s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)        
         self._s.bind(("", self.PORT))
+        self._PORT = self._s.getsockname()[1]
+        # termination and count messages get their own mailboxes, the others
+        # (startup traffic) stay in the message queue. Messages are decoded once, by the listener.
+        self.route(Command.END_PROTOCOL, Command.ERROR, Command.FAULT)
+        self.route(Command.COUNT_M)
         self.start_listener(self._s, self.message_queue)
 
         self._visualizer_port = None
         self._visualizer = None
         if visualizer:
-            self._visualizer_port = self.ports[-1]+1
-            self._visualizer = Visualizer(self.visualizer_port, self.G)
+            # imports matplotlib, only when a visualizer is requested.
+            from Nodes.visualizer import Visualizer
+            self._visualizer = Visualizer(0, self.G if hasattr(self.G, "adj") else self.graph.to_networkx())
+            self._visualizer_port = self.visualizer.PORT
+        if base_port is not None:
+            utils.check_port_range(self.ports, [self.PORT, self.visualizer_port])
         
         self.initialize_clients()
         self.setup_clients()
@@ -76,10 +197,15 @@ class Initializer(ComunicationManager):
     def G(self):
         """!Return network structure."""
         return self._G
+
+    @property
+    def graph(self):
+        """!Return the network structure as a CSRGraph."""
+        return self._graph
     
     @property
     def ports(self):
-        """!Return ports used by the client nodes."""
+        """!Return ports used by the client nodes (as reported in their RDY messages)."""
         return self._ports
     
     @property
@@ -97,6 +223,61 @@ class Initializer(ComunicationManager):
         """!Return True if each node should get a separate terminal."""
         return self._shell
     
+    @property
+    def workers(self):
+        """!Return the number of worker processes, None if each node has its own process."""
+        return self._workers
+
+    @property
+    def codec(self):
+        """!Return the name of the codec used to serialize messages."""
+        return self._codec
+
+    @property
+    def reliable(self):
+        """!Return the retransmission timeout of the reliable channel, None if disabled."""
+        return self._reliable
+
+    @property
+    def emulation(self):
+        """!Return the settings of the emulated links applied to every link, None if not given."""
+        return self._emulation
+
+    @property
+    def faults(self):
+        """!Return the fault plan of the run, None if no fault is injected."""
+        return self._faults
+
+    @property
+    def faults_fired(self):
+        """!Return the faults that fired so far as (time, fault, action, node) tuples.
+
+        Times are seconds since the first wake up. Crashes carry the ID of the
+        crashed node and are recorded when its report arrives (while waiting for
+        termination), partitions and heals carry None and are recorded when sent.
+        """
+        return sorted(self._fired, key=lambda record: record[0])
+
+    @property
+    def trace_path(self):
+        """!Return the directory of the message traces, None if tracing is disabled."""
+        return self._trace_path
+
+    @property
+    def aggregate(self):
+        """!Return True if processes send one summary of the EOP and COUNT_M messages of their nodes."""
+        return self._aggregate
+
+    @property
+    def pool(self):
+        """!Return the NodePool hosting the nodes, None if processes are launched by the initializer."""
+        return self._pool
+
+    @property
+    def startup_times(self):
+        """!Return when each startup phase (launch, ready, setup, start) completed, in seconds."""
+        return self._startup_times
+
     @property
     def log_path(self):
         """!Return root path to log files."""
@@ -128,76 +309,126 @@ class Initializer(ComunicationManager):
     
     def number_of_nodes(self) -> int:
         """Return number of nodes in the network."""
-        return self.G.number_of_nodes()
+        return self.graph.number_of_nodes()
 
     def initialize_clients(self):
-        """!Initialize all of the nodes of the graph.
+        """!Launch the processes of the nodes.
 
         This method creates a process for each client (node), comunicating
-        what is the port that they should use to wait for messages. Then,
-        it waits for a confirmation message (RDY) from all of them.    
-
+        what is the port that they should use to wait for messages.
+        In worker mode, a process is created for each shard of nodes
+        and it receives all of the ports of its shard.
+        With a pool, no process is launched: the warm processes of the
+        pool are reset to host one shard each.
+        While the processes start, the predecessors of every node are
+        computed in bulk, so that setup_clients can send the setup of a
+        node as soon as it and its neighbors reported their ports.
         """
-        command = f"python3 {self.client} localhost {self.PORT} "        
+        self._startup_begin = time.monotonic()
         self.exp_path = utils.init_logs(self.log_path)
-        for port in self.ports:
+        if self._trace:
+            self._trace_path = os.path.abspath(self.exp_path if self._trace is True else self._trace)
+            os.makedirs(self._trace_path, exist_ok=True)
+        # nodes are handled by position in the graph (see Nodes.graph), not by ID.
+        nodes = list(range(self.number_of_nodes()))
+        # process ID : nodes it is going to host, assigned as its RDY messages arrive.
+        self._slots = {}
+        if self.pool is not None:
+            processes = min(self.workers, len(self.pool)) if self.workers else len(self.pool)
+            node_shards = utils.split_in_shards(nodes, processes)
+            pids = self.pool.reset(self.PORT, utils.split_in_shards(self.ports, processes), self.client,
+                                   self._node_class, self._fifo, self._protocol_kwargs, self._seed)
+            for pid, node_shard in zip(pids, node_shards):
+                self._slots[pid] = deque(node_shard)
+            shards = [] # nothing to launch
+        elif self.workers:
+            shards = utils.split_in_shards(self.ports, self.workers)
+            node_shards = utils.split_in_shards(nodes, self.workers)
+        else:
+            shards = [[port] for port in self.ports]
+            node_shards = [[node] for node in nodes]
+        if self._fork and shards:
+            from Nodes.forkserver import ForkServer
+            self._fork_server = ForkServer(self, self.client)
+            self._processes.append(self._fork_server.process)
+            for index, pid in self._fork_server.launch(shards).items():
+                self._slots[pid] = deque(node_shards[index])
+            shards = []
+        for shard, node_shard in zip(shards, node_shards):
+            ports = [str(port) for port in shard]
             if self.shell:
-                process = sp.Popen(f'start cmd /K {command+str(port)}',
+                command = f"python3 {self.client} localhost {self.PORT} "
+                process = sp.Popen(f'start cmd /K {command+" ".join(ports)}',
                                    stdout=sp.DEVNULL,
                                    stderr=sp.DEVNULL)
             else:
                 full_command = ["python3",
                                 self.client,
                                 "localhost",
-                                str(self.PORT),
-                                str(port)]
+                                str(self.PORT)] + ports
                 process = sp.Popen(full_command)
-        ready_clients = 0
-        while 1: # wait for RDY messages
-            data = self.receive_message()
-            new_message = Message.deserialize(data)
-            if new_message.command != Command.READY:
-                print(f"Something went wrong during initialization.")
-                exit(0)
-            else:
-                print(f"{new_message.sender} is ready!")
-                ready_clients += 1
-                if ready_clients == len(self.ports):
-                    print(f"All {ready_clients} clients are ready")
-                    break
-
-    def wait_for_termination(self):
-        """!Wait for termination messages by nodes in the network."""
+                # with a shell the process ID is the one of the shell, not of the client.
+                self._slots[process.pid] = deque(node_shard)
+            self._processes.append(process)
+        self._startup_times["launch"] = time.monotonic() - self._startup_begin
+        # nodes whose setup needs the port of each node.
+        self._dependents: CSRGraph = self.graph.transpose()
+
+    def wait_for_termination(self, timeout: float=None) -> bool:
+        """!Wait for termination messages by nodes in the network.
+
+        @param timeout (float): seconds to wait for all the EOP messages, None to wait forever.
+
+        @return True if every node terminated, False on timeout.
+        """
         EOP_received = 0
-        while 1: # wait for RDY messages    
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while 1:
             try:
-                data = self.receive_message()
-                message = TerminationMessage.deserialize(data)            
-                if message.command == Command.END_PROTOCOL:
-                    EOP_received += 1
+                message = self.receive(Command.END_PROTOCOL,
+                                       None if deadline is None else max(0, deadline - time.monotonic()))
+                if message is None:
+                    print(f"Received EOP from {EOP_received}/{self.number_of_nodes()} nodes before the timeout.")
+                    return False
+                if message.command in (Command.END_PROTOCOL, Command.FAULT):
+                    if message.command == Command.FAULT:
+                        # a crashed node is not going to send EOP nor COUNT_M.
+                        self._record_fault(message.fault, message.action, message.sender)
+                        self._crashed[message.sender] = message.counter
+                    # summaries of aggregated reports count for all the nodes they cover.
+                    EOP_received += getattr(message, "nodes", 1)
                     if EOP_received == self.number_of_nodes():
-                        print("Received EOP from all nodes in the network.")
-                        break
+                        crashed = f" ({len(self._crashed)} crashed)" if self._crashed else ""
+                        print(f"Received EOP from all nodes in the network{crashed}.")
+                        return True
                 elif message.command == Command.ERROR:
                     payload = message.payload
                     print(f"A node crashed with the following error: {payload}")
                     self.send_termination()
                     exit(0)
-                else:
-                    # put the message back in the queue if it's not a termination message.
-                    self.insert_message(data)
             except KeyboardInterrupt:
                 self.send_termination()
     
-    def wait_for_number_of_messages(self):
-        """!Wait for message containing number of messages from nodes in the network."""
-        counts_received = 0
-        total_count = 0
-        while 1: # wait for RDY messages            
-            data = self.receive_message()
-            message = CountMessage.deserialize(data)
+    def wait_for_number_of_messages(self, timeout: float=None) -> int:
+        """!Wait for message containing number of messages from nodes in the network.
+
+        Crashed nodes are covered by their crash reports, collected by wait_for_termination.
+
+        @param timeout (float): seconds to wait for all the counts, None to wait forever.
+
+        @return the total number of messages, None on timeout.
+        """
+        counts_received = len(self._crashed)
+        total_count = sum(self._crashed.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while 1:
+            message = self.receive(Command.COUNT_M,
+                                   None if deadline is None else max(0, deadline - time.monotonic()))
+            if message is None:
+                print(f"Received message count from {counts_received}/{self.number_of_nodes()} nodes before the timeout.")
+                return None
             total_count += message.counter
-            counts_received += 1
+            counts_received += getattr(message, "nodes", 1)
             if counts_received == self.number_of_nodes():
                 print("Received message count from all nodes.")
                 print(f"Total number of messages: {total_count}")
@@ -205,46 +436,160 @@ class Initializer(ComunicationManager):
                 
 
     def setup_clients(self):
-        """!Provide usefull information to nodes after initialization.
+        """!Provide usefull information to nodes as soon as they are ready.
 
         This method sends to all of the nodes in the network
         the information needed to properly work. This includes:
         + The ID in the network;
-        + The list of connections (edges) with neighboors (nodes);
-        + The local dns that they need to comunicate to other nodes;
+        + The local dns that they need to comunicate to other nodes
+          (nodes derive the list of their edges from it);
         + A boolean (True if logging on terminal, False to log on files)
         + The path of the experiment directory (needed for logging)
+
+        RDY, SETUP_ACK and SOP messages are collected by a single loop.
+        A node gets its ID when its RDY arrives (following the order of
+        the shard of its process) and its setup as soon as every neighbor
+        reported its port too, so nodes are setup while others are still
+        starting. Nodes whose process is not known (shell mode) get their
+        ID once all RDY arrived, keeping nodes hosted by the same process
+        next to each other.
+
+        Setup messages of high-degree nodes do not fit in a datagram and
+        are sent in fragments. Every node confirms its setup with a
+        SETUP_ACK message: a node that sends RDY again before confirming
+        lost (part of) its setup, which is then sent again.
+
+        Progress is printed at most once per second, and the time of each
+        phase is available in startup_times at the end.
         """
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        for node, port in self.DNS.items():
-            local_dns = utils.get_local_dns(self.DNS, node, list(self.G.edges(node)))
-            message = SetupMessage(node,
-                                   list(self.G.edges(node)),
-                                   local_dns,
+        n = self.number_of_nodes()
+        graph = self.graph
+        # state of each node, by position in the graph.
+        ports = np.zeros(n, dtype=np.int64)
+        placed = np.zeros(n, dtype=bool)
+        missing = graph.degrees.copy() # neighbors that did not report their port yet
+        unplaced = {} # process ID : ports of nodes not assigned yet
+        reported = set()
+        setups = {} # port : serialized setup message
+        sent = {} # port : time of the last transmission of the setup
+        confirmed = set()
+        acks = 0
+
+        def link_settings(node_id, neighbor_ids):
+            """!Return the settings of the emulated links of a node, None if none is emulated."""
+            links = {}
+            for neighbor in neighbor_ids:
+                settings = self._links.get((node_id, neighbor))
+                if self.emulation:
+                    settings = {**self.emulation, **(settings or {})}
+                if settings:
+                    links[neighbor] = settings
+            return links or None
+
+        def send_setup(node):
+            port = int(ports[node])
+            neighbors = graph.row(node)
+            node_id = graph.ids([node])[0]
+            neighbor_ids = graph.ids(neighbors)
+            message = SetupMessage(node_id,
+                                   None,
+                                   dict(zip(neighbor_ids, ports[neighbors].tolist())),
                                    self.shell,
                                    self.exp_path,
                                    self.visualizer_port,
+                                   codec=self.codec,
+                                   reliable=self.reliable,
+                                   aggregate=self.aggregate,
+                                   links=link_settings(node_id, neighbor_ids) if self.emulation or self._links else None,
+                                   crash=self.faults.crash_after(node_id) if self.faults else None,
+                                   trace=self.trace_path,
                                    )
-            s.sendto(message.serialize(), ("localhost", port))
-            # capture confirmation message
-        acks = 0
-        while acks < len(self.DNS):
+            setups[port] = message.serialize()
+            self.send_datagram(setups[port], port)
+            sent[port] = time.monotonic()
+
+        def place(node, port):
+            ports[node] = port
+            placed[node] = True
+            if not missing[node]:
+                send_setup(node)
+            dependents = self._dependents.row(node)
+            # repeated dependents are counted once per occurrence.
+            np.subtract.at(missing, dependents, 1)
+            for dependent in dependents[(missing[dependents] == 0) & placed[dependents]].tolist():
+                send_setup(dependent)
+
+        def phase_done(phase):
+            self._startup_times[phase] = time.monotonic() - self._startup_begin
+
+        # errors of the nodes stay in their mailbox, wait_for_termination reports them.
+        errors = self.message_queue.mailbox(Command.ERROR)
+        last_progress = time.monotonic()
+        while acks < n:
+            if not errors.empty():
+                print("Something went wrong during clients setup.")
+                break
             try:
-                data = self.receive_message()
-                if not data: continue
-                ans_message = Message.deserialize(data)
-                if ans_message.command != Command.START_PROTOCOL:
-                    print("Something went wrong during clients setup.")
-                    break
-                else:
-                    print(f"{ans_message.sender} started the protocol!")
-                    acks += 1
+                ans_message = self.receive_message(1.0)
+                if isinstance(ans_message, bytes):
+                    print("Received a malformed message during clients setup.")
+                elif ans_message:
+                    if ans_message.command == Command.READY:
+                        port = ans_message.port
+                        if port not in reported:
+                            reported.add(port)
+                            slot = self._slots.get(ans_message.group)
+                            if slot:
+                                place(slot.popleft(), port)
+                            else:
+                                unplaced.setdefault(ans_message.group, []).append(port)
+                            if len(reported) == n:
+                                phase_done("ready")
+                                # processes that could not be told apart get the remaining IDs.
+                                left = [port for ports in unplaced.values() for port in ports]
+                                for node, port in zip(np.flatnonzero(~placed).tolist(), left):
+                                    place(node, port)
+                        # RDY sent again by a node waiting for its setup, unless it crossed the setup.
+                        elif (port in setups and port not in confirmed
+                                and time.monotonic() - sent[port] >= SETUP_RETRY):
+                            self.send_datagram(setups[port], port)
+                            sent[port] = time.monotonic()
+                    elif ans_message.command in (Command.SETUP_ACK, Command.START_PROTOCOL):
+                        if ans_message.sender not in confirmed:
+                            confirmed.add(ans_message.sender)
+                            if len(confirmed) == n:
+                                phase_done("setup")
+                        if ans_message.command == Command.START_PROTOCOL:
+                            acks += 1
+                    else:
+                        print("Something went wrong during clients setup.")
+                        break
             except Exception as e:
                 print(f"Error receiving ack from a node. {e}")
-        if acks < len(self.DNS):
+            if time.monotonic() - last_progress >= 1.0 or acks == n:
+                last_progress = time.monotonic()
+                print(f"Ready: {len(reported)}/{n}, setup: {len(confirmed)}/{n}, started: {acks}/{n}")
+        self._DNS = dict(zip(graph.ids(np.flatnonzero(placed)), ports[placed].tolist()))
+        self._ports = list(self.DNS.values())
+        if acks < n:
             print(f"Did not receive SOP message from some clients.\nReceived: {acks} messages")
-        else:
-            print(f"All {acks} clients started the protocol!")
+            return
+        phase_done("start")
+        print(f"All {acks} clients started the protocol!")
+        self.print_startup_times()
+
+    def print_startup_times(self):
+        """!Print when each phase of the startup completed, measured from the launch of the first process.
+
+        Phases overlap, the duration of a phase is the time since the previous one completed.
+        """
+        table = PrettyTable()
+        table.field_names = ["Phase", "Completed at (s)", "Duration (s)"]
+        previous = 0.0
+        for phase, completed in self.startup_times.items():
+            table.add_row([phase, f"{completed:.3f}", f"{completed - previous:.3f}"])
+            previous = completed
+        print(table)
 
     def wakeup(self, wake_up_node:int):
         """!Send the wake up message to a specific node to start the computation.
@@ -254,8 +599,8 @@ class Initializer(ComunicationManager):
         @return None    
         """
         message = WakeUpMessage()
-        wake_up_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        wake_up_socket.sendto(message.serialize(), ("localhost", self.DNS[wake_up_node]))
+        self.start_faults(time.monotonic())
+        self.send_datagram(message.serialize(), self.DNS[wake_up_node])
         
     def wakeup_all(self, delta:int):
         """!Send the absolute wakeup time to the nodes.
@@ -268,7 +613,6 @@ class Initializer(ComunicationManager):
         
         @return None
         """
-        wake_up_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         now = datetime.datetime.now()
         start_time = now + timedelta(seconds=delta)        
         year = start_time.year
@@ -277,16 +621,49 @@ class Initializer(ComunicationManager):
         hour = start_time.hour
         minute = start_time.minute
         second = start_time.second
+        message = WakeupAllMessage(year, month,day,hour, minute, second)
+        # nodes start at the beginning of the second.
+        self.start_faults(time.monotonic() + (start_time.replace(microsecond=0) - now).total_seconds())
+        data = message.serialize()
         for node, port in self.DNS.items():
-            message = WakeupAllMessage(year, month,day,hour, minute, second)
-            wake_up_socket.sendto(message.serialize(), ("localhost", port))
+            self.send_datagram(data, port)
+
+    def start_faults(self, epoch: float):
+        """!Start sending the timed faults of the plan, called by the first wake up.
+
+        @param epoch (float): monotonic time the times of the plan are measured from.
+
+        @return None
+        """
+        if not self.faults or self._fault_epoch is not None:
+            return
+        self._fault_epoch = epoch
+        positions = {node: position for position, node in enumerate(self.graph.nodes())}
+        events = self.faults.events(positions, lambda node: self.graph.ids(self.graph.row(positions[node])))
+        if events:
+            self._fault_scheduler = FaultScheduler(events, epoch,
+                                                   lambda node, data: self.send_datagram(data, self.DNS[node]),
+                                                   self._record_fault)
+            self._fault_scheduler.start()
+
+    def _record_fault(self, fault: int, action: str, node: int=None):
+        """!Record that a fault fired."""
+        self._fired.append((time.monotonic() - self._fault_epoch, fault, action, node))
+
+    def print_faults(self):
+        """!Print the faults that fired, in order of time."""
+        table = PrettyTable()
+        table.field_names = ["Time (s)", "Fault", "Action", "Node"]
+        for when, fault, action, node in self.faults_fired:
+            table.add_row([f"{when:.3f}", fault, action, "" if node is None else node])
+        print(table)
 
     def send_termination(self):
         """!Send termination message to all of the nodes in the network."""        
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         termination_message = TerminationMessage(Command.ERROR, "node crash")
+        data = termination_message.serialize()
         for node, port in self.DNS.items():
-            s.sendto(termination_message.serialize(), ("localhost", port))
+            self.send_datagram(data, port)
 
     def start_visualization(self):
         """!Communicate to the visualizer to start the visualization loop."""
@@ -303,10 +680,28 @@ class Initializer(ComunicationManager):
             print("End of visualization.")            
 
     def close(self):
-        """!Close the socket connection"""
+        """!Close the socket connection and reap the launched processes.
+
+        Processes still running after CLOSE_TIMEOUT seconds are terminated,
+        so that a sweep does not leak processes between runs. Pool processes
+        are left running for the next run.
+        """
+        if self._fault_scheduler is not None:
+            self._fault_scheduler.stop()
+        if self._fork_server is not None:
+            # forked processes are children of the template, that reaps them before exiting.
+            self._fork_server.shutdown()
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        for process in self._processes:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except sp.TimeoutExpired:
+                process.terminate()
+        self._processes = []
         try:
             self.listener.stop()
             self.s.close()
+            self.close_sender()
             print("Socket successfully closed.")
         except Exception as e:
             print(f"Error closing socket: {e}")
\ No newline at end of file
@@ -0,0 +1,127 @@
+import random
+
+
+def constant(value: float):
+    """!Return a distribution that always draws value."""
+    return lambda rng: value
+
+
+def uniform(low: float, high: float):
+    """!Return the uniform distribution between low and high."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean: float):
+    """!Return the exponential distribution with the given mean."""
+    return lambda rng: rng.expovariate(1.0 / mean)
+
+
+def normal(mean: float, sd: float):
+    """!Return the normal distribution with the given mean and standard deviation, truncated at 0."""
+    return lambda rng: max(0.0, rng.gauss(mean, sd))
+
+
+def lognormal(mu: float, sigma: float):
+    """!Return the log-normal distribution of parameters mu and sigma (heavy tailed delays)."""
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def _draw(value, rng: random.Random) -> float:
+    """!Draw from a distribution, or return value itself if it is a number."""
+    return value(rng) if callable(value) else value
+
+
+class Link:
+    """!Delay model of a link, in units of virtual time.
+
+    The delay of a message is latency + jitter + size / bandwidth, where
+    latency and jitter are numbers or distributions (functions of a
+    random.Random, see constant, uniform, exponential, normal and
+    lognormal). A number as jitter draws uniformly between 0 and jitter.
+    With a bandwidth (bytes per unit of virtual time) messages are
+    transmitted one after the other, so they queue on busy links.
+
+    Jitter lets a message overtake the previous ones sent on the same
+    link, as datagrams do; fifo=True forbids it. A message is lost with
+    probability loss, and duplicated with probability duplicate.
+
+    The same model emulates links between real processes (see
+    Nodes.emulation), with times in seconds and bandwidth in bytes per second.
+    """
+
+    ## Names of the edge attributes read by from_attributes.
+    ATTRIBUTES = ("latency", "jitter", "bandwidth", "fifo", "loss", "duplicate")
+
+    def __init__(self, latency=1.0, jitter=None, bandwidth: float=None, fifo: bool=False,
+                 loss: float=0.0, duplicate: float=0.0):
+        """!
+        @param latency (float | callable): propagation delay.
+        @param jitter (float | callable): extra random delay, None for none.
+        @param bandwidth (float): bytes per unit of virtual time, None for infinite.
+        @param fifo (bool): if True messages on the link are delivered in order.
+        @param loss (float): probability that a message is lost.
+        @param duplicate (float): probability that a message is delivered twice.
+        """
+        self.latency = latency
+        self.jitter = uniform(0, jitter) if isinstance(jitter, (int, float)) and jitter else jitter
+        self.bandwidth: float = bandwidth
+        self.fifo: bool = fifo
+        self.loss: float = loss
+        self.duplicate: float = duplicate
+
+    @property
+    def ordered(self) -> bool:
+        """!Return True if messages on the link cannot overtake each other."""
+        return self.fifo or (self.jitter is None and not callable(self.latency))
+
+    def copies(self, rng: random.Random) -> int:
+        """!Return how many copies of a message are delivered: 0 if lost, 2 if duplicated."""
+        if self.loss and rng.random() < self.loss:
+            return 0
+        if self.duplicate and rng.random() < self.duplicate:
+            return 2
+        return 1
+
+    @classmethod
+    def from_attributes(cls, attributes: dict, default):
+        """!Return the link of a graph edge, from its "link" attribute or its
+        attributes named in ATTRIBUTES (missing ones taken from default).
+        """
+        link = attributes.get("link")
+        if link is not None:
+            return link
+        if not any(key in attributes for key in cls.ATTRIBUTES):
+            return default
+        return cls(attributes.get("latency", default.latency),
+                   attributes.get("jitter", default.jitter),
+                   attributes.get("bandwidth", default.bandwidth),
+                   attributes.get("fifo", default.fifo),
+                   attributes.get("loss", default.loss),
+                   attributes.get("duplicate", default.duplicate))
+
+
+class LinkState:
+    """!Messages in transit on a directed link, used to compute arrival times."""
+
+    def __init__(self, link: Link):
+        self.link: Link = link
+        # end of the transmission of the last message (bandwidth).
+        self.free_at: float = 0.0
+        # arrival time of the last message (fifo).
+        self.last_arrival: float = 0.0
+
+    def arrival(self, now: float, size: int, rng: random.Random) -> float:
+        """!Return the arrival time of a message of size bytes sent at time now."""
+        link = self.link
+        sent = now
+        if link.bandwidth:
+            sent = max(now, self.free_at) + size / link.bandwidth
+            self.free_at = sent
+        delay = _draw(link.latency, rng)
+        if link.jitter is not None:
+            delay += _draw(link.jitter, rng)
+        arrival = sent + max(0.0, delay)
+        if link.fifo:
+            arrival = max(arrival, self.last_arrival)
+        self.last_arrival = max(arrival, self.last_arrival)
+        return arrival
@@ -1,22 +1,227 @@
 import threading
+import selectors
 import socket
 import queue
+from collections import deque
+from Nodes.messages import Message
+from Nodes.fragments import Reassembler
+
+# Requested size of the kernel receive buffer of listening sockets, so that
+# bursts (e.g. RDY or SOP messages from thousands of nodes) are not dropped.
+# The kernel caps it to net.core.rmem_max.
+RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+def enlarge_receive_buffer(s: socket.socket):
+    """!Ask the kernel for a larger receive buffer on the given socket."""
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+    except OSError:
+        pass
+
+# Size of the buffer used to read a datagram, the largest UDP payload.
+# Bigger messages arrive in fragments (see Nodes.fragments).
+DATAGRAM_SIZE = 65535
+
+# not available on every platform (e.g. Windows), there listeners read one datagram per wakeup.
+_DONTWAIT: int = getattr(socket, "MSG_DONTWAIT", 0)
+
+def drain(s: socket.socket, data: bytes) -> list:
+    """!Return data followed by all the datagrams already waiting on the socket, without blocking."""
+    batch = [data]
+    if _DONTWAIT:
+        try:
+            while True:
+                batch.append(s.recv(DATAGRAM_SIZE, _DONTWAIT))
+        except (BlockingIOError, InterruptedError):
+            pass
+    return batch
+
+
+class Mailbox:
+    """!Lightweight replacement of queue.Queue between a listener and a single consumer.
+
+    Items are stored in a deque, whose append and popleft are atomic,
+    so producers only take the lock to wake up a consumer that is
+    actually waiting. Batches are handed over with put_many and
+    get_batch, paying the synchronization once per batch instead of
+    once per message. The get/put/empty/qsize subset of the queue.Queue
+    API is supported.
+    """
+
+    def __init__(self):
+        self._items: deque = deque()
+        self._ready = threading.Condition(threading.Lock())
+        self._waiting: int = 0
+
+    def put(self, item):
+        """!Append an item."""
+        self._items.append(item)
+        if self._waiting:
+            with self._ready:
+                self._ready.notify()
+
+    def put_many(self, items: list):
+        """!Append a batch of items, waking up the consumer at most once."""
+        self._items.extend(items)
+        if self._waiting:
+            with self._ready:
+                self._ready.notify()
+
+    def put_front(self, items: list):
+        """!Put items back at the head of the mailbox, in order, before everything queued meanwhile."""
+        self._items.extendleft(reversed(items))
+        if items and self._waiting:
+            with self._ready:
+                self._ready.notify()
+
+    def _wait(self, timeout: float) -> bool:
+        """!Wait until the mailbox is not empty. Return False on timeout."""
+        if self._items:
+            return True
+        with self._ready:
+            # the counter is increased before checking again, so a producer
+            # either sees a waiting consumer or its item is seen here.
+            self._waiting += 1
+            try:
+                return self._ready.wait_for(lambda: self._items, timeout)
+            finally:
+                self._waiting -= 1
+
+    def get(self, block: bool = True, timeout: float = None):
+        """!Remove and return the oldest item.
+
+        @raise queue.Empty if no item is available within timeout.
+        """
+        if not self._wait(timeout if block else 0):
+            raise queue.Empty
+        return self._items.popleft()
+
+    def get_batch(self, timeout: float = None) -> list:
+        """!Remove and return all the available items, waiting for at least one.
+
+        @return list of items, empty if timeout occured.
+        """
+        batch = []
+        if self._wait(timeout):
+            items = self._items
+            try:
+                while True:
+                    batch.append(items.popleft())
+            except IndexError:
+                pass
+        return batch
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+
+class Mailboxes(Mailbox):
+    """!Mailbox that routes decoded messages into dedicated mailboxes by command.
+
+    A consumer waiting for a kind of message (e.g. the EOP messages at the
+    end of a protocol) blocks on the mailbox of its commands, instead of
+    taking every message from a shared queue and putting back the ones it
+    does not want. Messages without a route, and raw data that could not
+    be decoded, are kept in this mailbox itself, so the Mailbox API works
+    as usual for them. Routes have to be added before the listener starts,
+    and the listener has to decode messages (decode=True).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._routes: dict = {} # command : Mailbox
+
+    def route(self, *commands) -> Mailbox:
+        """!Return a new mailbox receiving the messages with any of the given commands."""
+        mailbox = Mailbox()
+        for command in commands:
+            self._routes[command] = mailbox
+        return mailbox
+
+    def mailbox(self, command) -> Mailbox:
+        """!Return the mailbox of the messages with the given command (this one if not routed)."""
+        return self._routes.get(command, self)
+
+    def _split(self, items: list) -> dict:
+        """!Return the items grouped by mailbox, in order."""
+        groups = {}
+        for item in items:
+            mailbox = self._routes.get(getattr(item, "command", None), self)
+            groups.setdefault(mailbox, []).append(item)
+        return groups
+
+    def put(self, item):
+        """!Append an item to its mailbox."""
+        mailbox = self._routes.get(getattr(item, "command", None), self)
+        if mailbox is self:
+            super().put(item)
+        else:
+            mailbox.put(item)
+
+    def put_many(self, items: list):
+        """!Append a batch of items, waking up the consumer of each mailbox at most once."""
+        for mailbox, group in self._split(items).items():
+            if mailbox is self:
+                super().put_many(group)
+            else:
+                mailbox.put_many(group)
+
+    def put_front(self, items: list):
+        """!Put items back at the head of their mailboxes, in order."""
+        for mailbox, group in self._split(items).items():
+            if mailbox is self:
+                super().put_front(group)
+            else:
+                mailbox.put_front(group)
+
+
+def _decode(data: bytes):
+    """!Deserialize data, leaving it raw if it is malformed so that the protocol reports the error."""
+    try:
+        return Message.deserialize(data)
+    except Exception:
+        return data
+
+def deliver(message_queue, batch: list, decode: bool, reassembler: Reassembler = None):
+    """!Put a batch of datagrams in message_queue, optionally decoding them first.
+
+    Fragments are handed to reassembler, and only complete messages are queued.
+    """
+    if reassembler is not None:
+        batch = [data for data in map(reassembler.add, batch) if data is not None]
+        if not batch:
+            return
+    if decode:
+        batch = [_decode(data) for data in batch]
+    if isinstance(message_queue, Mailbox): # Mailboxes too, routing the batch
+        message_queue.put_many(batch)
+    else:
+        for item in batch:
+            message_queue.put(item)
 
 
 class MessageListener(threading.Thread):
     """!Thread that continuously listens for incoming messages and puts them in a queue."""    
 
-    def __init__(self, socket: socket.socket, message_queue: queue.Queue):
+    def __init__(self, socket: socket.socket, message_queue: Mailbox, decode: bool = False):
         """!Initialize the message listener thread.
         
         @param socket (socket): The socket to listen on.
-        @param message_queue (queue): Queue to store received messages.
+        @param message_queue (Mailbox): Queue to store received messages.
+        @param decode (bool): if True, messages are deserialized by the listener
+            and queued as Message objects. Can be changed while running.
 
         @return None
         """
         super().__init__()
+        enlarge_receive_buffer(socket)
         self.socket = socket
         self.message_queue = message_queue
+        self.decode = decode
+        self.reassembler = Reassembler()
         self.running = True
         self.daemon = True  # Thread will exit when main program exits
         
@@ -24,8 +229,9 @@ class MessageListener(threading.Thread):
         """!Listen for messages."""
         while self.running:
             try:
-                data, addr = self.socket.recvfrom(4096)  # Using standard buffer size
-                self.message_queue.put(data)
+                data = self.socket.recv(DATAGRAM_SIZE)
+                # everything that arrived meanwhile is handed over in one batch.
+                deliver(self.message_queue, drain(self.socket, data), self.decode, self.reassembler)
             except socket.error:
                 if self.running:  # Only log if we're still meant to be running
                     print("Socket error occurred in listener thread")
@@ -33,3 +239,41 @@ class MessageListener(threading.Thread):
     def stop(self):
         """Stop the listener thread."""
         self.running = False
+
+
+class MultiMessageListener(threading.Thread):
+    """!Thread that listens on several sockets, putting each message in the queue of its socket."""
+
+    def __init__(self):
+        """!Initialize the message listener thread.
+
+        Sockets have to be registered before starting the thread.
+
+        @return None
+        """
+        super().__init__()
+        self.selector = selectors.DefaultSelector()
+        self.decode = False
+        self.reassembler = Reassembler()
+        self.running = True
+        self.daemon = True  # Thread will exit when main program exits
+
+    def register(self, socket: socket.socket, message_queue: Mailbox):
+        """!Listen on socket, storing its messages in message_queue."""
+        enlarge_receive_buffer(socket)
+        self.selector.register(socket, selectors.EVENT_READ, message_queue)
+
+    def run(self):
+        """!Listen for messages."""
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.5):
+                try:
+                    data = key.fileobj.recv(DATAGRAM_SIZE)
+                    deliver(key.data, drain(key.fileobj, data), self.decode, self.reassembler)
+                except socket.error:
+                    # the owner closed the socket, stop polling it.
+                    self.selector.unregister(key.fileobj)
+
+    def stop(self):
+        """Stop the listener thread."""
+        self.running = False
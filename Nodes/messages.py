@@ -1,9 +1,13 @@
-import json
+import zlib
 from Nodes.const import Command
+from Nodes.serialization import get_codec, detect_codec
 
 class Message:
     """!Basic Message Class. All messages should inherit from this class."""
     _message_types = {}    
+    _message_ids = {}
+    ## Codec used by serialize(), see Nodes.serialization.
+    codec = get_codec("binary")
     def __init__(self, command:str, sender:int=None):
         self.command = command
         self.sender = sender
@@ -22,28 +26,50 @@ class Message:
 
     def serialize(self) -> bytes:
         """!Serialize to bytes before network transmission."""
-        return json.dumps(self.to_dict()).encode('utf-8')
+        return Message.codec.encode(self)
     
     @staticmethod
     def deserialize(data: bytes):
-        """Deserialize JSON data into appropriate message type."""
-        json_data = json.loads(data.decode('utf-8'))
-        msg_type = json_data.pop("type")
+        """Deserialize data into appropriate message type, whatever codec encoded it.
+
+        Malformed data raises a ValueError.
+        """
+        msg_type, fields = detect_codec(data).decode(data)
         
-        # Get the message class from registry by class name only
-        if msg_type not in Message._message_types:
+        # Get the message class from registry by class name (json) or type ID (binary)
+        registry = Message._message_ids if isinstance(msg_type, int) else Message._message_types
+        if msg_type not in registry:
             raise ValueError(f"Unknown message type: {msg_type}")
-        msg_class = Message._message_types[msg_type]        
-        obj =  msg_class.from_dict(json_data)
-        if "seq_number" in json_data:
-            obj.seq_number = json_data["seq_number"]
+        msg_class = registry[msg_type]        
+        try:
+            obj =  msg_class.from_dict(fields)
+        except KeyError as e:
+            raise ValueError(f"Malformed {msg_class.__name__}: missing field {e}.") from None
+        if "seq_number" in fields:
+            obj.seq_number = fields["seq_number"]
         return obj    
+
+    @staticmethod
+    def use_codec(name: str):
+        """!Select the codec used to serialize messages in this process ("binary" or "json")."""
+        Message.codec = get_codec(name)
     
     @classmethod
     def register(cls, message_class):
-        """Register a message type by its class name."""
+        """Register a message type by its class name.
+
+        The class also gets an integer type ID, used by the binary codec.
+        It is derived from the name, so it is the same in every process.
+        """
         # Register by class name only
-        cls._message_types[message_class.__name__] = message_class
+        name = message_class.__name__
+        type_id = zlib.crc32(name.encode('utf-8'))
+        other = cls._message_ids.get(type_id)
+        if other is not None and other.__name__ != name:
+            raise ValueError(f"Type ID of {name} collides with {other.__name__}, rename the class.")
+        message_class._type_id = type_id
+        cls._message_types[name] = message_class
+        cls._message_ids[type_id] = message_class
         return message_class  # Allow use as decorator
     
     @classmethod
@@ -130,6 +156,30 @@ class FloodingMessage(Message):
     def __str__(self):
         return super().__str__() + f"Origin: {self.origin}, Counter: {self.counter}"
     
+@Message.register
+class ReadyMessage(Message):
+    """!Message used by nodes to report the port they are actually listening on."""
+
+    def __init__(self, port:int, group:int=None, command:str=Command.READY):
+        super().__init__(command, port)
+        self.port = port
+        self.group = group
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "port": self.port,
+            "group": self.group
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["port"], data["group"], data["command"])
+
+    def __str__(self):
+        return super().__str__() + f"Port: {self.port}, Group: {self.group}"
+
 @Message.register
 class SetupMessage(Message):
     """!Message used by the initializer during the setup procedure."""
@@ -142,7 +192,13 @@ class SetupMessage(Message):
                  exp_path:str,
                  visualizer_port:int=None,
                  sender:int=None,
-                 command:str=Command.SETUP):
+                 command:str=Command.SETUP,
+                 codec:str=None,
+                 reliable:float=None,
+                 aggregate:bool=False,
+                 links:dict=None,
+                 crash:list=None,
+                 trace:str=None):
         super().__init__(command, sender)
         self.node = node
         self.edges = edges
@@ -150,6 +206,17 @@ class SetupMessage(Message):
         self.shell = shell
         self.exp_path = exp_path
         self.visualizer_port = visualizer_port
+        self.codec = codec
+        # retransmission timeout of the reliable channel, None if disabled.
+        self.reliable = reliable
+        # combine EOP and COUNT_M with the other nodes of the process (see Nodes.reports).
+        self.aggregate = aggregate
+        # neighbor : settings of the emulated link towards it (see Nodes.emulation), None if not emulated.
+        self.links = links
+        # [fault, messages] of a crash planned after a number of messages (see Nodes.faults), None if not planned.
+        self.crash = crash
+        # directory of the message traces (see Nodes.trace), None if tracing is disabled.
+        self.trace = trace
     
     def to_dict(self) -> dict:
         data = super().to_dict()
@@ -159,7 +226,13 @@ class SetupMessage(Message):
             "local_dns": self.local_dns,
             "shell": self.shell,
             "exp_path": self.exp_path,
-            "visualizer_port": self.visualizer_port
+            "visualizer_port": self.visualizer_port,
+            "codec": self.codec,
+            "reliable": self.reliable,
+            "aggregate": self.aggregate,
+            "links": self.links,
+            "crash": self.crash,
+            "trace": self.trace
         })
         return data
 
@@ -167,15 +240,32 @@ class SetupMessage(Message):
     def from_dict(cls, data):
         # fix json converting everything to string
         local_dns = {int(key):val for key, val in data["local_dns"].items()}
+        links = data.get("links")
+        if links:
+            links = {int(key):val for key, val in links.items()}
         return cls(
             data["node"], data["edges"], local_dns,
             data["shell"], data["exp_path"], data["visualizer_port"],
-            data["sender"], data["command"]
+            data["sender"], data["command"], data.get("codec"),
+            data.get("reliable"), data.get("aggregate", False), links,
+            data.get("crash"), data.get("trace")
         )    
 
     def __str__(self):
         return super().__str__() + f"{self.edges}\n{self.local_dns}\n{self.shell}\n{self.exp_path}\n{self.visualizer_port}"
 
+def setup_message(data):
+    """!Return data as a SetupMessage, None if it is another message.
+
+    Used by nodes waiting for their setup, that can already receive
+    messages (or reliable frames) from neighbors setup earlier.
+    """
+    try:
+        message = Message.deserialize(data)
+    except Exception:
+        return None
+    return message if isinstance(message, SetupMessage) else None
+
 @Message.register
 class CountMessage(Message):
     """!Message used in the count protocol."""
@@ -320,13 +410,14 @@ class MinFindingMessage(Message):
         data.update({
             "value":self.value
         })
+        return data
 
     @classmethod
     def from_dict(cls, data):
         return cls(data["command"], data["value"], data["sender"])
         
     def __str__(self):
-        return super().__str__() + f"Sender: {self.sender}, Counter: {self.counter}"
+        return super().__str__() + f"Sender: {self.sender}, Value: {self.value}"
 
 @Message.register
 class EndOfVisualizationMessage(Message):
@@ -360,5 +451,190 @@ class TerminationMessage(Message):
     def __str__(self):
         base = super().__str__()
         return base + "\n" + self.payload
+
+@Message.register
+class TimerMessage(Message):
+    """!Message delivered by the timer service of a node when a timer expires (see Nodes.timers)."""
+
+    def __init__(self, timer_id:int, name, delay:float, command:str=Command.TIMER, sender:int=None):
+        super().__init__(command, sender)
+        self.timer_id = timer_id
+        self.name = name
+        self.delay = delay
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "timer_id": self.timer_id,
+            "name": self.name,
+            "delay": self.delay
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["timer_id"], data["name"], data["delay"], data["command"], data["sender"])
+
+    def __str__(self):
+        return super().__str__() + f"Timer: {self.name} ({self.timer_id})"
+
+@Message.register
+class ResetMessage(Message):
+    """!Message used by a node pool to provision a warm process for a new run (see Nodes.pool)."""
+
+    def __init__(self,
+                 hostname:str,
+                 back:int,
+                 ports:list,
+                 protocol:str,
+                 node_class:str=None,
+                 fifo:bool=False,
+                 protocol_kwargs:dict=None,
+                 seed:int=None,
+                 command:str=Command.RESET,
+                 sender:int=None):
+        super().__init__(command, sender)
+        self.hostname = hostname
+        self.back = back
+        self.ports = ports
+        # "module:Class" specs, imported by the pool process.
+        self.protocol = protocol
+        self.node_class = node_class
+        self.fifo = fifo
+        self.protocol_kwargs = protocol_kwargs
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "hostname": self.hostname,
+            "back": self.back,
+            "ports": self.ports,
+            "protocol": self.protocol,
+            "node_class": self.node_class,
+            "fifo": self.fifo,
+            "protocol_kwargs": self.protocol_kwargs,
+            "seed": self.seed
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["hostname"], data["back"], data["ports"], data["protocol"],
+                   data["node_class"], data["fifo"], data["protocol_kwargs"], data["seed"],
+                   data["command"], data["sender"])
+
+    def __str__(self):
+        return super().__str__() + f"{self.protocol} on {len(self.ports)} nodes, seed {self.seed}"
+
+@Message.register
+class LaunchMessage(Message):
+    """!Message used to ask the fork server for a node process, and to answer with its process ID (see Nodes.forkserver)."""
+
+    def __init__(self, args:list, shard:int, pid:int=None, command:str=Command.LAUNCH, sender:int=None):
+        super().__init__(command, sender)
+        self.args = args
+        self.shard = shard
+        self.pid = pid
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "args": self.args,
+            "shard": self.shard,
+            "pid": self.pid
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["args"], data["shard"], data["pid"], data["command"], data["sender"])
+
+    def __str__(self):
+        return super().__str__() + f"Shard: {self.shard}, Args: {self.args}, PID: {self.pid}"
+
+@Message.register
+class RoundMessage(Message):
+    """!Marker closing a round of a synchronous protocol on a link (see Nodes.Protocols.SyncProtocol)."""
+
+    def __init__(self, round:int, final:bool=False, sender:int=None, command:str=Command.ROUND):
+        super().__init__(command, sender)
+        self.round = round
+        # True if the sender terminated: no more messages will follow.
+        self.final = final
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "round": self.round,
+            "final": self.final
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["round"], data["final"], data["sender"], data["command"])
+
+    def __str__(self):
+        return super().__str__() + f"Round: {self.round}, Final: {self.final}"
+
+@Message.register
+class ReportMessage(Message):
+    """!EOP or COUNT_M message summarizing the reports of several nodes (see Nodes.reports)."""
+
+    def __init__(self, command:str, nodes:int, counter:int=None, sender:int=None):
+        super().__init__(command, sender)
+        # number of nodes covered by the summary.
+        self.nodes = nodes
+        # total number of messages sent by those nodes (COUNT_M only).
+        self.counter = counter
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "nodes": self.nodes,
+            "counter": self.counter
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["command"], data["nodes"], data["counter"], data["sender"])
+
+    def __str__(self):
+        return super().__str__() + f"Nodes: {self.nodes}, Counter: {self.counter}"
     
-Message.register(Message)
\ No newline at end of file
+Message.register(Message)
+
+@Message.register
+class FaultMessage(Message):
+    """!Fault sent by the initializer to a node, or crash reported by a node (see Nodes.faults)."""
+
+    def __init__(self, fault:int, action:str, neighbors:list=None, counter:int=None, sender:int=None,
+                 command:str=Command.FAULT):
+        super().__init__(command, sender)
+        # position of the fault in the plan.
+        self.fault = fault
+        # "crash", "partition" or "heal".
+        self.action = action
+        # neighbors cut off by a partition.
+        self.neighbors = neighbors if neighbors is not None else []
+        # messages sent by a crashed node before the crash.
+        self.counter = counter
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update({
+            "fault": self.fault,
+            "action": self.action,
+            "neighbors": self.neighbors,
+            "counter": self.counter
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["fault"], data["action"], data["neighbors"], data["counter"], data["sender"], data["command"])
+
+    def __str__(self):
+        return super().__str__() + f"Fault: {self.fault}, Action: {self.action}, Neighbors: {self.neighbors}"
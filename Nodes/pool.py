@@ -0,0 +1,214 @@
+import importlib
+import os
+import random
+import socket
+import subprocess as sp
+import sys
+import time
+from Nodes.messages import *
+from Nodes.const import Command
+from Nodes.comunication import ComunicationManager
+from Nodes.worker import Worker
+from Nodes.Nodes.Node import Node
+
+## Seconds a pool process has to finish its run before it is replaced.
+DEFAULT_TIMEOUT = 60.0
+
+
+def load(spec: str):
+    """!Return the object named by a "module:attribute" spec.
+
+    @param spec (str): e.g. "Nodes.Protocols.Shout:Shout".
+
+    @return the imported attribute.
+    """
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"Expected a \"module:attribute\" spec, got \"{spec}\".")
+    obj = importlib.import_module(module)
+    for part in name.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def spec(obj) -> str:
+    """!Return the "module:attribute" spec of a class, leaving strings unchanged."""
+    if isinstance(obj, str):
+        return obj
+    return f"{obj.__module__}:{obj.__qualname__}"
+
+
+class NodePool(ComunicationManager):
+    """!Warm worker processes reused by the initializers of a sweep.
+
+    Every process of the pool starts once (python -m Nodes.pool) and then
+    waits for RESET messages. A RESET carries the ports, the protocol,
+    the node class and the seed of a run: the process hosts those nodes
+    as a Worker until the protocol terminates, and then waits for the
+    next RESET. A sweep pays the startup of the processes (interpreter
+    and imports) once instead of once per run:
+
+        with NodePool(4) as pool:
+            for n in sizes:
+                init = Initializer("Nodes.Protocols.Shout:Shout", "localhost", 0, G, shell=False, pool=pool, seed=n)
+                ...
+                init.close()
+
+    A process that does not finish its run within timeout seconds is
+    killed and replaced before the next run, so runs cannot leak
+    processes into the following ones. close() shuts down the pool.
+    """
+
+    def __init__(self, processes: int, hostname: str="localhost", timeout: float=DEFAULT_TIMEOUT):
+        """!Start the processes of the pool and wait until they are ready.
+
+        @param processes (int): number of worker processes.
+        @param hostname (str): IP where the pool (and the initializers) listen.
+        @param timeout (float): seconds a process has to become ready, at startup or after a run.
+
+        @return None
+        """
+        super().__init__()
+        self._hostname: str = hostname
+        self._timeout: float = timeout
+        self._s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._s.bind(("", 0))
+        self._PORT: int = self._s.getsockname()[1]
+        self.start_listener(self._s, self.message_queue)
+        self._processes: dict = {} # process ID : Popen
+        self._control: dict = {} # process ID : control port
+        self._idle: set = set() # process IDs waiting for a RESET
+        for _ in range(processes):
+            self._spawn()
+        self._wait_idle()
+
+    @property
+    def PORT(self):
+        """!Return the port where the pool processes report to."""
+        return self._PORT
+
+    @property
+    def processes(self):
+        """!Return the process IDs of the pool."""
+        return list(self._processes)
+
+    def __len__(self):
+        return len(self._processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _spawn(self):
+        process = sp.Popen([sys.executable, "-m", "Nodes.pool", self._hostname, str(self.PORT)])
+        self._processes[process.pid] = process
+
+    def _wait_idle(self):
+        """!Wait until every process is ready for a RESET, replacing the ones that do not answer in time."""
+        while True:
+            deadline = time.monotonic() + self._timeout
+            while len(self._idle) < len(self._processes) and time.monotonic() < deadline:
+                data = self.receive_message(max(0, deadline - time.monotonic()))
+                if not data: continue
+                message = Message.deserialize(data)
+                if message.command == Command.READY and message.group in self._processes:
+                    self._control[message.group] = message.port
+                    self._idle.add(message.group)
+            stuck = [pid for pid in self._processes if pid not in self._idle]
+            if not stuck:
+                return
+            for pid in stuck:
+                print(f"Pool process {pid} did not finish in time, replacing it.")
+                self._processes.pop(pid).kill()
+                self._control.pop(pid, None)
+                self._spawn()
+
+    def reset(self, back: int, shards: list, protocol, node_class=None, fifo: bool=False,
+              protocol_kwargs: dict=None, seed: int=None) -> list:
+        """!Provision the processes for a new run.
+
+        @param back (int): port of the initializer of the run.
+        @param shards (list): ports of the nodes hosted by each process (0 = chosen by the OS).
+        @param protocol: Protocol subclass, or its "module:Class" spec.
+        @param node_class: Node subclass (or spec) used for every node, Node by default.
+        @param fifo (bool): turn on fifo mode on every node.
+        @param protocol_kwargs (dict): extra arguments for the protocol constructor.
+        @param seed (int): seed of the random module in every process.
+
+        @return list of the process IDs hosting each shard, as reported in the RDY messages.
+        """
+        if len(shards) > len(self._processes):
+            raise ValueError(f"{len(shards)} shards requested, the pool has {len(self._processes)} processes.")
+        self._wait_idle()
+        pids = list(self._processes)[:len(shards)]
+        for pid, ports in zip(pids, shards):
+            message = ResetMessage(self._hostname, back, list(ports), spec(protocol),
+                                   spec(node_class) if node_class else None, fifo,
+                                   protocol_kwargs, seed)
+            self.send_datagram(message.serialize(), self._control[pid])
+            self._idle.discard(pid)
+        return pids
+
+    def close(self):
+        """!Shut down every process of the pool."""
+        data = Message(Command.SHUTDOWN).serialize()
+        for port in self._control.values():
+            self.send_datagram(data, port)
+        deadline = time.monotonic() + self._timeout
+        for process in self._processes.values():
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except sp.TimeoutExpired:
+                process.kill()
+        self._processes = {}
+        self._control = {}
+        self._idle = set()
+        self.listener.stop()
+        self._s.close()
+        self.close_sender()
+
+
+def serve(hostname: str, pool_port: int):
+    """!Main loop of a pool process: run a Worker for every RESET until SHUTDOWN."""
+    manager = ComunicationManager()
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("", 0))
+    control_port = s.getsockname()[1]
+    manager.start_listener(s, manager.message_queue)
+    ready = ReadyMessage(control_port, os.getpid()).serialize()
+    manager.send_datagram(ready, pool_port)
+    while True:
+        data = manager.receive_message()
+        try:
+            message = Message.deserialize(data)
+        except Exception as e:
+            print(f"Error while deserializing message: {e}")
+            continue
+        if message.command == Command.SHUTDOWN:
+            break
+        if message.command != Command.RESET:
+            continue
+        random.seed(message.seed)
+        try:
+            worker = Worker(message.hostname,
+                            message.back,
+                            message.ports,
+                            load(message.protocol),
+                            load(message.node_class) if message.node_class else Node,
+                            message.fifo,
+                            message.protocol_kwargs)
+            worker.run()
+        except Exception as e:
+            print(f"Run failed in pool process {os.getpid()}: {e}")
+        manager.send_datagram(ready, pool_port)
+    manager.listener.stop()
+    s.close()
+    manager.close_sender()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise ValueError('Please provide HOST and pool PORT.')
+    serve(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,271 @@
+# Reliable delivery of node-to-node messages over UDP.
+# Every message sent to a neighbor is wrapped in a DATA frame carrying a
+# per-link sequence number. The receiver answers each DATA frame with an
+# ACK frame (cumulative sequence number plus selective acks), drops
+# duplicates and hands the payloads to the protocol in sequence order,
+# so links stay FIFO as protocols like Shout expect. The sender keeps a
+# window of unacknowledged frames and retransmits them on a timer.
+# Frames start with their own magic byte, so they are told apart from
+# plain messages of any codec.
+import struct
+import time
+from collections import deque
+from Nodes.messages import Message
+from Nodes.const import Command
+
+DATA_MAGIC = 0xB3
+ACK_MAGIC = 0xB4
+
+## Default retransmission timeout in seconds.
+DEFAULT_RTO = 0.2
+## Default number of unacknowledged frames per link.
+DEFAULT_WINDOW = 64
+## Default number of retransmissions of a frame before giving up.
+DEFAULT_MAX_RETRIES = 25
+## Maximum number of selective acks carried by an ACK frame.
+MAX_SACKS = 64
+
+# DATA: magic, sender port, sequence number, payload
+_DATA = struct.Struct("<BII")
+# ACK: magic, sender port, cumulative sequence number, number of selective acks
+_ACK = struct.Struct("<BIIH")
+_SEQ = struct.Struct("<I")
+
+# periods without frames after which a terminated node stops acknowledging.
+_LINGER = 5
+
+
+class Link:
+    """!State and counters of the reliable channel with one neighbor."""
+
+    def __init__(self, port: int):
+        self.port: int = port
+        # ========== sender side ==========
+        self.next_seq: int = 0
+        # seq : [frame, tick of the last transmission, retransmissions]
+        self.unacked: dict = {}
+        # (seq, frame) waiting for room in the window
+        self.backlog: deque = deque()
+        # ========== receiver side ==========
+        # every frame with a lower sequence number has been delivered.
+        self.cumulative: int = 0
+        # seq : payload of frames received ahead of cumulative
+        self.held: dict = {}
+        # ========== counters ==========
+        self.sent: int = 0
+        self.retransmitted: int = 0
+        self.acked: int = 0
+        self.failed: int = 0
+        self.delivered: int = 0
+        self.duplicates: int = 0
+        self.acks_sent: int = 0
+
+    def idle(self) -> bool:
+        """!Return True if every frame sent on the link was acknowledged (or given up)."""
+        return not self.unacked and not self.backlog
+
+    def stats(self) -> dict:
+        """!Return the counters of the link."""
+        return {
+            "sent": self.sent,
+            "retransmitted": self.retransmitted,
+            "acked": self.acked,
+            "failed": self.failed,
+            "in_flight": len(self.unacked) + len(self.backlog),
+            "delivered": self.delivered,
+            "held": len(self.held),
+            "duplicates": self.duplicates,
+            "acks_sent": self.acks_sent,
+        }
+
+
+class ReliableChannel:
+    """!Acks, retransmissions and duplicate suppression for the links of a node.
+
+    Enabled by the initializer during setup (see the reliable parameter
+    of Initializer). Retransmissions are driven by a periodic node timer
+    of period rto, that is active only while some frame is unacknowledged:
+    a frame is sent again when it is older than one full period.
+    """
+
+    def __init__(self,
+                 node,
+                 rto: float=DEFAULT_RTO,
+                 window: int=DEFAULT_WINDOW,
+                 max_retries: int=DEFAULT_MAX_RETRIES):
+        """!
+        @param node (Node): owner of the channel.
+        @param rto (float): retransmission timeout.
+        @param window (int): maximum number of unacknowledged frames per link.
+        @param max_retries (int): retransmissions of a frame before it is counted as failed.
+        """
+        self._node = node
+        self._rto: float = rto
+        self._window: int = window
+        self._max_retries: int = max_retries
+        self._links: dict = {} # port of the neighbor : Link
+        self._tick: int = 0
+        self._timer = None
+
+    @property
+    def rto(self):
+        """!Return the retransmission timeout."""
+        return self._rto
+
+    @property
+    def links(self):
+        """!Return the links used so far (port of the neighbor : Link)."""
+        return self._links
+
+    def stats(self) -> dict:
+        """!Return the counters of every link (ID of the neighbor : counters)."""
+        return {self._node.reverse_local_dns.get(port, port): link.stats()
+                for port, link in self.links.items()}
+
+    def idle(self) -> bool:
+        """!Return True if no frame is waiting for an ack."""
+        return all(link.idle() for link in self.links.values())
+
+    def _link(self, port: int) -> Link:
+        link = self._links.get(port)
+        if link is None:
+            link = self._links[port] = Link(port)
+        return link
+
+    @staticmethod
+    def is_frame(data: bytes) -> bool:
+        """!Return True if data is a frame of the reliable channel."""
+        return len(data) > 0 and data[0] in (DATA_MAGIC, ACK_MAGIC)
+
+    def send(self, data: bytes, port: int):
+        """!Send a serialized message to a neighbor, retransmitting it until acknowledged."""
+        link = self._link(port)
+        seq = link.next_seq
+        link.next_seq += 1
+        frame = _DATA.pack(DATA_MAGIC, self._node.port, seq) + data
+        if len(link.unacked) < self._window:
+            self._transmit(link, seq, frame)
+        else:
+            link.backlog.append((seq, frame))
+        if self._timer is None or not self._timer.active:
+            self._timer = self._node.set_timer(self.rto, "RETRANSMIT", periodic=True)
+
+    def _transmit(self, link: Link, seq: int, frame: bytes):
+        link.unacked[seq] = [frame, self._tick, 0]
+        link.sent += 1
+        self._node._emit(frame, link.port)
+
+    def receive(self, data: bytes) -> list:
+        """!Handle a frame.
+
+        @return list of the messages that can be delivered, in order
+            (empty for acks, duplicates and frames received ahead of a missing one).
+        """
+        if data[0] == ACK_MAGIC:
+            self._on_ack(data)
+            return []
+        _, port, seq = _DATA.unpack_from(data)
+        link = self._link(port)
+        ready = []
+        if seq == link.cumulative:
+            ready.append(data[_DATA.size:])
+            link.cumulative += 1
+            while link.cumulative in link.held:
+                ready.append(link.held.pop(link.cumulative))
+                link.cumulative += 1
+            link.delivered += len(ready)
+        elif seq > link.cumulative and seq not in link.held:
+            link.held[seq] = data[_DATA.size:]
+        else:
+            link.duplicates += 1
+        # duplicates are acknowledged too, the previous ack may be lost.
+        sacks = sorted(link.held)[:MAX_SACKS] if link.held else []
+        ack = bytearray(_ACK.pack(ACK_MAGIC, self._node.port, link.cumulative, len(sacks)))
+        for sack in sacks:
+            ack += _SEQ.pack(sack)
+        link.acks_sent += 1
+        self._node._emit(bytes(ack), port)
+        return ready
+
+    def _on_ack(self, data: bytes):
+        _, port, cumulative, count = _ACK.unpack_from(data)
+        link = self._links.get(port)
+        if link is None:
+            return
+        acked = [seq for seq in link.unacked if seq < cumulative]
+        for i in range(count):
+            seq = _SEQ.unpack_from(data, _ACK.size + i * _SEQ.size)[0]
+            if seq >= cumulative and seq in link.unacked:
+                acked.append(seq)
+        for seq in acked:
+            del link.unacked[seq]
+        link.acked += len(acked)
+        self._refill(link)
+
+    def _refill(self, link: Link):
+        """!Send frames of the backlog while there is room in the window."""
+        while link.backlog and len(link.unacked) < self._window:
+            seq, frame = link.backlog.popleft()
+            self._transmit(link, seq, frame)
+
+    def owns(self, message: Message) -> bool:
+        """!Return True if message is the expiration of the retransmission timer."""
+        return self._timer is not None and message.timer_id == self._timer.id
+
+    def on_timer(self):
+        """!Retransmit the frames older than one period, stop the timer when everything is acknowledged."""
+        self._tick += 1
+        for link in self.links.values():
+            for seq, entry in list(link.unacked.items()):
+                if self._tick - entry[1] < 2:
+                    continue
+                if entry[2] >= self._max_retries:
+                    del link.unacked[seq]
+                    link.failed += 1
+                    continue
+                entry[1] = self._tick
+                entry[2] += 1
+                link.retransmitted += 1
+                self._node._emit(entry[0], link.port)
+            self._refill(link)
+        if self.idle():
+            self._timer.cancel()
+
+    def handle_after_termination(self, data):
+        """!Handle a message received after the protocol terminated.
+
+        Acks and retransmissions still have to be processed, and DATA
+        frames acknowledged so that neighbors stop retransmitting.
+        Everything else is discarded.
+        """
+        if isinstance(data, Message):
+            if (data.command == Command.TIMER and self.owns(data)
+                    and self._node.timers.accept(data)):
+                self.on_timer()
+        elif self.is_frame(data):
+            self.receive(data)
+
+    def flush(self):
+        """!Wait until every frame is acknowledged or given up.
+
+        Used at cleanup by runtimes where the node reads its own queue.
+        The node also keeps acknowledging frames until none arrives for
+        a few periods, since the last ack it sent could be lost too.
+        """
+        node = self._node
+        quiet_until = time.monotonic() + _LINGER * self.rto
+        while True:
+            now = time.monotonic()
+            if self.idle():
+                if now >= quiet_until:
+                    break
+                timeout = quiet_until - now
+            else:
+                node.timers.expire()
+                timeout = node.timers.timeout()
+            data = node.receive_message(timeout)
+            if data is None:
+                continue
+            if not isinstance(data, Message) and self.is_frame(data):
+                quiet_until = time.monotonic() + _LINGER * self.rto
+            self.handle_after_termination(data)
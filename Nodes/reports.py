@@ -0,0 +1,92 @@
+import threading
+from Nodes.messages import ReportMessage
+from Nodes.const import Command
+
+
+class ReportAggregator:
+    """!Combine the end of protocol reports of the nodes hosted by a process.
+
+    At the end of a run every node sends an EOP message and, for most
+    protocols, a COUNT_M message to the initializer: 2n datagrams towards
+    a single socket. With Initializer(aggregate=True), nodes hosted by a
+    worker or by the async runtime hand their reports to the aggregator
+    of their process instead. It forwards one EOP summary once all its
+    nodes terminated and one COUNT_M summary once all of them counted
+    their messages (ReportMessage, carrying the number of nodes covered),
+    so the initializer receives two messages per process.
+
+    Reports are made from the threads of the protocols, a lock keeps the
+    counters consistent.
+    """
+
+    def __init__(self, nodes: int):
+        """!
+        @param nodes (int): number of nodes hosted by the process.
+        """
+        self._nodes: int = nodes
+        self._lock = threading.Lock()
+        self._terminated: int = 0
+        self._counted: int = 0
+        self._counter: int = 0
+        # summaries already sent (EOP, COUNT_M).
+        self._sent: set = set()
+        # node used to send the summaries, the last one that reported.
+        self._node = None
+
+    @property
+    def terminated(self):
+        """!Return the number of nodes that reported their termination."""
+        return self._terminated
+
+    @property
+    def counted(self):
+        """!Return the number of nodes that reported their number of messages."""
+        return self._counted
+
+    def end_of_protocol(self, node):
+        """!Record the termination of a node, sending the EOP summary after the last one."""
+        with self._lock:
+            self._terminated += 1
+            self._node = node
+            if self._terminated == self._nodes:
+                self._send(Command.END_PROTOCOL)
+
+    def total_messages(self, node, counter: int):
+        """!Record the number of messages sent by a node, sending the COUNT_M summary after the last one."""
+        with self._lock:
+            self._counted += 1
+            self._counter += counter
+            self._node = node
+            if self._counted == self._nodes:
+                self._send(Command.COUNT_M)
+
+    def crashed(self):
+        """!Leave out a crashed node, that reports its crash to the initializer by itself (see Nodes.faults)."""
+        with self._lock:
+            self._nodes -= 1
+            if self._terminated and self._terminated == self._nodes:
+                self._send(Command.END_PROTOCOL)
+            if self._counted and self._counted == self._nodes:
+                self._send(Command.COUNT_M)
+
+    def flush(self):
+        """!Send the summaries not sent yet, covering the nodes that reported so far.
+
+        Called by the process once its protocols stopped: nodes that did not
+        report (e.g. protocols that do not count their messages) are left out.
+        """
+        with self._lock:
+            if self._terminated:
+                self._send(Command.END_PROTOCOL)
+            if self._counted:
+                self._send(Command.COUNT_M)
+
+    def _send(self, command):
+        if command in self._sent:
+            return
+        self._sent.add(command)
+        if command == Command.END_PROTOCOL:
+            message = ReportMessage(command, self._terminated, sender=self._node.id)
+        else:
+            message = ReportMessage(command, self._counted, self._counter, self._node.id)
+        self._node._send(message, self._node.back)
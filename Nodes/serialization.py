@@ -0,0 +1,283 @@
+# Wire codecs used to serialize messages. Two codecs are available:
+# + "binary" (default): fixed-layout header followed by the fields of the message;
+# + "json": human readable, useful for debugging.
+# Receivers detect the codec from the first byte of the datagram, so nodes
+# using different codecs can still talk to each other.
+import json
+import struct
+from Nodes.const import Command
+
+## First byte of every datagram encoded with the binary codec (JSON always starts with '{').
+BINARY_MAGIC = 0xB1
+
+# header: magic, flags, type ID, command index, sender, sequence number
+HEADER = struct.Struct("<BBIBqI")
+## Offset of the sequence number in the binary header.
+SEQ_OFFSET = HEADER.size - 4
+
+# header flags
+_NO_SENDER = 1
+_INLINE_SENDER = 2 # sender is not a 64 bit integer, it follows the header.
+_NO_SEQ = 4
+_INLINE_COMMAND = 8 # command is not in the table, it follows the header.
+
+# Commands that fit in the header. The table only depends on the source code,
+# so it is the same in every process.
+_COMMANDS = [command.value for command in Command] + ["VIS", "EOV"]
+_COMMAND_INDEX = {command:i for i, command in enumerate(_COMMANDS)}
+
+# keys of to_dict() carried by the header.
+_HEADER_KEYS = ("type", "command", "sender", "seq_number")
+
+# value tags
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT8 = 3
+_INT32 = 4
+_INT64 = 5
+_BIGINT = 6
+_FLOAT = 7
+_SHORT_STR = 8
+_STR = 9
+_LIST = 10
+_DICT = 11
+_BYTES = 12
+
+_I8 = struct.Struct("<b")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+_U32 = struct.Struct("<I")
+_F64 = struct.Struct("<d")
+
+
+def _encode_value(value, out: bytearray):
+    """!Append the tagged encoding of value to out."""
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if -128 <= value < 128:
+            out.append(_INT8)
+            out += _I8.pack(value)
+        elif -2**31 <= value < 2**31:
+            out.append(_INT32)
+            out += _I32.pack(value)
+        elif -2**63 <= value < 2**63:
+            out.append(_INT64)
+            out += _I64.pack(value)
+        else:
+            data = str(value).encode('utf-8')
+            out.append(_BIGINT)
+            out += _U32.pack(len(data))
+            out += data
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        if len(data) < 256:
+            out.append(_SHORT_STR)
+            out.append(len(data))
+        else:
+            out.append(_STR)
+            out += _U32.pack(len(data))
+        out += data
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _F64.pack(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode_value(item, out)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _encode_value(key, out)
+            _encode_value(item, out)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_BYTES)
+        out += _U32.pack(len(value))
+        out += value
+    else:
+        raise TypeError(f"Cannot serialize value of type {type(value).__name__}")
+
+def _decode_value(data, offset: int):
+    """!Decode the value starting at offset.
+
+    @return (value, offset of the next value)
+    """
+    tag = data[offset]
+    offset += 1
+    if tag == _INT8:
+        return _I8.unpack_from(data, offset)[0], offset + 1
+    if tag == _SHORT_STR:
+        end = offset + 1 + data[offset]
+        return str(data[offset+1:end], 'utf-8'), end
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _FALSE:
+        return False, offset
+    if tag == _INT32:
+        return _I32.unpack_from(data, offset)[0], offset + 4
+    if tag == _INT64:
+        return _I64.unpack_from(data, offset)[0], offset + 8
+    if tag == _FLOAT:
+        return _F64.unpack_from(data, offset)[0], offset + 8
+    if tag == _LIST:
+        count = _U32.unpack_from(data, offset)[0]
+        offset += 4
+        items = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _DICT:
+        count = _U32.unpack_from(data, offset)[0]
+        offset += 4
+        items = {}
+        for _ in range(count):
+            key, offset = _decode_value(data, offset)
+            items[key], offset = _decode_value(data, offset)
+        return items, offset
+    if tag in (_STR, _BIGINT, _BYTES):
+        length = _U32.unpack_from(data, offset)[0]
+        offset += 4
+        raw = bytes(data[offset:offset+length])
+        offset += length
+        if tag == _STR:
+            return raw.decode('utf-8'), offset
+        if tag == _BIGINT:
+            return int(raw), offset
+        return raw, offset
+    raise ValueError(f"Unknown value tag: {tag}")
+
+
+class JsonCodec:
+    """!Encode messages as JSON dictionaries (debug codec)."""
+
+    name = "json"
+
+    def encode(self, message) -> bytes:
+        return json.dumps(message.to_dict()).encode('utf-8')
+
+    def decode(self, data: bytes) -> tuple:
+        """!Return the type (class name) of the message and the dictionary of its fields."""
+        json_data = json.loads(data.decode('utf-8'))
+        if not isinstance(json_data, dict) or "type" not in json_data:
+            raise ValueError("Malformed message: expected a JSON object with a type.")
+        msg_type = json_data.pop("type")
+        return msg_type, json_data
+
+
+class BinaryCodec:
+    """!Encode messages with a fixed-layout header and tagged fields.
+
+    The header contains the type ID assigned by Message.register, the
+    command (as an index in the table of known commands), the sender
+    and the sequence number. The remaining fields of to_dict() follow,
+    each one as a key and a tagged value. Keys are pre-encoded once per
+    class.
+    """
+
+    name = "binary"
+
+    def __init__(self):
+        # class : {key : encoded key}
+        self._keys: dict = {}
+
+    def encode(self, message) -> bytes:
+        cls = message.__class__
+        data = message.to_dict()
+        flags = 0
+        command = data["command"]
+        command_index = _COMMAND_INDEX.get(command)
+        if command_index is None:
+            flags |= _INLINE_COMMAND
+            command_index = 0
+        sender = data["sender"]
+        if sender is None:
+            flags |= _NO_SENDER
+            sender = 0
+        elif type(sender) is not int or not -2**63 <= sender < 2**63:
+            flags |= _INLINE_SENDER
+        seq_number = data.get("seq_number")
+        if seq_number is None:
+            flags |= _NO_SEQ
+            seq_number = 0
+        type_id = cls.__dict__.get("_type_id")
+        if type_id is None:
+            raise ValueError(f"Message type {cls.__name__} is not registered, use @Message.register.")
+        out = bytearray(HEADER.pack(BINARY_MAGIC, flags, type_id, command_index,
+                                    0 if flags & _INLINE_SENDER else sender, seq_number))
+        if flags & _INLINE_COMMAND:
+            _encode_value(command, out)
+        if flags & _INLINE_SENDER:
+            _encode_value(sender, out)
+        keys = self._keys.get(cls)
+        if keys is None:
+            keys = self._keys[cls] = {}
+        for key, value in data.items():
+            if key in _HEADER_KEYS:
+                continue
+            encoded_key = keys.get(key)
+            if encoded_key is None:
+                encoded_key = bytearray()
+                _encode_value(key, encoded_key)
+                encoded_key = keys[key] = bytes(encoded_key)
+            out += encoded_key
+            _encode_value(value, out)
+        return bytes(out)
+
+    def with_sequence_number(self, data: bytes, seq_number: int) -> bytes:
+        """!Return a copy of an encoded message (that has a sequence number) with a different one.
+
+        Used to send the same message on several FIFO links serializing it once.
+        """
+        return data[:SEQ_OFFSET] + _U32.pack(seq_number) + data[SEQ_OFFSET+4:]
+
+    def decode(self, data: bytes) -> tuple:
+        """!Return the type ID of the message and the dictionary of its fields."""
+        try:
+            return self._decode(data)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Malformed binary message: {e}") from None
+
+    def _decode(self, data: bytes) -> tuple:
+        _, flags, type_id, command_index, sender, seq_number = HEADER.unpack_from(data)
+        offset = HEADER.size
+        if flags & _INLINE_COMMAND:
+            command, offset = _decode_value(data, offset)
+        else:
+            command = _COMMANDS[command_index]
+        if flags & _INLINE_SENDER:
+            sender, offset = _decode_value(data, offset)
+        elif flags & _NO_SENDER:
+            sender = None
+        fields = {"command": command, "sender": sender}
+        if not flags & _NO_SEQ:
+            fields["seq_number"] = seq_number
+        end = len(data)
+        while offset < end:
+            key, offset = _decode_value(data, offset)
+            fields[key], offset = _decode_value(data, offset)
+        return type_id, fields
+
+
+CODECS = {codec.name: codec for codec in (BinaryCodec(), JsonCodec())}
+
+def get_codec(name: str):
+    """!Return the codec with the given name ("binary" or "json")."""
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}. Available codecs: {list(CODECS)}")
+    return CODECS[name]
+
+def detect_codec(data: bytes):
+    """!Return the codec that encoded data."""
+    if not data:
+        raise ValueError("Empty message.")
+    return CODECS["binary"] if data[0] == BINARY_MAGIC else CODECS["json"]
@@ -0,0 +1,311 @@
+import heapq
+import os
+import datetime
+import random
+import networkx as nx
+import Nodes.utils as utils
+from Nodes.messages import *
+from Nodes.Nodes.Node import Node
+from Nodes.const import Command
+from Nodes.links import Link, LinkState
+from Nodes.faults import FaultPlan, NodeCrash
+
+
+class Simulator:
+    """!Discrete-event simulator that runs a protocol on a whole graph in one process.
+
+    Every node of the graph is a regular Node (or subclass) instance, but
+    instead of sockets it is attached to the simulator, which plays the
+    role of both the network and the initializer. Datagrams are pushed
+    in a global event queue ordered by virtual time and delivered by
+    calling Protocol.process_message on the target, so protocol classes
+    run unchanged and exchange exactly the same messages as in socket mode.
+    Every hop takes one unit of virtual time, and node timers expire
+    after their delay in virtual time. With a link model (see Nodes.links)
+    each message takes the delay drawn for its link instead: latency,
+    jitter and bandwidth can be given for all links or per edge, as edge
+    attributes. No time is actually waited, the simulator jumps from an
+    event to the next one.
+
+    A FaultPlan (see Nodes.faults) crashes nodes and partitions the
+    network at given virtual times, measured from the first wake up.
+
+    Protocols that start their own threads are not supported, since
+    their messages are not generated by the event loop: use timers
+    (Node.set_timer) instead.
+    """
+
+    def __init__(self,
+                 G: nx.Graph,
+                 protocol,
+                 node_class=Node,
+                 fifo=False,
+                 shell=False,
+                 log_path=None,
+                 protocol_kwargs: dict=None,
+                 reliable: float=None,
+                 links: Link=None,
+                 seed: int=None,
+                 faults: FaultPlan=None,
+                 trace: str=None):
+        """!Build all of the nodes and protocols of the network.
+
+        @param G (nx.Graph): Graph structure to simulate.
+        @param protocol: Protocol subclass executed by every node.
+        @param node_class: Node subclass used for every node (e.g. RingNode).
+        @param fifo (bool): turn on fifo mode on every node.
+        @param shell (bool): if True nodes log on terminal.
+        @param log_path (str): if given, nodes log on files in this directory.
+            If neither shell nor log_path are given, logging is disabled.
+        @param protocol_kwargs (dict): extra arguments for the protocol constructor.
+        @param reliable (float): if given, nodes use the reliable channel (see Nodes.reliable)
+            with this retransmission timeout in virtual time (a round trip takes 2).
+        @param links (Link): model of the links whose edge has no "link" attribute
+            nor any of Link.ATTRIBUTES. By default every hop takes 1.
+        @param seed (int): seed of the random delays of the links.
+        @param faults (FaultPlan | list): faults injected during the run, in virtual time.
+        @param trace (str): if given, nodes record the messages they exchange in binary traces
+            in this directory (see Nodes.trace), with virtual timestamps.
+
+        @return None
+        """
+        self._G: nx.Graph = G
+        # nodes are addressed by their position, the initializer comes after them.
+        self._DNS: dict = {node:port for port, node in enumerate(G.nodes())}
+        self._back: int = len(self.DNS)
+        self._shell: bool = shell
+        self._exp_path: str = utils.init_logs(log_path) if log_path else None
+        self._reliable: float = reliable
+        self._trace: str = None
+        if trace:
+            self._trace = os.path.abspath(trace)
+            os.makedirs(self._trace, exist_ok=True)
+        self._time: float = 0
+        self._rng = random.Random(seed)
+        # links are modelled only if some delay is configured, otherwise every hop takes 1.
+        self._timed: bool = links is not None or any(
+            key in data for _, _, data in G.edges(data=True) for key in ("link",) + Link.ATTRIBUTES)
+        self._default_link: Link = links if links is not None else Link()
+        self._links: dict = {} # (sender, receiver) : LinkState
+        self._events: list = []
+        self._event_counter: int = 0
+        self._nodes: list = []
+        self._protocols: list = []
+        self._terminated: list = [False] * len(self.DNS)
+        self._started: int = 0
+        self._EOP_received: int = 0
+        self._counts: dict = {}
+        self._attaching: int = None
+        self._faults: FaultPlan = faults if faults is None or isinstance(faults, FaultPlan) else FaultPlan(faults)
+        self._faults_armed: bool = False
+        self._fired: list = [] # (time, fault, action, node)
+        if not protocol_kwargs: protocol_kwargs = {}
+        for node, port in self.DNS.items():
+            self._attaching = node
+            self._nodes.append(node_class("simulator", self.back, port, fifo=fifo, transport=self))
+            self._protocols.append(protocol(self._nodes[port], **protocol_kwargs))
+        self._attaching = None
+
+    @property
+    def G(self):
+        """!Return network structure."""
+        return self._G
+
+    @property
+    def DNS(self):
+        """!Return DNS (nodeID : address)"""
+        return self._DNS
+
+    @property
+    def back(self):
+        """!Return the address used by nodes to reach the (simulated) initializer."""
+        return self._back
+
+    @property
+    def time(self):
+        """!Return the current virtual time."""
+        return self._time
+
+    @property
+    def nodes(self):
+        """!Return the simulated nodes, indexed by address."""
+        return self._nodes
+
+    @property
+    def protocols(self):
+        """!Return the protocol instances, indexed by address."""
+        return self._protocols
+
+    @property
+    def faults(self):
+        """!Return the fault plan of the run, None if no fault is injected."""
+        return self._faults
+
+    @property
+    def faults_fired(self):
+        """!Return the faults that fired so far as (time, fault, action, node) tuples, sorted by time.
+
+        Crashes carry the ID of the crashed node, partitions and heals None.
+        """
+        return sorted(self._fired, key=lambda record: record[0])
+
+    def number_of_nodes(self) -> int:
+        """Return number of nodes in the network."""
+        return len(self.DNS)
+
+    def attach(self, node: Node):
+        """!Setup a node that is being constructed (transport interface)."""
+        edges = list(self.G.edges(self._attaching))
+        message = SetupMessage(self._attaching,
+                               edges,
+                               utils.get_local_dns(self.DNS, self._attaching, edges),
+                               self._shell,
+                               self._exp_path,
+                               reliable=self._reliable,
+                               crash=self.faults.crash_after(self._attaching) if self.faults else None,
+                               trace=self._trace)
+        node.apply_setup(message)
+
+    def sendto(self, node: Node, data: bytes, port: int):
+        """!Schedule the delivery of a datagram (transport interface).
+
+        @param node (Node): sender.
+        @param data (bytes): serialized message.
+        @param port (int): address of the receiver.
+
+        @return None
+        """
+        if port == self.back:
+            self._handle_control(data)
+        elif self._timed:
+            state = self._link(node.port, port)
+            # lost messages are not scheduled, duplicates get their own delay.
+            for _ in range(state.link.copies(self._rng)):
+                self._schedule(state.arrival(self.time, len(data), self._rng), port, data)
+        else:
+            self._schedule(self.time + 1, port, data)
+
+    def _link(self, sender: int, receiver: int) -> LinkState:
+        """!Return the state of the link from sender to receiver, created on first use."""
+        state = self._links.get((sender, receiver))
+        if state is None:
+            attributes = self.G.get_edge_data(self.nodes[sender].id, self.nodes[receiver].id, default={})
+            state = LinkState(Link.from_attributes(attributes, self._default_link))
+            self._links[(sender, receiver)] = state
+        return state
+
+    def fifo_links(self, node: Node) -> bool:
+        """!Return True if the messages sent to node on each of its links arrive in the order they were sent."""
+        if not self._timed:
+            return True
+        senders = self.G.predecessors(node.id) if self.G.is_directed() else self.G.neighbors(node.id)
+        # called while the nodes are built, the states of the links are not created yet.
+        return all(Link.from_attributes(self.G.get_edge_data(sender, node.id, default={}), self._default_link).ordered
+                   for sender in senders)
+
+    def deliver_later(self, node: Node, delay: float, message: Message):
+        """!Hand message to node after delay units of virtual time, used by node timers (transport interface)."""
+        self._schedule(self.time + delay, node.port, message)
+
+    def _schedule(self, time: float, port: int, data: bytes):
+        """!Push a datagram in the event queue."""
+        # the counter keeps the queue stable, so links are FIFO.
+        heapq.heappush(self._events, (time, self._event_counter, port, data))
+        self._event_counter += 1
+
+    def _handle_control(self, data: bytes):
+        """!Process a message sent by a node to the initializer."""
+        message = Message.deserialize(data)
+        if message.command == Command.START_PROTOCOL:
+            self._started += 1
+        elif message.command == Command.END_PROTOCOL:
+            self._EOP_received += 1
+        elif message.command == Command.COUNT_M:
+            self._counts[message.sender] = message.counter
+        elif message.command == Command.FAULT:
+            # a crashed node counts as terminated, and reports its messages with the crash.
+            self._fired.append((self.time, message.fault, message.action, message.sender))
+            self._EOP_received += 1
+            self._counts[message.sender] = message.counter
+        elif message.command == Command.ERROR:
+            raise RuntimeError(f"A node crashed with the following error: {message.payload}")
+
+    def _arm_faults(self, epoch: float):
+        """!Schedule the timed faults of the plan, on the first wake up."""
+        if not self.faults or self._faults_armed:
+            return
+        self._faults_armed = True
+        recorded = set()
+        for due, fault, node, message in self.faults.events(self.G.nodes(), self.G.neighbors):
+            self._schedule(epoch + due, self.DNS[node], message)
+            # the simulator carries out partitions itself, crashes are reported by the nodes.
+            if message.action != "crash" and (fault, message.action) not in recorded:
+                recorded.add((fault, message.action))
+                self._fired.append((epoch + due, fault, message.action, None))
+
+    def wakeup(self, wake_up_node: int):
+        """!Send the wake up message to a specific node to start the computation.
+
+        @param wake_up_node (int): represents the ID of the node to wake up.
+
+        @return None
+        """
+        self._arm_faults(self.time)
+        self._schedule(self.time, self.DNS[wake_up_node], WakeUpMessage().serialize())
+
+    def wakeup_all(self, delta: int=0):
+        """!Wake up all nodes at the same virtual time.
+
+        @param delta (int): virtual time to wait before starting the nodes.
+
+        @return None
+        """
+        start_time = datetime.datetime.now()
+        message = WakeupAllMessage(start_time.year, start_time.month, start_time.day,
+                                   start_time.hour, start_time.minute, start_time.second)
+        data = message.serialize()
+        self._arm_faults(self.time + delta)
+        for port in self.DNS.values():
+            self._schedule(self.time + delta, port, data)
+
+    def run(self):
+        """!Process events until the queue is empty."""
+        while self._events:
+            time, _, port, data = heapq.heappop(self._events)
+            # nodes that terminated do not read their queue anymore,
+            # but their reliable channel still handles acks.
+            if self._terminated[port]:
+                if self.nodes[port].reliable is not None and not self.nodes[port].crashed:
+                    self._time = time
+                    self.nodes[port].reliable.handle_after_termination(data)
+                continue
+            self._time = time
+            protocol = self.protocols[port]
+            try:
+                terminated = protocol.process_message(data)
+            except NodeCrash:
+                terminated = True
+            except Exception as e:
+                raise RuntimeError(f"A node crashed with the following error: "
+                                   f"Fatal error in node {self.nodes[port].id}: {str(e)}") from e
+            if terminated:
+                self._terminated[port] = True
+                protocol.stop()
+        # nodes that did not terminate still have their records in memory.
+        for node in self.nodes:
+            if node.tracer is not None:
+                node.tracer.flush()
+
+    def wait_for_termination(self):
+        """!Run the simulation until no more messages are in flight."""
+        self.run()
+        if self._EOP_received == self.number_of_nodes():
+            print("Received EOP from all nodes in the network.")
+        else:
+            print(f"Simulation ended with {self._EOP_received} out of {self.number_of_nodes()} terminated nodes.")
+
+    def wait_for_number_of_messages(self):
+        """!Return the total number of messages sent by the nodes."""
+        total_count = sum(self._counts.values())
+        print(f"Total number of messages: {total_count}")
+        return total_count
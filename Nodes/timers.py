@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import time
+from Nodes.messages import TimerMessage
+
+
+class Timer:
+    """!Handle of a timer set with Node.set_timer."""
+
+    def __init__(self, service, timer_id: int, name, delay: float, periodic: bool):
+        self._service = service
+        self._id: int = timer_id
+        self._name = name
+        self._delay: float = delay
+        self._periodic: bool = periodic
+
+    @property
+    def id(self):
+        """!Return the ID of the timer, unique within its node."""
+        return self._id
+
+    @property
+    def name(self):
+        """!Return the name given to the timer (delivered in the TimerMessage)."""
+        return self._name
+
+    @property
+    def delay(self):
+        """!Return the delay (or period) of the timer in seconds."""
+        return self._delay
+
+    @property
+    def periodic(self):
+        """!Return True if the timer fires every delay seconds until cancelled."""
+        return self._periodic
+
+    @property
+    def active(self):
+        """!Return True if the timer can still fire."""
+        return self._service.is_active(self)
+
+    def cancel(self):
+        """!Stop the timer. Expirations not handled yet are discarded."""
+        self._service.cancel(self)
+
+
+class TimerService:
+    """!Timers of a node, whose expirations are delivered as messages.
+
+    When a timer expires, a TimerMessage (command TIMER) is put in the
+    mailbox of the node and handed to handle_message like any other
+    message, so timeouts run in the protocol thread and need no locks.
+
+    Timers are kept in a heap that the main loop of the protocol checks
+    before waiting for messages (see Protocol.run), so no thread is
+    needed. Transports that have their own clock (the asyncio runtime,
+    the simulator with virtual time) provide deliver_later(node, delay,
+    message) instead, and the heap is not used.
+
+    Timers must be set and cancelled from the thread running the protocol.
+    """
+
+    def __init__(self, node):
+        self._node = node
+        self._timers: dict = {} # timer ID : active Timer
+        self._heap: list = [] # (deadline, timer ID)
+        self._ids = itertools.count()
+
+    def set_timer(self, delay: float, name=None, periodic: bool=False) -> Timer:
+        """!Start a timer.
+
+        @param delay (float): seconds before the expiration (virtual time in the simulator).
+        @param name: value carried by the TimerMessage, to tell timers apart.
+        @param periodic (bool): if True the timer fires every delay seconds until cancelled.
+
+        @return Timer handle.
+        """
+        timer = Timer(self, next(self._ids), name, delay, periodic)
+        self._timers[timer.id] = timer
+        self._arm(timer)
+        return timer
+
+    def cancel(self, timer: Timer):
+        """!Stop a timer, its heap entry is discarded when it expires."""
+        self._timers.pop(timer.id, None)
+
+    def is_active(self, timer: Timer) -> bool:
+        return timer.id in self._timers
+
+    def _uses_transport(self) -> bool:
+        return hasattr(self._node.transport, "deliver_later")
+
+    def _arm(self, timer: Timer):
+        if self._uses_transport():
+            self._node.transport.deliver_later(self._node, timer.delay, self._message(timer))
+        else:
+            heapq.heappush(self._heap, (time.monotonic() + timer.delay, timer.id))
+
+    def _message(self, timer: Timer) -> TimerMessage:
+        return TimerMessage(timer.id, timer.name, timer.delay)
+
+    def timeout(self):
+        """!Return how long the main loop can wait for messages, None if there are no timers."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def expire(self):
+        """!Put a TimerMessage in the mailbox of the node for every expired timer."""
+        now = time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, timer_id = heapq.heappop(self._heap)
+            timer = self._timers.get(timer_id)
+            if timer is None:
+                continue # cancelled
+            self._node.insert_message(self._message(timer))
+            if timer.periodic:
+                # the next deadline does not depend on when this one was handled.
+                heapq.heappush(self._heap, (deadline + timer.delay, timer_id))
+
+    def accept(self, message: TimerMessage) -> bool:
+        """!Check an expiration before it is handled by the protocol.
+
+        @return False if the timer has been cancelled meanwhile.
+        """
+        timer = self._timers.get(message.timer_id)
+        if timer is None:
+            return False
+        if not timer.periodic:
+            del self._timers[timer.id]
+        elif self._uses_transport():
+            self._arm(timer)
+        return True
@@ -0,0 +1,185 @@
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from Nodes.const import Command
+
+## Magic bytes at the beginning of every trace file.
+MAGIC = b"NTRC"
+## Version of the record layout.
+VERSION = 1
+## Record of a traced message: kind, source, destination, command ID,
+## link sequence number, timestamp, size in bytes and CRC32 of the datagram.
+RECORD = struct.Struct("<BiiIIdII")
+## Header of a trace file: magic, version and record size.
+HEADER = struct.Struct("<4sHH")
+## Kinds of records.
+SEND, RECEIVE = 0, 1
+## Records are kept in memory and appended to the trace file in blocks of this size.
+BUFFER_SIZE = 1 << 16
+
+
+def command_id(command) -> int:
+    """!Return the ID of a command in the traces, the same in every process."""
+    return zlib.crc32(str(getattr(command, "value", command)).encode("utf-8"))
+
+
+## Names of the commands of the framework, by ID: only other names are written next to the traces.
+COMMANDS = {command_id(command): command.value for command in Command}
+
+
+class TraceFile:
+    """!Buffered trace file, shared by the recorders of the nodes hosted by a process.
+
+    Records are kept in memory and the file is opened only to append a full
+    buffer, so a process hosting thousands of nodes neither creates thousands
+    of files nor keeps their descriptors open. The names of the commands that
+    are not in Command are written in path + ".json".
+    """
+
+    def __init__(self, path: str):
+        self._path: str = path
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        # the file is created by the first flush.
+        self._mode: str = "wb"
+        self._names: dict = {} # ID : name
+        # recorders writing in the file.
+        self._users: int = 0
+        # nodes of a process can send from several threads.
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """!Return the path of the file."""
+        return self._path
+
+    def write(self, record: bytes):
+        """!Append a record."""
+        with self._lock:
+            self._buffer += record
+            if len(self._buffer) >= BUFFER_SIZE:
+                self._flush()
+
+    def name(self, command, identifier: int):
+        """!Remember the name of a command that is not in Command."""
+        with self._lock:
+            self._names[identifier] = str(command)
+
+    def flush(self):
+        """!Write the buffered records."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._mode == "wb" and len(self._buffer) == HEADER.size:
+            return # nothing traced yet
+        with open(self._path, self._mode) as f:
+            f.write(self._buffer)
+        self._mode = "ab"
+        self._buffer.clear()
+        if self._names:
+            with open(self._path + ".json", "w") as f:
+                json.dump(self._names, f)
+
+
+_files: dict = {} # path : TraceFile
+_files_lock = threading.Lock()
+
+def open_trace(path: str) -> TraceFile:
+    """!Return the trace file of the process at path, created on first use."""
+    with _files_lock:
+        trace = _files.get(path)
+        if trace is None:
+            trace = _files[path] = TraceFile(path)
+        trace._users += 1
+    return trace
+
+def close_trace(trace: TraceFile):
+    """!Flush a trace file, forgetting it once its last recorder closed."""
+    trace.flush()
+    with _files_lock:
+        trace._users -= 1
+        if not trace._users:
+            _files.pop(trace.path, None)
+
+@atexit.register
+def _flush_traces():
+    # nodes that did not terminate never close their recorder.
+    for trace in list(_files.values()):
+        trace.flush()
+
+
+class TraceRecorder:
+    """!Append a compact binary record for every message a node sends to or receives from its neighbors.
+
+    Enabled by the initializer (or the simulator) with the trace parameter.
+    Records have a fixed size (see RECORD) and are buffered by a TraceFile,
+    so tracing costs a CRC32 and a struct.pack per message. Commands are
+    stored as IDs. Times come from time.monotonic, shared by the processes
+    of a host, or from the virtual clock of the simulator.
+
+    Every record carries both ends of the message, so nodes hosted by the
+    same process can share a file. Sent and received records of the same
+    message are matched offline by link and CRC32 of the datagram (see
+    Nodes.trace_analysis). Received messages are attributed to their
+    sender field.
+    """
+
+    def __init__(self, path: str, node: int, clock=time.monotonic):
+        """!
+        @param path (str): trace file, possibly shared with other nodes of the process.
+        @param node (int): ID of the node.
+        @param clock (callable): source of the timestamps.
+        """
+        self._file: TraceFile = open_trace(path)
+        self._node: int = node
+        self._clock = clock
+        self._commands: dict = {} # command : ID
+        self._sent: dict = {} # neighbor : messages sent to it
+        self._received: dict = {} # neighbor : messages received from it
+        self._closed: bool = False
+
+    @property
+    def path(self):
+        """!Return the path of the trace file."""
+        return self._file.path
+
+    def _command(self, command) -> int:
+        identifier = self._commands.get(command)
+        if identifier is None:
+            identifier = self._commands[command] = command_id(command)
+            if identifier not in COMMANDS:
+                self._file.name(command, identifier)
+        return identifier
+
+    def sent(self, command, target: int, data: bytes):
+        """!Record a message sent to the neighbor target."""
+        seq = self._sent.get(target, 0)
+        self._sent[target] = seq + 1
+        self._file.write(RECORD.pack(SEND, self._node, target, self._command(command), seq,
+                                     self._clock(), len(data), zlib.crc32(data)))
+
+    def received(self, command, source: int, data: bytes):
+        """!Record a message received from the neighbor source."""
+        seq = self._received.get(source, 0)
+        self._received[source] = seq + 1
+        self._file.write(RECORD.pack(RECEIVE, source, self._node, self._command(command), seq,
+                                     self._clock(), len(data), zlib.crc32(data)))
+
+    def flush(self):
+        """!Write the buffered records."""
+        self._file.flush()
+
+    def close(self):
+        """!Write the buffered records, the node is not going to trace anything else."""
+        if not self._closed:
+            self._closed = True
+            close_trace(self._file)
+
+
+def trace_file(directory: str, name) -> str:
+    """!Return the path of the trace of a node (or of the process hosting it) in directory."""
+    return os.path.join(directory, f"{name}.trace")
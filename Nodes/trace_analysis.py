@@ -0,0 +1,254 @@
+import glob
+import json
+import os
+import sys
+import numpy as np
+from prettytable import PrettyTable
+from Nodes.trace import HEADER, MAGIC, RECORD, SEND, RECEIVE, COMMANDS
+
+## Layout of a record in numpy terms (see Nodes.trace.RECORD).
+RECORD_DTYPE = np.dtype([("kind", "u1"), ("src", "<i4"), ("dst", "<i4"), ("command", "<u4"),
+                         ("seq", "<u4"), ("time", "<f8"), ("size", "<u4"), ("crc", "<u4")])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+## Columns of a Trace.
+COLUMNS = ("kind", "src", "dst", "command", "seq", "time", "size", "crc", "node")
+
+
+def read_trace(path: str) -> np.ndarray:
+    """!Return the records of a trace file as a structured array."""
+    with open(path, "rb") as f:
+        magic, version, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a trace file of this version.")
+        # a process killed while writing can leave half a record at the end.
+        count = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+        return np.fromfile(f, dtype=RECORD_DTYPE, count=count)
+
+
+def load_traces(directory: str):
+    """!Merge the traces written in directory (one per node or per process) into a single Trace."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.trace")))
+    if not paths:
+        raise FileNotFoundError(f"No trace in {directory}.")
+    names = dict(COMMANDS)
+    for path in paths:
+        if os.path.exists(path + ".json"):
+            with open(path + ".json") as f:
+                names.update({int(key): name for key, name in json.load(f).items()})
+    records = np.concatenate([read_trace(path) for path in paths])
+    columns = {name: records[name].copy() for name in RECORD_DTYPE.names}
+    # sends are recorded by their source, receives by their destination.
+    columns["node"] = np.where(columns["kind"] == SEND, columns["src"], columns["dst"])
+    return Trace(columns, names)
+
+
+class Trace:
+    """!Message traces of a run, merged in one columnar dataset.
+
+    Every record is a message sent (kind SEND) or received (kind RECEIVE)
+    by the node in the node column; the columns are numpy arrays, and the
+    records of each node keep the order they were written in. Sent and received records of the
+    same message are matched by source, destination and CRC32 of the
+    datagram, in order of time, so lost messages are sends without
+    a receive.
+
+    Causal depth and critical path follow Lamport's happened-before
+    relation: the events of a node are ordered as they were recorded,
+    and the receive of a message comes after its send.
+    """
+
+    def __init__(self, columns: dict, names: dict=None):
+        """!
+        @param columns (dict): name : numpy array, see COLUMNS.
+        @param names (dict): command ID : command name.
+        """
+        self._columns: dict = columns
+        self._names: dict = names if names else {}
+        self._matches: np.ndarray = None
+
+    @classmethod
+    def load(cls, path: str):
+        """!Load a dataset written by save."""
+        with np.load(path) as data:
+            columns = {name: data[name] for name in COLUMNS}
+            names = dict(zip(data["name_ids"].tolist(), data["names"].tolist()))
+        return cls(columns, names)
+
+    def save(self, path: str):
+        """!Write the dataset as a numpy archive, one array per column."""
+        np.savez(path, name_ids=np.array(list(self._names.keys()), dtype=np.uint32),
+                 names=np.array(list(self._names.values())), **self._columns)
+
+    def __len__(self):
+        return len(self._columns["kind"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    @property
+    def columns(self):
+        """!Return the columns of the dataset."""
+        return self._columns
+
+    @property
+    def names(self):
+        """!Return the names of the commands, by ID."""
+        return self._names
+
+    def command_name(self, identifier: int) -> str:
+        """!Return the name of a command ID (the ID itself if unknown)."""
+        return self._names.get(int(identifier), str(identifier))
+
+    def matches(self) -> np.ndarray:
+        """!Return, for every record, the position of the record at the other end of its message.
+
+        -1 for sends that were not received, receives whose send was not traced,
+        and duplicates of a message received once more than sent.
+        """
+        if self._matches is not None:
+            return self._matches
+        kind, time = self["kind"], self["time"]
+        keys = (self["crc"], self["dst"], self["src"])
+        matches = np.full(len(self), -1, dtype=np.int64)
+        sends = np.flatnonzero(kind == SEND)
+        receives = np.flatnonzero(kind == RECEIVE)
+        # k-th receive of a message (link and CRC) goes with its k-th send.
+        sends = sends[np.lexsort((time[sends],) + tuple(key[sends] for key in keys))]
+        receives = receives[np.lexsort((time[receives],) + tuple(key[receives] for key in keys))]
+        occurrences = {}
+        for position, key in zip(sends.tolist(), zip(*(key[sends].tolist() for key in keys))):
+            occurrences.setdefault(key, []).append(position)
+        used = {}
+        for position, key in zip(receives.tolist(), zip(*(key[receives].tolist() for key in keys))):
+            candidates = occurrences.get(key)
+            index = used.get(key, 0)
+            if candidates is not None and index < len(candidates):
+                used[key] = index + 1
+                matches[position] = candidates[index]
+                matches[candidates[index]] = position
+        self._matches = matches
+        return matches
+
+    def message_complexity(self) -> dict:
+        """!Return the number of messages sent for every command, by name."""
+        sends = self["kind"] == SEND
+        commands, counts = np.unique(self["command"][sends], return_counts=True)
+        return {self.command_name(command): int(count) for command, count in zip(commands, counts)}
+
+    def edge_traffic(self) -> dict:
+        """!Return (messages, bytes) sent on every directed link, by (source, destination)."""
+        sends = self["kind"] == SEND
+        links = np.stack([self["src"][sends], self["dst"][sends]], axis=1)
+        if not len(links):
+            return {}
+        links, inverse = np.unique(links, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        messages = np.bincount(inverse, minlength=len(links))
+        sizes = np.bincount(inverse, weights=self["size"][sends], minlength=len(links))
+        return {(int(u), int(v)): (int(count), int(size))
+                for (u, v), count, size in zip(links.tolist(), messages.tolist(), sizes.tolist())}
+
+    def _causal_order(self):
+        """!Compute depth and causal predecessor of every record, visiting them in happened-before order.
+
+        The depth of a receive is the length of the longest chain of messages
+        ending with it, a send inherits the depth reached by its node. The
+        predecessor of a receive is its send, the one of a send the previous
+        record of its node.
+        """
+        matches = self.matches()
+        kind, node = self["kind"], self["node"]
+        # records of each node, in the order they were written.
+        order = np.argsort(node, kind="stable")
+        starts = np.flatnonzero(np.r_[True, node[order][1:] != node[order][:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        order = order.tolist()
+        depth = np.zeros(len(self), dtype=np.int64)
+        previous = np.full(len(self), -1, dtype=np.int64)
+        done = np.zeros(len(self), dtype=bool)
+        waiting = {} # send : nodes (cursors) blocked on its receive
+        cursors = list(starts.tolist())
+        ready = list(range(len(cursors)))
+        kind, matches = kind.tolist(), matches.tolist()
+        while ready:
+            cursor = ready.pop()
+            last = order[cursors[cursor] - 1] if cursors[cursor] > starts[cursor] else -1
+            while cursors[cursor] < ends[cursor]:
+                record = order[cursors[cursor]]
+                send = matches[record] if kind[record] == RECEIVE else -1
+                if send >= 0 and not done[send]:
+                    waiting.setdefault(send, []).append(cursor)
+                    break
+                local = depth[last] if last >= 0 else 0
+                if send >= 0:
+                    depth[record] = max(local, depth[send] + 1)
+                    previous[record] = send
+                else:
+                    depth[record] = local + (kind[record] == RECEIVE)
+                    previous[record] = last
+                done[record] = True
+                ready.extend(waiting.pop(record, []))
+                last = record
+                cursors[cursor] += 1
+        return depth, previous
+
+    def causal_depth(self) -> int:
+        """!Return the length of the longest chain of causally related messages."""
+        if not len(self):
+            return 0
+        depth, _ = self._causal_order()
+        return int(depth.max())
+
+    def critical_path(self) -> dict:
+        """!Return the causal chain that ends with the last record of the run.
+
+        Following it backwards, every receive leads to its send and every send
+        to the previous record of its node, until the first record of the chain.
+
+        @return dict with "time" (from the first to the last record of the chain),
+            "messages" (on the chain), "transit" (time spent on links) and "path"
+            (source, destination, command name of each message, in order).
+        """
+        if not len(self):
+            return {"time": 0.0, "messages": 0, "transit": 0.0, "path": []}
+        _, previous = self._causal_order()
+        time, kind = self["time"], self["kind"]
+        record = int(np.argmax(time))
+        end = time[record]
+        path, transit = [], 0.0
+        while previous[record] >= 0:
+            before = int(previous[record])
+            if kind[record] == RECEIVE and kind[before] == SEND and self.matches()[record] == before:
+                path.append((int(self["src"][record]), int(self["dst"][record]),
+                             self.command_name(self["command"][record])))
+                transit += time[record] - time[before]
+            record = before
+        path.reverse()
+        return {"time": float(end - time[record]), "messages": len(path), "transit": float(transit), "path": path}
+
+    def print_report(self):
+        """!Print message complexity, busiest links, causal depth and critical path."""
+        table = PrettyTable()
+        table.field_names = ["Command", "Messages"]
+        for command, count in sorted(self.message_complexity().items(), key=lambda item: -item[1]):
+            table.add_row([command, count])
+        print(table)
+        table = PrettyTable()
+        table.field_names = ["Link", "Messages", "Bytes"]
+        for (u, v), (count, size) in sorted(self.edge_traffic().items(), key=lambda item: -item[1][1])[:10]:
+            table.add_row([f"{u} -> {v}", count, size])
+        print(table)
+        sends = int(np.count_nonzero(self["kind"] == SEND))
+        received = int(np.count_nonzero((self["kind"] == SEND) & (self.matches() >= 0)))
+        path = self.critical_path()
+        print(f"Messages sent: {sends}, received: {received}")
+        print(f"Causal depth: {self.causal_depth()}")
+        print(f"Critical path: {path['time']:.6f} over {path['messages']} messages "
+              f"({path['transit']:.6f} on links)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise ValueError("Please provide the directory of the traces.")
+    load_traces(sys.argv[1]).print_report()
@@ -1,17 +1,19 @@
-import matplotlib.pyplot as plt
-import networkx as nx
 import os
 import datetime
 def read_graph(file):
 	"""!Function needed to read input graph.
+
+	The first line is the number of nodes, every other line an edge like [1,2]
+	(or [1,2,w] if weighted). Lines are parsed by graph.read_edges, not evaluated.
+	Large graphs should use graph.load_graph, which skips the list of tuples.
 	"""
-	with open(file) as f:
-		data = f.read().splitlines()
-		nodes = int(data[0])
-		edges = []
-		for x in data[1:]:
-			edges.append(tuple(eval(x)))
-		return nodes, edges
+	from Nodes.graph import read_edges
+	nodes, edges, weights = read_edges(file)
+	if nodes is None:
+		raise ValueError(f"The first line of {file} must be the number of nodes.")
+	if weights is None:
+		return nodes, list(map(tuple, edges.tolist()))
+	return nodes, [(u, v, w) for (u, v), w in zip(edges.tolist(), weights.tolist())]
 	
 def get_local_dns(DNS:dict, node:int, edges:list):
 	local_dns = {}
@@ -21,7 +23,34 @@ def get_local_dns(DNS:dict, node:int, edges:list):
 				local_dns[n] = DNS[n]
 	return local_dns
 
-def draw_graph(G:nx.Graph):
+def split_in_shards(items:list, n:int) -> list:
+	"""!Split items in (at most) n contiguous shards of almost the same size.
+
+	Contiguous shards keep together nodes that are close in the node ordering,
+	which for rings and most generated graphs means neighbors.
+	"""
+	n = max(1, min(n, len(items)))
+	size, extra = divmod(len(items), n)
+	shards = []
+	start = 0
+	for i in range(n):
+		end = start + size + (1 if i < extra else 0)
+		shards.append(items[start:end])
+		start = end
+	return shards
+
+def check_port_range(ports:list, reserved:list):
+	"""!Raise ValueError if ports are not valid or collide with reserved ones."""
+	if ports and (min(ports) < 1 or max(ports) > 65535):
+		raise ValueError(f"Ports {min(ports)}-{max(ports)} are out of the valid range 1-65535.")
+	collisions = set(ports).intersection(reserved)
+	if collisions:
+		raise ValueError(f"Ports {sorted(collisions)} are already used by the initializer.")
+
+def draw_graph(G):
+	# plotting libraries are imported on first use.
+	import matplotlib.pyplot as plt
+	import networkx as nx
 	nx.draw(G, pos = None, ax = None, with_labels = True,font_size = 20, node_size = 2000, node_color = 'lightgreen')
 	plt.show()
 
@@ -12,6 +12,8 @@ class Visualizer(ComunicationManager):
         self._G = G
         self._s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._s.bind(("", self.PORT))
+        # port 0 means that the OS picked a free one
+        self._PORT = self._s.getsockname()[1]
         self.start_listener(self.s, self.message_queue)
         plt.ion()
         self.fig, self.ax = plt.subplots(figsize=(12, 10))
@@ -0,0 +1,120 @@
+import socket
+import threading
+import time
+from Nodes.Nodes.Node import Node
+from Nodes.message_handler import MultiMessageListener
+from Nodes.fragments import fragment
+from Nodes.reports import ReportAggregator
+
+
+class Worker:
+    """!Host several nodes of the network in a single process.
+
+    Instead of one process (and one listener thread) per node, the
+    initializer can launch a few workers (see the workers parameter of
+    Initializer), each one hosting a shard of the graph. Nodes are
+    attached to the worker: messages between nodes of the same worker
+    are put directly in the queue of the receiver, while messages to
+    other workers or to the initializer go over UDP. A single listener
+    thread serves the sockets of all the hosted nodes, and every
+    protocol runs its unchanged main loop in its own thread.
+
+    A client file for worker mode looks like:
+
+        worker = Worker(sys.argv[1], int(sys.argv[2]), [int(p) for p in sys.argv[3:]], Shout)
+        worker.run()
+    """
+
+    def __init__(self,
+                 hostname: str,
+                 back: int,
+                 ports: list,
+                 protocol,
+                 node_class=Node,
+                 fifo=False,
+                 protocol_kwargs: dict=None):
+        """!Create the hosted nodes and send their RDY messages.
+
+        @param hostname (str): IP of the initalizer.
+        @param back (int): Port where the initalizer is listening for confirmation.
+        @param ports (list): Ports of the nodes hosted by this worker.
+        @param protocol: Protocol subclass executed by every node.
+        @param node_class: Node subclass used for every node (e.g. RingNode).
+        @param fifo (bool): turn on fifo mode on every node.
+        @param protocol_kwargs (dict): extra arguments for the protocol constructor.
+
+        @return None
+        """
+        self._protocol = protocol
+        self._protocol_kwargs: dict = protocol_kwargs if protocol_kwargs else {}
+        self._local: dict = {} # port : hosted node
+        self._out_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._listener = MultiMessageListener()
+        self._reports = ReportAggregator(len(ports))
+        self._nodes: list = [node_class(hostname, back, port, fifo=fifo, transport=self) for port in ports]
+        self._listener.start()
+
+    @property
+    def nodes(self):
+        """!Return the nodes hosted by this worker."""
+        return self._nodes
+
+    @property
+    def listener(self):
+        """!Return the listener shared by the hosted nodes."""
+        return self._listener
+
+    @property
+    def reports(self):
+        """!Return the aggregator of the end of protocol reports of the hosted nodes."""
+        return self._reports
+
+    def attach(self, node: Node):
+        """!Bind the socket of a node and send its RDY message (transport interface)."""
+        node._in_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        node.in_socket.bind(("", node.port))
+        node._port = node.in_socket.getsockname()[1]
+        self.listener.register(node.in_socket, node.message_queue)
+        self._local[node.port] = node
+        node.send_RDY()
+
+    def sendto(self, node: Node, data: bytes, port: int):
+        """!Deliver locally if the receiver is hosted here, use UDP otherwise (transport interface).
+
+        @param node (Node): sender.
+        @param data (bytes): serialized message.
+        @param port (int): port of the receiver.
+
+        @return None
+        """
+        receiver = self._local.get(port)
+        if receiver is not None:
+            receiver.message_queue.put(data)
+        else:
+            address = node.address(port)
+            for datagram in fragment(data):
+                self._out_socket.sendto(datagram, address)
+
+    def run(self):
+        """!Wait for the setup of every node, then run all protocols until termination."""
+        pending = self.nodes
+        while pending:
+            deadline = time.monotonic() + 1.0
+            pending = [node for node in pending
+                       if not node.try_setup(max(0, deadline - time.monotonic()))]
+            # the initializer sends setups only when all RDY arrived, some could be lost.
+            for node in pending:
+                node.send_RDY()
+        protocols = [self._protocol(node, **self._protocol_kwargs) for node in self.nodes]
+        threads = [threading.Thread(target=protocol.run) for protocol in protocols]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if any(node.aggregate for node in self.nodes):
+            self.reports.flush()
+        for node in self.nodes:
+            if node.emulator is not None:
+                node.emulator.flush()
+        self.listener.stop()
+        self._out_socket.close()
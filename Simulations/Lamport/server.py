@@ -1,22 +1,24 @@
 import networkx as nx
 import Nodes.initializers as initializers
-import os
 import pandas as pd
 import seaborn as sb
 import matplotlib.pyplot as plt
+from Nodes.pool import NodePool
 n_nodes = [5*i for i in range(1,11)]
-CLIENT_PATH = "./client.py"
+PROTOCOL = "Nodes.Protocols.LamportMutualExclusion:LamportMutualExclusion"
 df = pd.DataFrame(columns=["Nodes", "Messages"])
 PORT = 65000
-for i,n in enumerate(n_nodes):
-    print(f"{i}/{len(n_nodes)} simulations done.")
-    G = nx.complete_graph(n)
-    client = os.path.abspath(CLIENT_PATH)
-    init = initializers.Initializer(client, "localhost", PORT, G, shell=False)
-    init.wait_for_termination()
-    messages = init.wait_for_number_of_messages()
-    df.loc[len(df)] = [n, messages]
-    init.close()
+# the same 4 processes host the nodes of every simulation (see client.py for a single node).
+with NodePool(4) as pool:
+    for i,n in enumerate(n_nodes):
+        print(f"{i}/{len(n_nodes)} simulations done.")
+        G = nx.complete_graph(n)
+        init = initializers.Initializer(PROTOCOL, "localhost", PORT, G, shell=False, pool=pool,
+                                        fifo=True, protocol_kwargs={"silent": True}, seed=i)
+        init.wait_for_termination()
+        messages = init.wait_for_number_of_messages()
+        df.loc[len(df)] = [n, messages]
+        init.close()
 print(df)
 sb.set_style("whitegrid")
 fig, ax = plt.subplots(figsize=(8, 4))
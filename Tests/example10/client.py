@@ -0,0 +1,9 @@
+import sys
+from Nodes.Nodes.Node import Node
+from Nodes.Protocols.SyncBFS import SyncBFS
+if len(sys.argv) != 4:
+    raise ValueError('Please provide HOST, initializer PORT and local PORT NUMBER.')
+# rounds are separated by markers, links have to be FIFO.
+NODE = Node(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), fifo=True)
+PROTOCOL = SyncBFS(NODE)
+PROTOCOL.run()
@@ -0,0 +1,20 @@
+import networkx as nx
+import Nodes.initializers as initializers
+import os
+
+# GRAPH CREATION
+G = nx.random_regular_graph(3, 20, seed=1)
+n = G.number_of_nodes()
+m = G.number_of_edges()
+print(f"Nodes: {n}")
+print(f"Edges: {m}")
+print(f"Expected n. of messages: {(2*m)-n+1}")
+
+# FRAMEWORK
+# synchronous BFS: nodes advance round by round (see Nodes.Protocols.SyncProtocol)
+client = os.path.abspath("./client.py")
+init = initializers.Initializer(client, "localhost", 65000, G, shell=False)
+init.wakeup(0)
+init.wait_for_termination()
+init.wait_for_number_of_messages()
+init.close()
@@ -0,0 +1,21 @@
+import networkx as nx
+import Nodes.initializers as initializers
+from Nodes.faults import FaultPlan
+import os
+
+# GRAPH CREATION
+G = nx.complete_graph(8)
+
+# FAULT PLAN
+# the two nodes with the highest IDs crash: 6 when the network is woken up,
+# 7 as soon as the election reaches it. Node 5 has to win the election.
+plan = FaultPlan().crash(6, at=0.0).crash(7, after=0)
+
+# FRAMEWORK
+client = os.path.abspath("./client.py")
+init = initializers.Initializer(client, "localhost", 65000, G, shell=False, faults=plan)
+init.wakeup(0)
+init.wait_for_termination()
+init.wait_for_number_of_messages()
+init.print_faults()
+init.close()
@@ -0,0 +1,20 @@
+import networkx as nx
+import Nodes.initializers as initializers
+import os
+
+# GRAPH CREATION
+G = nx.random_regular_graph(4, 60, seed=1)
+n = G.number_of_nodes()
+m = G.number_of_edges()
+print(f"Nodes: {n}")
+print(f"Edges: {m}")
+print(f"Expected n. of messages: {(4*m)-(2*n)+2}")
+
+# FRAMEWORK
+# 60 nodes hosted by 4 processes (see client.py)
+client = os.path.abspath("./client.py")
+init = initializers.Initializer(client, "localhost", 65000, G, shell=False, workers=4)
+init.wakeup(0)
+init.wait_for_termination()
+init.wait_for_number_of_messages()
+init.close()
@@ -0,0 +1,7 @@
+import sys
+from Nodes.async_runtime import AsyncRuntime
+from Nodes.Protocols.Shout import Shout
+if len(sys.argv) < 4:
+    raise ValueError('Please provide HOST, initializer PORT and at least one local PORT NUMBER.')
+RUNTIME = AsyncRuntime(sys.argv[1], int(sys.argv[2]), [int(port) for port in sys.argv[3:]], Shout)
+RUNTIME.run()
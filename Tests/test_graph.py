@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from Nodes.graph import CSRGraph, as_graph, load_graph, read_edges, save_graph
+
+
+class TestCompactGraphs(unittest.TestCase):
+    """!Compact adjacencies given to the initializer, see Nodes.graph.as_graph."""
+
+    def assertRows(self, G, rows):
+        self.assertEqual([G.row(i).tolist() for i in range(G.number_of_nodes())], rows)
+
+    def test_csr_tuple(self):
+        G = as_graph((np.array([0, 2, 3, 4]), np.array([1, 2, 0, 0])))
+        self.assertRows(G, [[1, 2], [0], [0]])
+        self.assertEqual(G.number_of_edges(), 2)
+
+    def test_csr_duplicate_neighbors(self):
+        G = as_graph((np.array([0, 2, 4]), np.array([1, 1, 0, 0])))
+        self.assertRows(G, [[1], [0]])
+        self.assertEqual(G.degrees.tolist(), [1, 1])
+
+    def test_csr_missing_reverse_edge(self):
+        G = as_graph((np.array([0, 1, 1]), np.array([1])))
+        self.assertRows(G, [[1], [0]])
+        self.assertRows(G.transpose(), [[1], [0]])
+
+    def test_csr_malformed(self):
+        with self.assertRaises(ValueError):
+            as_graph((np.array([0, 3]), np.array([1])))
+        with self.assertRaises(ValueError):
+            as_graph((np.array([0, 1, 1]), np.array([2])))
+
+    def test_edge_array(self):
+        G = as_graph(np.array([[0, 1], [1, 2], [2, 0], [1, 0], [2, 2]]))
+        self.assertRows(G, [[1, 2], [0, 2], [0, 1]])
+
+    def test_self_loops_dropped(self):
+        G = CSRGraph([0, 2, 3], [0, 1, 0])
+        self.assertRows(G, [[1], [0]])
+
+    def test_directed_transpose(self):
+        G = CSRGraph.from_edges([0, 0, 1], [1, 2, 2], 3, directed=True)
+        self.assertRows(G, [[1, 2], [2], []])
+        self.assertRows(G.transpose(), [[], [0], [0, 1]])
+
+    def test_weights_follow_edges(self):
+        G = CSRGraph.from_edges([1, 0], [2, 1], weights=[0.5, 2.0])
+        self.assertRows(G, [[1], [0, 2], [1]])
+        self.assertEqual(G.weights.tolist(), [2.0, 2.0, 0.5, 0.5])
+
+
+class TestGraphFiles(unittest.TestCase):
+    """!Text and binary graph files, see Nodes.graph.load_graph."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self._directory.name, name)
+
+    def write(self, text: str, name: str="graph.txt") -> str:
+        with open(self.path(name), "w") as f:
+            f.write(text)
+        return self.path(name)
+
+    def test_read_edges(self):
+        n, edges, weights = read_edges(self.write("1 2\n[2,3]\n\n(3, 1)\n4;1"))
+        self.assertIsNone(n)
+        self.assertEqual(edges.tolist(), [[1, 2], [2, 3], [3, 1], [4, 1]])
+        self.assertIsNone(weights)
+
+    def test_header_and_weights(self):
+        n, edges, weights = read_edges(self.write("3\n[1,2,0.5]\n[2,3,2]\n"))
+        self.assertEqual(n, 3)
+        self.assertEqual(edges.dtype, np.int64)
+        self.assertEqual(edges.tolist(), [[1, 2], [2, 3]])
+        self.assertEqual(weights.tolist(), [0.5, 2.0])
+
+    def test_chunk_boundaries(self):
+        edges = np.random.default_rng(1).integers(0, 1000, size=(500, 2))
+        path = self.write("\n".join(f"{u} {v}" for u, v in edges.tolist()))
+        for chunk_size in (1, 7, 64, 1 << 20):
+            self.assertEqual(read_edges(path, chunk_size=chunk_size)[1].tolist(), edges.tolist())
+
+    def test_malformed_lines(self):
+        for text in ("1 2\n3 4 5 6\n", "1 2\n3\n4 5\n", "1 2\n3 x\n", "1 2\n3 4.5\n", "1 2 3 4\n"):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                read_edges(self.write(text), chunk_size=4)
+
+    def test_malformed_line_number(self):
+        with self.assertRaisesRegex(ValueError, "line 4"):
+            read_edges(self.write("5\n1 2\n2 3\n3 4 5\n"), chunk_size=3)
+
+    def test_base_inference(self):
+        # no node 0: numbered from 1, like the files of utils.read_graph.
+        self.assertEqual(load_graph(self.write("1 2\n2 3\n")).nodes(), [1, 2, 3])
+        self.assertEqual(load_graph(self.write("0 1\n1 2\n")).nodes(), [0, 1, 2])
+        # with a header, an edge touching node 0 or node n decides.
+        self.assertEqual(load_graph(self.write("4\n0 1\n1 2\n")).nodes(), [0, 1, 2, 3])
+        self.assertEqual(load_graph(self.write("4\n1 2\n3 4\n")).nodes(), [1, 2, 3, 4])
+
+    def test_ambiguous_base(self):
+        path = self.write("4\n1 2\n2 3\n3 1\n")
+        with self.assertRaises(ValueError):
+            load_graph(path)
+        self.assertEqual(load_graph(path, base=0).nodes(), [0, 1, 2, 3])
+        self.assertEqual(load_graph(path, base=1).nodes(), [1, 2, 3, 4])
+
+    def test_ids_out_of_range(self):
+        with self.assertRaises(ValueError):
+            load_graph(self.write("3\n0 1\n1 5\n"))
+
+    def test_npz_round_trip(self):
+        G = CSRGraph.from_edges([0, 1, 2], [1, 2, 0], ids=[5, 6, 7], weights=[1.0, 2.0, 3.0])
+        for compressed in (True, False):
+            save_graph(self.path("graph.npz"), G, compressed=compressed)
+            loaded = load_graph(self.path("graph.npz"))
+            self.assertEqual(loaded.nodes(), G.nodes())
+            self.assertEqual(loaded.offsets.tolist(), G.offsets.tolist())
+            self.assertEqual(loaded.neighbors.tolist(), G.neighbors.tolist())
+            self.assertEqual(loaded.weights.tolist(), G.weights.tolist())
+            self.assertFalse(loaded.is_directed())
+
+    def test_directed_npz_round_trip(self):
+        G = CSRGraph.from_edges([0, 0, 1], [1, 2, 2], 4, directed=True)
+        save_graph(self.path("graph.npz"), G)
+        loaded = load_graph(self.path("graph.npz"))
+        self.assertTrue(loaded.is_directed())
+        self.assertEqual(loaded.number_of_nodes(), 4)
+        self.assertEqual(loaded.neighbors.tolist(), G.neighbors.tolist())
+
+    def test_npz_edges(self):
+        np.savez(self.path("edges.npz"), edges=np.array([[0, 1], [1, 2]]), n=np.array(4))
+        self.assertEqual(load_graph(self.path("edges.npz")).nodes(), [0, 1, 2, 3])
+
+    def test_npy(self):
+        np.save(self.path("edges.npy"), np.array([[0, 1], [1, 2]]))
+        self.assertEqual(load_graph(self.path("edges.npy")).number_of_edges(), 2)
+        np.save(self.path("weighted.npy"), np.array([[0, 1, 0.5], [1, 2, 1.5]]))
+        G = load_graph(self.path("weighted.npy"))
+        self.assertEqual(G.row(1).tolist(), [0, 2])
+        self.assertEqual(sorted(G.weights.tolist()), [0.5, 0.5, 1.5, 1.5])
+
+    def test_npy_shape(self):
+        np.save(self.path("edges.npy"), np.arange(8).reshape(2, 4))
+        with self.assertRaises(ValueError):
+            load_graph(self.path("edges.npy"))
+
+
+if __name__ == "__main__":
+    unittest.main()
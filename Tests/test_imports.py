@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess as sp
+import sys
+import unittest
+
+## Modules that node processes must not load: they are used only by the initializer or on demand.
+HEAVY_MODULES = ("matplotlib", "networkx", "art", "pause")
+## Seconds allowed to import what a node process needs (about 15ms on a laptop).
+IMPORT_BUDGET = 0.25
+
+# imports of a node process (single node or worker), timed in a fresh interpreter.
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import Nodes.Nodes.Node
+import Nodes.Protocols.Shout
+import Nodes.worker
+elapsed = time.perf_counter() - start
+print(json.dumps({"time": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+class TestNodeImports(unittest.TestCase):
+    """!Node processes import only what they use: heavy dependencies are loaded on first use."""
+
+    @classmethod
+    def setUpClass(cls):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = sp.run([sys.executable, "-c", _SCRIPT], cwd=root, capture_output=True,
+                        text=True, check=True).stdout
+        cls.result = json.loads(output.splitlines()[-1])
+
+    def test_no_heavy_modules(self):
+        modules = {name.split(".")[0] for name in self.result["modules"]}
+        self.assertFalse(modules.intersection(HEAVY_MODULES),
+                         "A node process imports dependencies it does not need.")
+
+    def test_import_budget(self):
+        self.assertLess(self.result["time"], IMPORT_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from Nodes.messages import *
+from Nodes.const import Command
+from Nodes.serialization import BINARY_MAGIC, HEADER, get_codec
+# protocols register their own messages.
+from Nodes.Protocols.Dft import DftMessageV
+from Nodes.Protocols.LamportMutualExclusion import MutualExclusionMessage
+
+
+def samples() -> list:
+    """!Return an instance of every registered message type, with non-default fields."""
+    return [
+        Message(Command.Q, 3),
+        Message("CUSTOM", "node-7"),
+        Message(Command.END),
+        WakeUpMessage(),
+        WakeupAllMessage(2026, 10, 18, 6, 59, 30),
+        FloodingMessage(Command.FORWARD, 1, origin=2, counter=3),
+        ReadyMessage(65001, 4242),
+        SetupMessage(5, [[5, 6], [5, 7]], {6: 65006, 7: 65007}, False, "/tmp/logs", 65100,
+                     codec="binary", reliable=0.25, aggregate=True,
+                     links={6: {"latency": 0.01, "loss": 0.1}}, crash=[0, 3], trace="/tmp/traces"),
+        CountMessage(Command.COUNT_M, 123456, 9),
+        LeaderElectionAtwMessage(Command.ELECTION, 2, 8, 1),
+        LeaderElectionAFMessage(Command.ELECTION, 4, 2),
+        ControlledDistanceMessage(Command.ELECTION, 3, 1, 16),
+        VisualizationMessage(CountMessage(Command.COUNT_M, 7, 2), 5),
+        MinFindingMessage(Command.SAT, -2**40, 3),
+        EndOfVisualizationMessage(),
+        TerminationMessage(Command.ERROR, "Fatal error in node 3: è" * 40, 3),
+        TimerMessage(12, "RELEASE", 1.5),
+        ResetMessage("localhost", 65000, [65001, 65002], "Nodes.Protocols.Shout:Shout",
+                     "Nodes.Nodes.Node:Node", True, {"silent": True}, 7),
+        LaunchMessage(["client.py", "localhost", "65000"], 2, pid=1234),
+        RoundMessage(17, final=True, sender=4),
+        ReportMessage(Command.COUNT_M, 25, 2**70, 3),
+        FaultMessage(1, "partition", [2, 3], 10, 4),
+        MutualExclusionMessage(Command.REQUEST, 11, 2),
+        DftMessageV(Command.FORTH, 1, 2),
+    ]
+
+
+class TestCodecs(unittest.TestCase):
+    """!Wire codecs of the messages, see Nodes.serialization."""
+
+    def tearDown(self):
+        Message.use_codec("binary")
+
+    def assertSameMessage(self, decoded, message):
+        self.assertIs(type(decoded), type(message))
+        self.assertEqual(decoded.to_dict(), message.to_dict())
+
+    def test_samples_cover_registered_types(self):
+        self.assertEqual({type(message).__name__ for message in samples()}, set(Message._message_types))
+
+    def test_round_trip(self):
+        for codec in ("binary", "json"):
+            Message.use_codec(codec)
+            for message in samples():
+                with self.subTest(codec=codec, type=type(message).__name__):
+                    data = message.serialize()
+                    self.assertEqual(data[0] == BINARY_MAGIC, codec == "binary")
+                    self.assertSameMessage(Message.deserialize(data), message)
+
+    def test_round_trip_with_sequence_number(self):
+        for codec in ("binary", "json"):
+            Message.use_codec(codec)
+            for message in samples():
+                message.seq_number = 41
+                with self.subTest(codec=codec, type=type(message).__name__):
+                    decoded = Message.deserialize(message.serialize())
+                    self.assertEqual(decoded.seq_number, 41)
+                    self.assertSameMessage(decoded, message)
+
+    def test_mixed_codecs(self):
+        # receivers detect the codec of every datagram.
+        Message.use_codec("json")
+        data = RoundMessage(3, sender=1).serialize()
+        Message.use_codec("binary")
+        self.assertEqual(Message.deserialize(data).round, 3)
+
+    def test_with_sequence_number(self):
+        codec = get_codec("binary")
+        for message in samples():
+            # the sequence number must be in the header for it to be patched.
+            message.seq_number = 0
+            data = message.serialize()
+            for k in (0, 1, 2**32 - 1):
+                with self.subTest(type=type(message).__name__, k=k):
+                    decoded = Message.deserialize(codec.with_sequence_number(data, k))
+                    self.assertEqual(decoded.seq_number, k)
+                    message.seq_number = k
+                    self.assertSameMessage(decoded, message)
+                    message.seq_number = 0
+
+    def test_values(self):
+        values = [None, True, False, 0, -128, 127, 128, -2**31, 2**31, -2**63, 2**63, -2**100,
+                  0.1, float("inf"), "", "a" * 255, "b" * 256, "è中", b"\x00\xff",
+                  [1, [2, "x"], {"k": None}], {1: "a", "b": [1.5]}]
+        message = TerminationMessage(Command.ERROR, values, 2)
+        decoded = Message.deserialize(message.serialize())
+        self.assertEqual(decoded.payload, values)
+
+    def test_sender_types(self):
+        for sender in (None, 0, -1, 2**63 - 1, 2**63, "node", [1, 2]):
+            with self.subTest(sender=sender):
+                self.assertEqual(Message.deserialize(Message(Command.Q, sender).serialize()).sender, sender)
+
+    def test_unregistered_type(self):
+        class Unregistered(Message):
+            pass
+        with self.assertRaises(ValueError):
+            Unregistered(Command.Q, 1).serialize()
+
+    def test_unserializable_value(self):
+        with self.assertRaises(TypeError):
+            TerminationMessage(Command.ERROR, object(), 1).serialize()
+
+    def test_malformed(self):
+        binary = CountMessage(Command.COUNT_M, 5, 3).serialize()
+        Message.use_codec("json")
+        json_data = CountMessage(Command.COUNT_M, 5, 3).serialize()
+        malformed = [
+            b"",
+            bytes([BINARY_MAGIC]),
+            binary[:HEADER.size - 1],
+            binary[:-1],
+            binary[:HEADER.size + 2],
+            binary[:2] + b"\x00\x00\x00\x00" + binary[6:], # unknown type ID
+            binary + b"\x63", # unknown value tag
+            binary[:HEADER.size - 14] + b"\xff" + binary[HEADER.size - 13:], # unknown command index
+            b"{",
+            b"[1, 2]",
+            b'{"command": "Q"}',
+            b'{"type": "NoSuchMessage", "command": "Q", "sender": 1}',
+            json_data.replace(b'"counter"', b'"count"'),
+            b"\xff\xfe",
+        ]
+        for data in malformed:
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                Message.deserialize(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import networkx as nx
+from Nodes.simulator import Simulator
+from Nodes.links import Link, exponential
+from Nodes.Protocols.SyncBFS import SyncBFS
+
+
+class TestSyncRounds(unittest.TestCase):
+    """!Synchronous protocols in the simulator, see Nodes.Protocols.SyncProtocol."""
+
+    def setUp(self):
+        self.G = nx.random_regular_graph(4, 40, seed=2)
+
+    def distances(self, **kwargs) -> dict:
+        simulator = Simulator(self.G, SyncBFS, seed=1, **kwargs)
+        simulator.wakeup(0)
+        simulator.run()
+        return {node.id: protocol.distance for node, protocol in zip(simulator.nodes, simulator.protocols)}
+
+    def test_bfs(self):
+        expected = nx.single_source_shortest_path_length(self.G, 0)
+        self.assertEqual(self.distances(), expected)
+        self.assertEqual(self.distances(links=Link(1, bandwidth=100)), expected)
+        self.assertEqual(self.distances(links=Link(1, exponential(2), fifo=True)), expected)
+        self.assertEqual(self.distances(links=Link(1, exponential(2)), fifo=True), expected)
+
+    def test_links_not_fifo(self):
+        with self.assertRaises(ValueError):
+            Simulator(self.G, SyncBFS, links=Link(1, exponential(2)))
+        nx.set_edge_attributes(self.G, 0.5, "jitter")
+        with self.assertRaises(ValueError):
+            Simulator(self.G, SyncBFS)
+
+
+if __name__ == "__main__":
+    unittest.main()
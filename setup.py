@@ -22,5 +22,5 @@ setup(
     ],
     packages=find_packages(include=['Nodes']),
     python_requires=">=3.7, <4",
-    install_requires=["networkx", "matplotlib", "art", "pause", "prettytable"],  # Optional
+    install_requires=["networkx", "numpy", "matplotlib", "art", "pause", "prettytable"],  # Optional
 )